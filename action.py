@@ -1,9 +1,25 @@
+import atexit
+import itertools
+import os
+import pickle
 import random
 import sqlite3
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from character import Character
 from database import Database
+from roster import Roster
+from rules import ACTION_CODES, DEFAULT_RULES
 from story import Story
+from transposition import StateKey
+
+class SearchTimeout(Exception):
+    """
+        Raised inside a budgeted search once its time or node budget is spent.
+    """
+    pass
 
 class Action:
     """
@@ -15,6 +31,44 @@ class Action:
     RAN = "ran"
     ATTACKED = "attacked"
 
+    def __init__(self, dataConnection=None, transpositionTable=None, timeBudget=None, nodeBudget=None,
+                 rules=None):
+        """
+            Brief: __init__
+
+            Param: dataConnection is the Database used to look up action usage
+            while searching. A persistent Database keeps the search free of I/O.
+            Param: transpositionTable is an optional TranspositionTable used to
+            reuse the results of states that were already searched. Passing the
+            same table to every round keeps the results between rounds.
+            Param: timeBudget is the number of milliseconds a round may search for.
+            Param: nodeBudget is the number of search states a round may visit.
+            With either budget set, getAction deepens one character at a time
+            and stops when the budget runs out.
+            Param: rules is the RuleTable of legal actions and transitions. It
+            defaults to the rules in rules.py.
+        """
+        if(dataConnection is None):
+            dataConnection = Database()
+
+        if(rules is None):
+            rules = DEFAULT_RULES
+
+        self.dataConnection = dataConnection
+        self.transpositionTable = transpositionTable
+        self.timeBudget = timeBudget
+        self.nodeBudget = nodeBudget
+        self.rules = rules
+        self.stateKeys = None
+        self.levelCharacters = None
+        self.monsterLevels = None
+        self.situations = None
+        self.successorTable = None
+        self.legalActions = None
+        self.depthLimit = None
+        self.deadline = None
+        self.nodesSearched = 0
+
     def getAction(self, storyState, characters):
         """
             Brief: getAction
@@ -22,7 +76,137 @@ class Action:
             Runs the minimax algorithm to determine the actions that each character will take.
 
             Param: storyState is the state of the story.
-            Param: characters is a list of Character instances.
+            Param: characters is a Roster of Character instances.
+
+            Returns a list containing the action chosen for each character.
+        """
+        self.legalActions = self.getLegalActionTable(characters)
+        self.successorTable = self.rules.successorTable(self.dataConnection)
+
+        self.startBudget()
+
+        tension, chosenActions = self.chooseActions(storyState, characters)
+
+        self.deadline = None
+
+        storyState.tension = tension
+
+        return chosenActions
+
+    def startBudget(self):
+        """
+            Brief: startBudget
+
+            Starts the time and node budgets of a round, if any are set.
+        """
+        self.nodesSearched = 0
+
+        if(self.timeBudget is not None):
+            self.deadline = time.perf_counter() + self.timeBudget / 1000.0
+        else:
+            self.deadline = None
+
+    def chooseActions(self, storyState, characters):
+        """
+            Brief: chooseActions
+
+            Searches for the actions of the given characters, within the budget
+            if one is set. self.legalActions must hold the legal actions of the
+            same characters, in the same order.
+
+            Param: storyState is the state of the story.
+            Param: characters is a Roster of Character instances.
+
+            Returns a tuple of the value of the story and the list of actions
+            chosen for the characters.
+        """
+        if(self.timeBudget is None and self.nodeBudget is None):
+            return self.searchToDepth(storyState, characters, len(characters))
+
+        return self.getBudgetedAction(storyState, characters)
+
+    def getBudgetedAction(self, storyState, characters):
+        """
+            Brief: getBudgetedAction
+
+            Searches one character deeper at a time until the time or node budget
+            runs out. Characters the last completed search reached take the actions
+            it chose, and the rest fall back to getDefaultAction, so every
+            character always has an action.
+
+            Param: storyState is the state of the story.
+            Param: characters is a Roster of Character instances.
+
+            Returns a tuple of the value of the story and the list of actions
+            chosen for the characters.
+        """
+        chosenActions = []
+
+        for level in range(len(characters)):
+            chosenActions.append(self.getDefaultAction(storyState, characters, level))
+
+        try:
+            for depth in range(1, len(characters) + 1):
+                tension, depthActions = self.searchToDepth(storyState, characters, depth)
+
+                chosenActions[:depth] = depthActions
+
+                if(depth == len(characters)):
+                    return tension, chosenActions
+        except SearchTimeout:
+            pass
+
+        # The search stopped short, so the tension is the one all the chosen
+        # actions lead to when taken in roster order
+        state = storyState.copy()
+
+        for level in range(len(characters)):
+            self.makeMove(state, characters[level], chosenActions[level])
+
+        return state.tension, chosenActions
+
+    def getDefaultAction(self, storyState, characters, level):
+        """
+            Brief: getDefaultAction
+
+            Cheap policy for characters a budgeted search did not reach. Picks the
+            legal action whose immediate tension is best for the character:
+            highest for monsters and lowest for humans.
+
+            Param: storyState is the state of the story.
+            Param: characters is a Roster of Character instances.
+            Param: level is the position in characters of the character choosing.
+
+            Returns the chosen action.
+        """
+        character = characters[level]
+        chosenAction = None
+        chosenTension = None
+
+        for action in self.legalActions[level]:
+            tension = self.generateSuccessors(storyState, characters, character, action).tension
+
+            if(chosenAction is None
+               or (character.isMonster() and tension > chosenTension)
+               or (not character.isMonster() and tension < chosenTension)):
+                chosenAction = action
+                chosenTension = tension
+
+        return chosenAction
+
+    def searchToDepth(self, storyState, characters, depth):
+        """
+            Brief: searchToDepth
+
+            Runs the minimax search over the first depth characters, treating the
+            tension after them as the value of the story.
+
+            Param: storyState is the state of the story.
+            Param: characters is a Roster of Character instances.
+            Param: depth is the number of characters searched.
+
+            Returns a tuple of the value of the story and the list of actions
+            chosen for the characters searched.
         """
 
         # The directions and values pass to the root
@@ -39,19 +223,46 @@ class Action:
 
         chosenActions = []
 
-        # Determine the max value using the expectimax algorithm
-        storyState.tension = self.getValue(storyState, characters, actions, values, 0, a, b)
+        self.depthLimit = depth
 
-        for character in characters:
-            actionsAvail = actions[character.ID]
-            valuesAvail = values[character.ID]
+        if(self.transpositionTable is not None):
+            self.stateKeys = self.getStateKeys(characters, depth)
+
+        self.levelCharacters = characters[:depth]
+        self.monsterLevels = [character.isMonster() for character in self.levelCharacters]
 
-            if(character.isMonster()):
+        # The search makes and unmakes moves on its own copy of the story
+        state = storyState.copy()
+
+        # Determine the max value using the expectimax algorithm
+        tension = self.searchRoot(state, characters, actions, values, a, b)
+
+        for level in range(depth):
+            character = self.levelCharacters[level]
+            actionsAvail = actions[level]
+            valuesAvail = values[level]
+
+            # States reused from the transposition table may leave a character
+            # with nothing recorded
+            if(len(actionsAvail) == 0):
+                chosenActions.append(self.legalActions[level][0])
+            elif(character.isMonster()):
                 chosenActions.append(actionsAvail[valuesAvail.index(max(valuesAvail))])
             else:
                 chosenActions.append(actionsAvail[valuesAvail.index(min(valuesAvail))])
 
-        return chosenActions
+        return tension, chosenActions
+
+    def searchRoot(self, state, characters, actions, values, a, b):
+        """
+            Brief: searchRoot
+
+            Searches from the first character with the levels set up by
+            searchToDepth.
+
+            Returns the value of the story.
+        """
+        return self.getValue(state, characters, actions, values, 0, a, b)
 
     def maxValue(self, state, characters, character, actions, values, level, a, b):
         """
@@ -61,20 +272,32 @@ class Action:
         """
 
         value = float("-inf")
+        windowA = a
+        bestAction = None
+        bestTension = None
 
         # For all legal actions, determine the maximum value
-        for action in self.getLegalActions(characters, character):
-            nextState = self.generateSuccessors(state, characters, character, action)
-            value = max(value, self.getValue(nextState, characters, actions, values, level + 1, a, b))
+        for action in self.legalActions[level]:
+            tension = self.makeMove(state, character, action)
+            nextValue = self.getValue(state, characters, actions, values, level + 1, a, b)
+
+            if(nextValue > value):
+                value = nextValue
+                bestAction = action
+                bestTension = state.tension
+
+            self.unmakeMove(state, tension)
 
             actions[level].append(action)
             values[level].append(value)
 
             if(value > b):
-                return value
+                break
 
             a = max(a, value)
 
+        self.storeResult(state, characters, level, value, windowA, b, bestAction, bestTension)
+
         return value
 
     def minValue(self, state, characters, character, actions, values, level, a, b):
@@ -85,21 +308,33 @@ class Action:
         """
 
         value = float("inf")
+        windowB = b
+        bestAction = None
+        bestTension = None
 
         # For all legal actions, determine the minimum value
-        for action in self.getLegalActions(characters, character):
-            nextState = self.generateSuccessors(state, characters, character, action)
+        for action in self.legalActions[level]:
+            tension = self.makeMove(state, character, action)
+
+            nextValue = self.getValue(state, characters, actions, values, level + 1, a, b)
 
-            value = min(value, self.getValue(nextState, characters, actions, values, level + 1, a, b))
+            if(nextValue < value):
+                value = nextValue
+                bestAction = action
+                bestTension = state.tension
+
+            self.unmakeMove(state, tension)
 
             actions[level].append(action)
             values[level].append(value)
 
             if(value < a):
-                return value
+                break
 
             b = min(b, value)
 
+        self.storeResult(state, characters, level, value, a, windowB, bestAction, bestTension)
+
         return value
 
     def getValue(self, state, characters, actions, values, level, a, b):
@@ -110,81 +345,566 @@ class Action:
 
         # If the number of times each agent has acted is equal to the depth, we have
         # found the terminal node and should stop the algorithm.
-        if(len(characters) == level):
+        if(self.depthLimit == level):
             return state.tension
 
+        if(self.deadline is not None or self.nodeBudget is not None):
+            self.nodesSearched += 1
+
+            if((self.nodeBudget is not None and self.nodesSearched > self.nodeBudget)
+               or (self.deadline is not None and time.perf_counter() > self.deadline)):
+                raise SearchTimeout()
+
+        if(self.transpositionTable is not None):
+            entry = self.transpositionTable.lookup((state.tension, self.stateKeys[level]), a, b)
+
+            # The subtree is not searched again, so record its best line instead
+            if(entry is not None):
+                for i in range(len(entry.principalActions)):
+                    actions[level + i].append(entry.principalActions[i])
+                    values[level + i].append(entry.value)
+
+                return entry.value
+
         # If the level is divisible by the number of agents, the agent is Pacman.
         # Otherwise, the agent is a ghost.
-        if(characters[level].isMonster()):
-            return self.maxValue(state, characters, characters[level], actions, values, level, a, b)
+        if(self.monsterLevels[level]):
+            return self.maxValue(state, characters, self.levelCharacters[level], actions, values, level, a, b)
         else:
-            return self.minValue(state, characters, characters[level], actions, values, level, a, b)
+            return self.minValue(state, characters, self.levelCharacters[level], actions, values, level, a, b)
+
+    def getStateKeys(self, characters, depth):
+        """
+            Brief: getStateKeys
+
+            Builds, for every level of the search, a key of everything below it
+            that a subtree depends on: the search depth and the type, health,
+            awareness and conflict of each remaining character and the tension
+            modifiers of their legal actions. Paired with the tension, this
+            identifies a search state.
+
+            Param: characters is a Roster of Character instances.
+            Param: depth is the number of characters searched.
+
+            Returns a list holding one key per level.
+        """
+        stateKeys = [None] * (depth + 1)
+        stateKeys[depth] = StateKey((depth,))
+
+        for level in range(depth - 1, -1, -1):
+            character = characters[level]
+            modifiers = []
+
+            for action in self.legalActions[level]:
+                modifiers.append(self.dataConnection.getActionUsage(action, character.characterType))
+
+            characterKey = (character.characterType, character.status, character.aware,
+                            self.isConflict(characters, character), tuple(modifiers))
+
+            stateKeys[level] = StateKey((level, characterKey, stateKeys[level + 1]))
+
+        return stateKeys
+
+    def storeResult(self, state, characters, level, value, a, b, bestAction, bestTension):
+        """
+            Brief: storeResult
+
+            Saves the value of a searched state in the transposition table along
+            with the best line of actions from it, if a table is in use.
+        """
+        if(self.transpositionTable is None or bestAction is None):
+            return
+
+        principalActions = (bestAction,)
+
+        if(level + 1 < self.depthLimit):
+            principalActions += self.transpositionTable.principalActions((bestTension, self.stateKeys[level + 1]))
+
+        self.transpositionTable.store((state.tension, self.stateKeys[level]), value, a, b, principalActions)
+
+    def getLegalActionTable(self, characters):
+        """
+            Brief: getLegalActionTable
+
+            Finds the situation and legal actions of every character at once,
+            using the roster's conflict mask and columns instead of checking
+            characters one at a time. Characters in the same situation share
+            one list.
+
+            Param: characters is a Roster of Character instances.
+
+            Returns a list holding the legal actions of each character.
+        """
+        self.situations = self.rules.situations(characters)
+
+        legalActions = self.rules.legalActions
+
+        return [legalActions[code] for code in self.situations]
 
     def getLegalActions(self, characters, character):
-        actions = [Action.INVESTIGATED]
+        return self.legalActionsFor(character.characterType, character.isInjured(),
+                                    character.aware, self.isConflict(characters, character))
 
-        if(self.isConflict(characters, character) and character.aware):
-            if(character.isHuman()):
-                actions = [Action.ATTACKED, Action.INVESTIGATED, Action.RAN]
-            elif(character.isMonster() and character.isInjured()):
-                actions = [Action.ATTACKED, Action.RAN]
-            else:
-                actions = [Action.ATTACKED]
-        elif(character.aware):
-            if(character.isHuman()):
-                actions = [Action.ESCAPED, Action.INVESTIGATED, Action.RAN]
-            elif(character.isMonster() and character.isInjured()):
-                actions = [Action.INVESTIGATED, Action.RAN]
+    def legalActionsFor(self, characterType, injured, aware, conflict):
+        """
+            Brief: legalActionsFor
 
-        return actions
+            Returns the legal actions of a character of the given type, health,
+            awareness and conflict.
+        """
+        code = self.rules.situationCode(Roster.TYPES.index(characterType), injured, aware, conflict)
+
+        return self.rules.legalActions[code]
 
     def isConflict(self, characters, character):
-        humansInPosition = 0
-        monstersInPosition = 0
-
-        for c in characters:
-            if(c.ID == character.ID):
-                continue
-            elif(c.isHuman() and c.position == character.position):
-                humansInPosition += 1
-            elif(c.isMonster() and c.position == character.position):
-                monstersInPosition += 1
-
-        if((character.isMonster() and humansInPosition > 0)
-           or (character.isHuman() and monstersInPosition > 0)):
-            return True
-        else:
-            return False
+        return characters.isConflict(character)
 
 
     def generateSuccessors(self, state, characters, character, action):
-        nextState = state
+        """
+            Brief: generateSuccessors
+
+            Returns a new state of the story after a character takes an action.
+        """
+        nextState = state.copy()
+
+        self.makeMove(nextState, character, action)
 
-        dataConnection = Database()
+        return nextState
 
-        if(character.isMonster()):
-            tensionModifier = 1 - dataConnection.getActionUsage(action, character.characterType)
+    def makeMove(self, state, character, action):
+        """
+            Brief: makeMove
+
+            Applies an action to the search state in place.
+
+            Returns the tension before the action, for unmakeMove.
+        """
+        tension = state.tension
+        transition = self.successorTable[self.situations[character.index] * 4 + ACTION_CODES[action]]
+
+        if(transition is not None):
+            state.tension = (tension + transition[0]) * transition[1]
+
+        return tension
+
+    def unmakeMove(self, state, tension):
+        """
+            Brief: unmakeMove
+
+            Takes back the action makeMove applied.
+
+            Param: tension is the value makeMove returned.
+        """
+        state.tension = tension
+
+class PositionSearch(Action):
+    """
+        Finds the actions Action's search chooses without searching the tree,
+        when only humans have a choice to make, as under the default rules,
+        where a monster always has one legal action.
+
+        Every transition maps the tension to one no lower than it maps any
+        lower tension, so the best a human can do from a state is to take the
+        action leaving the lowest tension, and every later character the same:
+        the value of the story is the tension those actions lead to. Nothing
+        raises the search's alpha, so it searches every state, and a
+        character's chosen action is the first one, in the first state in
+        search order, whose subtree reaches that value. That is the first
+        legal action of each character, in roster order, after which the
+        value can still be reached, found by following the cheapest actions
+        from it. A round costs a number of transitions quadratic in the
+        roster size and gives the same actions and tension as Action.
+
+        With a transposition table or a budget, or when a
+        monster has a choice and cuts the search off, the search runs as
+        Action's does.
+    """
+
+    def chooseActions(self, storyState, characters):
+        if(self.transpositionTable is not None or self.timeBudget is not None or self.nodeBudget is not None):
+            return Action.chooseActions(self, storyState, characters)
+
+        choices = []
+
+        for index in range(len(characters)):
+            if(characters.types[index] == Roster.MONSTER and len(self.legalActions[index]) > 1):
+                return Action.chooseActions(self, storyState, characters)
+
+            code = self.situations[index] * 4
+            choices.append([(action, self.successorTable[code + ACTION_CODES[action]])
+                            for action in self.legalActions[index]])
+
+        value = self.lowestTension(choices, 0, storyState.tension)
+        tension = storyState.tension
+        chosenActions = []
+
+        for level in range(len(choices)):
+            for action, transition in choices[level]:
+                nextTension = tension
+
+                if(transition is not None):
+                    nextTension = (tension + transition[0]) * transition[1]
+
+                if(self.lowestTension(choices, level + 1, nextTension) == value):
+                    break
+
+            chosenActions.append(action)
+            tension = nextTension
+
+        return value, chosenActions
+
+    def lowestTension(self, choices, level, tension):
+        """
+            Brief: lowestTension
+
+            Returns the lowest tension the characters from level on can leave
+            the story at, each taking the action leaving the lowest tension.
+
+            Param: choices is the list of the (action, transition) pairs of
+            each character's legal actions.
+            Param: level is the index of the first character acting.
+            Param: tension is the tension before it acts.
+        """
+        for level in range(level, len(choices)):
+            lowest = None
+
+            for action, transition in choices[level]:
+                nextTension = tension
+
+                if(transition is not None):
+                    nextTension = (tension + transition[0]) * transition[1]
+
+                if(lowest is None or nextTension < lowest):
+                    lowest = nextTension
+
+            tension = lowest
+
+        return tension
+
+class ParallelSearch(Action):
+    """
+        Runs the same search as Action with its top split across a pool of
+        worker processes. Every state a few characters deep is the root of a
+        subtree, and the subtrees are all sent to the workers at the start of
+        the search. A character's legal actions are the same in every state,
+        so the subtrees are the same size. The levels above them are then
+        searched here in the serial order, taking each subtree's result from
+        its worker, and whenever the alpha-beta window narrows, the subtrees
+        under it that no worker has started on yet are sent again with the
+        narrower window.
+
+        A worker's result is the same as that of the serial search, which
+        gives the subtree the window left by everything searched before it,
+        if none of the subtree's states would have been cut off by the
+        narrower window. Each worker reports the values its states recorded
+        where an action was left to try, which bound how far the window can
+        narrow, so its result is kept whenever they allow it and only the
+        others are searched again here. Under the default rules monsters have
+        one legal action and alpha never rises, so every result is kept. The
+        per-character action and value lists of the subtrees are merged in the
+        serial order, and the chosen actions are those of Action.
+
+        The transposition table and the search budgets are not shared between
+        processes, so with either set the search runs serially.
+    """
+
+    # Subtrees shallower than this are searched serially, as sending them to
+    # a worker costs more than searching them
+    MIN_SPLIT_DEPTH = 6
+
+    def __init__(self, dataConnection=None, transpositionTable=None, timeBudget=None, nodeBudget=None,
+                 rules=None, workers=None, subtreesPerWorker=4):
+        """
+            Brief: __init__
+
+            Param: workers is the number of worker processes, by default one
+            per core. Searches with the same number of workers share a pool.
+            Param: subtreesPerWorker is the number of subtrees to split the
+            search into for each worker, if the roster allows that many.
+
+            The other parameters are those of Action.
+        """
+        Action.__init__(self, dataConnection, transpositionTable, timeBudget, nodeBudget, rules)
+
+        self.workers = workers or os.cpu_count() or 1
+        self.subtreesPerWorker = subtreesPerWorker
+        self.splitDepth = None
+        self.splitSpans = None
+        self.splitTensions = None
+        self.splitFutures = None
+        self.searchState = None
+        self.subtreesKept = 0
+        self.subtreesSearchedAgain = 0
+
+    def searchRoot(self, state, characters, actions, values, a, b):
+        self.subtreesKept = 0
+        self.subtreesSearchedAgain = 0
+
+        if(self.transpositionTable is not None or self.timeBudget is not None or self.nodeBudget is not None):
+            return Action.searchRoot(self, state, characters, actions, values, a, b)
+
+        # The subtrees start at the first level with enough states
+        subtrees = 1
+        self.splitDepth = 0
+
+        while(subtrees < self.workers * self.subtreesPerWorker
+              and self.depthLimit - self.splitDepth > ParallelSearch.MIN_SPLIT_DEPTH):
+            subtrees *= len(self.legalActions[self.splitDepth])
+            self.splitDepth += 1
+
+        if(subtrees == 1):
+            return Action.searchRoot(self, state, characters, actions, values, a, b)
+
+        # The number of subtrees under a state of each level
+        self.splitSpans = [1] * (self.splitDepth + 1)
+
+        for level in range(self.splitDepth - 1, -1, -1):
+            self.splitSpans[level] = self.splitSpans[level + 1] * len(self.legalActions[level])
+
+        # The search is pickled once and unpickled once per worker, not once
+        # per subtree
+        self.searchState = ((os.getpid(), next(SEARCH_IDS)),
+                            pickle.dumps((self.legalActions, self.situations, self.successorTable,
+                                          self.levelCharacters, self.monsterLevels, self.depthLimit)))
+
+        self.splitTensions = []
+        self.splitFutures = []
+
+        self.collectSubtrees(state, 0)
+
+        pool = getSearchPool(self.workers)
+
+        for tension in self.splitTensions:
+            self.splitFutures.append(pool.submit(searchSubtree, self.searchState, tension, self.splitDepth, a, b))
+
+        try:
+            return self.splitValue(state, characters, actions, values, 0, a, b, 0)
+        finally:
+            for future in self.splitFutures:
+                future.cancel()
+
+    def collectSubtrees(self, state, level):
+        """
+            Brief: collectSubtrees
+
+            Adds the tension at the root of every subtree under a state to
+            splitTensions, in the order the search reaches them.
+        """
+        if(level == self.splitDepth):
+            self.splitTensions.append(state.tension)
+            return
+
+        for action in self.legalActions[level]:
+            tension = self.makeMove(state, self.levelCharacters[level], action)
+            self.collectSubtrees(state, level + 1)
+            self.unmakeMove(state, tension)
+
+    def splitValue(self, state, characters, actions, values, level, a, b, index):
+        """
+            Brief: splitValue
+
+            Searches a state above the subtrees like getValue, with their
+            results taken from the workers.
+
+            Param: index is the number of states of the level searched before
+            this one, had none been cut off.
+
+            Returns the value of the state.
+        """
+        if(level == self.splitDepth):
+            return self.subtreeValue(state, characters, actions, values, level, a, b, index)
+
+        legalActions = self.legalActions[level]
+        character = self.levelCharacters[level]
+        isMonster = self.monsterLevels[level]
+
+        if(isMonster):
+            value = float("-inf")
         else:
-            tensionModifier = 1 + dataConnection.getActionUsage(action, character.characterType)
-
-        if(action == Action.ESCAPED):
-            nextState = Story((state.tension - 1) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-        elif(action == Action.INVESTIGATED):
-            if(self.isConflict(characters, character) and character.aware):
-                nextState = Story((state.tension + 3) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-            elif(self.isConflict(characters, character)):
-                nextState = Story((state.tension + 2) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
+            value = float("inf")
+
+        for i in range(len(legalActions)):
+            action = legalActions[i]
+            child = index * len(legalActions) + i
+
+            tension = self.makeMove(state, character, action)
+            nextValue = self.splitValue(state, characters, actions, values, level + 1, a, b, child)
+            self.unmakeMove(state, tension)
+
+            if((isMonster and nextValue > value) or (not isMonster and nextValue < value)):
+                value = nextValue
+
+            actions[level].append(action)
+            values[level].append(value)
+
+            if((isMonster and value > b) or (not isMonster and value < a)):
+                break
+
+            if((isMonster and value > a) or (not isMonster and value < b)):
+                if(isMonster):
+                    a = value
+                else:
+                    b = value
+
+                self.resendSubtrees((child + 1) * self.splitSpans[level + 1],
+                                    (index + 1) * self.splitSpans[level], a, b)
+
+        return value
+
+    def subtreeValue(self, state, characters, actions, values, level, a, b, index):
+        """
+            Brief: subtreeValue
+
+            Takes the result of a subtree from its worker, or searches the
+            subtree again if its window would have changed the result.
+
+            Returns the value of the subtree.
+        """
+        value, subtreeActions, subtreeValues, lowestA, highestB = self.splitFutures[index].result()
+
+        if(a > lowestA or b < highestB):
+            self.subtreesSearchedAgain += 1
+
+            return self.getValue(state, characters, actions, values, level, a, b)
+
+        self.subtreesKept += 1
+
+        for depth in range(len(subtreeActions)):
+            actions[level + depth].extend(subtreeActions[depth])
+            values[level + depth].extend(subtreeValues[depth])
+
+        return value
+
+    def resendSubtrees(self, first, last, a, b):
+        """
+            Brief: resendSubtrees
+
+            Sends the subtrees from first up to last that no worker has
+            started on yet again, with a narrower window.
+        """
+        pool = getSearchPool(self.workers)
+
+        for index in range(first, last):
+            if(self.splitFutures[index].cancel()):
+                self.splitFutures[index] = pool.submit(searchSubtree, self.searchState, self.splitTensions[index],
+                                                       self.splitDepth, a, b)
+
+SEARCH_POOLS = {}
+
+# Identifies the search each subtree sent to a worker belongs to
+SEARCH_IDS = itertools.count()
+
+# The search state a worker process last unpickled, keyed by its search ID
+WORKER_SEARCH = {}
+
+def getSearchPool(workers):
+    """
+        Brief: getSearchPool
+
+        Returns the process pool with the given number of workers, starting it
+        the first time it is needed.
+    """
+    pool = SEARCH_POOLS.get(workers)
+
+    if(pool is None):
+        pool = ProcessPoolExecutor(max_workers=workers)
+        SEARCH_POOLS[workers] = pool
+
+    return pool
+
+def closeSearchPools():
+    """
+        Brief: closeSearchPools
+
+        Shuts down every process pool of the parallel search. A pool started
+        inside a worker process of another pool must be closed before the
+        worker returns, or the worker never exits: the interpreter's exit
+        hooks do not run in pool workers.
+    """
+    while(len(SEARCH_POOLS) > 0):
+        workers, pool = SEARCH_POOLS.popitem()
+
+        pool.shutdown(wait=True, cancel_futures=True)
+
+atexit.register(closeSearchPools)
+
+def searchSubtree(searchState, tension, level, a, b):
+    """
+        Brief: searchSubtree
+
+        Searches one subtree for a ParallelSearch in a worker process, on a
+        thread of its own. The interpreter keeps the frames of a thread in
+        chunks and frees a chunk as soon as the frames leave it, so a search
+        started deep in the worker's own frames can cross from one chunk to
+        the next at a level it visits millions of times, allocating and
+        freeing a chunk at every visit. A new thread starts the search near
+        the bottom of its first chunk.
+
+        Param: searchState is a tuple of the ID of the search and the pickled
+        tuple of its legal actions, situation codes, successor table,
+        characters, monster levels and depth.
+        Param: tension is the tension of the story at the root of the subtree.
+        Param: level is the level of the root of the subtree.
+        Param: a and b are the alpha-beta window of the subtree.
+
+        Returns the result of runSubtree.
+    """
+    with ThreadPoolExecutor(max_workers=1) as thread:
+        return thread.submit(runSubtree, searchState, tension, level, a, b).result()
+
+def runSubtree(searchState, tension, level, a, b):
+    """
+        Brief: runSubtree
+
+        Searches one subtree for a ParallelSearch, with the parameters of
+        searchSubtree.
+
+        Returns a tuple of the value of the subtree, the action and value
+        lists it recorded for each level from its root down, and the highest
+        alpha and lowest beta that would have searched it the same way. A
+        character's action is the first one recorded with its best value, so
+        each list keeps only that entry, which the search would choose from
+        the subtree's entries, and the results stay small.
+    """
+    searchID, pickledState = searchState
+
+    if(searchID not in WORKER_SEARCH):
+        WORKER_SEARCH.clear()
+        WORKER_SEARCH[searchID] = pickle.loads(pickledState)
+
+    searcher = Action(Database())
+
+    (searcher.legalActions, searcher.situations, searcher.successorTable, searcher.levelCharacters,
+     searcher.monsterLevels, searcher.depthLimit) = WORKER_SEARCH[searchID]
+
+    actions = [[] for i in range(searcher.depthLimit)]
+    values = [[] for i in range(searcher.depthLimit)]
+
+    value = searcher.getValue(Story(tension, 0, 0, 0, 0, 0, False), searcher.levelCharacters, actions, values,
+                              level, a, b)
+
+    # Only a state with another action left to try can be cut off, so
+    # characters with one legal action never are, whatever the window
+    lowestA = float("inf")
+    highestB = float("-inf")
+
+    for depth in range(level, searcher.depthLimit):
+        if(len(values[depth]) > 0):
+            if(searcher.monsterLevels[depth]):
+                bestValue = max(values[depth])
+
+                if(len(searcher.legalActions[depth]) > 1):
+                    highestB = max(highestB, bestValue)
             else:
-                nextState = Story((state.tension + 1) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-        elif(action == Action.RAN):
-            if(character.isHuman() and self.isConflict(characters, character) and character.aware):
-                nextState = Story((state.tension + 4) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-            elif(character.isMonster() and character.isInjured() and self.isConflict(characters, character) and character.aware):
-                nextState = Story((state.tension - 1) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-        elif(action == Action.ATTACKED):
-            if(character.isHuman() and self.isConflict(characters, character) and character.aware):
-                nextState = Story((state.tension + 5) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
-            elif(character.isMonster() and character.isInjured() and self.isConflict(characters, character) and character.aware):
-                nextState = Story((state.tension + 2) * tensionModifier, state.numHumans, state.numMonsters, state.numHumansDead, state.numEscaped, state.numMonstersDead, state.storyComplete)
+                bestValue = min(values[depth])
 
-        return nextState
+                if(len(searcher.legalActions[depth]) > 1):
+                    lowestA = min(lowestA, bestValue)
+
+            best = values[depth].index(bestValue)
+
+            actions[depth] = [actions[depth][best]]
+            values[depth] = [bestValue]
+
+    return value, actions[level:], values[level:], lowestA, highestB
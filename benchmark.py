@@ -0,0 +1,364 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from action import Action, ParallelSearch, closeSearchPools
+from database import Database
+from narration import NullSink
+from outcome import actionOutcome
+from story import Story
+from storyCreator import loadCharacters, tellStory
+
+def writeRoster(directory, size):
+    """
+        Brief: writeRoster
+
+        Writes a roster file with the given number of generated names.
+
+        Param: directory is the directory the file is written to.
+        Param: size is the number of characters in the roster.
+
+        Returns the name of the file.
+    """
+    fileName = os.path.join(directory, "roster%d.txt" % size)
+
+    with open(fileName, "w") as f:
+        for i in range(size):
+            f.write("Character%d\n" % i)
+
+    return fileName
+
+def openDatabase(directory):
+    """
+        Brief: openDatabase
+
+        Creates a fresh persistent database in the benchmark directory.
+
+        Returns the Database.
+    """
+    dataConnection = Database(os.path.join(directory, "benchmark.db"), persistent=True)
+
+    dataConnection.createDBAndTables()
+    dataConnection.insertRecords()
+
+    return dataConnection
+
+def benchmarkSearch(directory, sizes, seed, repeat):
+    """
+        Brief: benchmarkSearch
+
+        Times Action.getAction on rosters of each size. Every character is
+        made aware so the search branches as it does once a story is under way.
+
+        Returns a list of results, one per roster size.
+    """
+    results = []
+
+    dataConnection = openDatabase(directory)
+
+    for size in sizes:
+        fileName = writeRoster(directory, size)
+        timings = []
+
+        for i in range(repeat):
+            random.seed(seed + i)
+
+            storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+            characters = loadCharacters(fileName, storyState)
+
+            for character in characters:
+                character.aware = True
+
+            start = time.perf_counter()
+            Action(dataConnection).getAction(storyState, characters)
+            timings.append(time.perf_counter() - start)
+
+        results.append({"characters": size,
+                        "repeat": repeat,
+                        "mean_seconds": sum(timings) / len(timings),
+                        "min_seconds": min(timings),
+                        "max_seconds": max(timings)})
+
+    dataConnection.close()
+
+    return results
+
+def benchmarkParallel(directory, sizes, workerCounts, seed, rosters):
+    """
+        Brief: benchmarkParallel
+
+        Times ParallelSearch.getAction against Action.getAction on random
+        rosters of each size, and checks that both choose the same actions and
+        lead to the same tension. The characters are spread over the first
+        positions and most are made aware, so the search branches. The
+        speedup cannot pass the number of cores, which is recorded with the
+        results, and the subtrees the workers searched in vain are counted.
+
+        Returns a list of results, one per roster size and number of workers.
+    """
+    results = []
+
+    dataConnection = openDatabase(directory)
+
+    for size in sizes:
+        fileName = writeRoster(directory, size)
+
+        for workers in workerCounts:
+            serialSeconds = 0.0
+            parallelSeconds = 0.0
+            mismatches = 0
+            subtreesKept = 0
+            subtreesSearchedAgain = 0
+
+            for i in range(rosters):
+                rng = random.Random(seed + i)
+
+                storyState = Story(rng.uniform(-5, 5), 0, 0, 0, 0, 0, False)
+                characters = loadCharacters(fileName, storyState, rng)
+
+                for character in characters:
+                    character.aware = rng.random() < 0.7
+                    characters.moveCharacter(character, rng.randint(1, 2))
+
+                parallelState = storyState.copy()
+
+                start = time.perf_counter()
+                serialActions = Action(dataConnection).getAction(storyState, characters)
+                serialSeconds += time.perf_counter() - start
+
+                searchAgent = ParallelSearch(dataConnection, workers=workers)
+
+                start = time.perf_counter()
+                parallelActions = searchAgent.getAction(parallelState, characters)
+                parallelSeconds += time.perf_counter() - start
+
+                subtreesKept += searchAgent.subtreesKept
+                subtreesSearchedAgain += searchAgent.subtreesSearchedAgain
+
+                if(serialActions != parallelActions or storyState.tension != parallelState.tension):
+                    mismatches += 1
+
+            results.append({"characters": size,
+                            "workers": workers,
+                            "cpus": os.cpu_count(),
+                            "rosters": rosters,
+                            "mismatches": mismatches,
+                            "serial_seconds": serialSeconds,
+                            "parallel_seconds": parallelSeconds,
+                            "speedup": serialSeconds / parallelSeconds,
+                            "subtrees_kept": subtreesKept,
+                            "subtrees_searched_again": subtreesSearchedAgain})
+
+    closeSearchPools()
+    dataConnection.close()
+
+    return results
+
+def benchmarkDatabase(directory, operations):
+    """
+        Brief: benchmarkDatabase
+
+        Measures updateAction and getActionUsage in both the per-call and the
+        persistent Database modes.
+
+        Returns a dictionary of operations per second.
+    """
+    results = {}
+    actions = [Action.ESCAPED, Action.INVESTIGATED, Action.RAN, Action.ATTACKED]
+    agentTypes = ["human", "monster"]
+
+    for persistent in [False, True]:
+        fileName = os.path.join(directory, "database%d.db" % persistent)
+        dataConnection = Database(fileName, persistent)
+
+        dataConnection.createDBAndTables()
+        dataConnection.insertRecords()
+
+        mode = "persistent" if persistent else "per_call"
+
+        start = time.perf_counter()
+
+        for i in range(operations):
+            dataConnection.updateAction(actions[i % 4], agentTypes[i % 2])
+
+        results[mode + "_update_action_per_second"] = operations / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+
+        for i in range(operations):
+            dataConnection.getActionUsage(actions[i % 4], agentTypes[i % 2])
+
+        results[mode + "_get_action_usage_per_second"] = operations / (time.perf_counter() - start)
+
+        dataConnection.close()
+
+    return results
+
+def benchmarkOutcomes(directory, size, seed, operations):
+    """
+        Brief: benchmarkOutcomes
+
+        Measures how many actionOutcome calls run per second on a roster whose
+        characters are all aware, so every action is resolved in full.
+
+        Returns a dictionary holding the calls per second.
+    """
+    random.seed(seed)
+
+    fileName = writeRoster(directory, size)
+    storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+    characters = loadCharacters(fileName, storyState)
+
+    for character in characters:
+        character.aware = True
+
+    actions = [Action.ESCAPED, Action.INVESTIGATED, Action.RAN, Action.ATTACKED]
+
+    start = time.perf_counter()
+
+    for i in range(operations):
+        character = characters[i % len(characters)]
+
+        # Keep the roster playable by reviving whoever was killed or escaped
+        character.alive = True
+
+        if(character.position == -1):
+            character.position = 1
+
+        actionOutcome(storyState, characters, character, actions[i % 4])
+
+    return {"characters": size,
+            "operations": operations,
+            "action_outcome_per_second": operations / (time.perf_counter() - start)}
+
+def benchmarkStories(directory, sizes, seed, stories):
+    """
+        Brief: benchmarkStories
+
+        Tells complete headless stories through tellStory for rosters of each
+        size.
+
+        Returns a list of results, one per roster size.
+    """
+    results = []
+
+    for size in sizes:
+        fileName = writeRoster(directory, size)
+        dataConnection = openDatabase(directory)
+        searchAgent = Action(dataConnection)
+
+        random.seed(seed)
+
+        start = time.perf_counter()
+
+        for story in range(stories):
+            tellStory(fileName, dataConnection, NullSink(), searchAgent)
+
+        elapsed = time.perf_counter() - start
+
+        results.append({"characters": size,
+                        "stories": stories,
+                        "stories_per_second": stories / elapsed})
+
+        dataConnection.close()
+        os.remove(dataConnection.fileName)
+
+    return results
+
+def getCommit():
+    """
+        Brief: getCommit
+
+        Returns the git commit of the working tree, or None outside a checkout.
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runBenchmarks(args):
+    """
+        Brief: runBenchmarks
+
+        Runs every benchmark in a scratch directory.
+
+        Param: args holds the parsed command line arguments.
+
+        Returns a dictionary of the results.
+    """
+    directory = tempfile.mkdtemp(prefix="storyCreator-benchmark-")
+
+    try:
+        results = {"commit": getCommit(),
+                   "python": platform.python_version(),
+                   "seed": args.seed,
+                   "search": benchmarkSearch(directory, args.search_sizes, args.seed, args.repeat),
+                   "parallel_search": benchmarkParallel(directory, args.parallel_sizes, args.parallel_workers,
+                                                        args.seed, args.parallel_rosters),
+                   "database": benchmarkDatabase(directory, args.operations),
+                   "action_outcome": benchmarkOutcomes(directory, max(args.story_sizes), args.seed, args.operations),
+                   "stories": benchmarkStories(directory, args.story_sizes, args.seed, args.stories)}
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+def parseArguments(argv):
+    """
+        Brief: parseArguments
+
+        Parses the command line.
+
+        Param: argv is the list of command line arguments, without the program name.
+
+        Returns the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog="benchmark.py",
+                                     description="Measure search, persistence and story throughput.")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed for the generated rosters and stories")
+    parser.add_argument("--search-sizes", type=int, nargs="+", default=[2, 4, 6, 8, 10],
+                        help="roster sizes to time getAction on")
+    parser.add_argument("--parallel-sizes", type=int, nargs="+", default=[24, 28],
+                        help="roster sizes to compare the parallel search with the serial one on")
+    parser.add_argument("--parallel-workers", type=int, nargs="+", default=[2, 4],
+                        help="numbers of worker processes to time the parallel search with")
+    parser.add_argument("--parallel-rosters", type=int, default=3,
+                        help="number of random rosters the parallel search is checked on per size")
+    parser.add_argument("--story-sizes", type=int, nargs="+", default=[4, 6, 8],
+                        help="roster sizes to tell complete stories with")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of getAction calls timed per roster size")
+    parser.add_argument("--operations", type=int, default=2000,
+                        help="number of database and actionOutcome calls timed")
+    parser.add_argument("--stories", type=int, default=20,
+                        help="number of stories told per roster size")
+    parser.add_argument("--output", default=None,
+                        help="file the JSON results are written to instead of standard output")
+
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parseArguments(sys.argv[1:])
+
+    results = runBenchmarks(args)
+
+    if(args.output is not None):
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    # The parallel search must choose exactly what the serial one does
+    if(any(result["mismatches"] > 0 for result in results["parallel_search"])):
+        sys.stderr.write("parallel search differs from the serial search\n")
+        sys.exit(1)
@@ -37,21 +37,11 @@ class SubjectAdjective:
     VILE = "vile"
 
 
-class Character:
+class CharacterBase:
     """
-        Character in the story.
+        What a character can be asked, however its attributes are stored.
     """
-    def __init__(self, ID, name, characterType, gender, appearance, alive, status, timesMoved, position, aware):
-        self.ID = ID
-        self.name = name
-        self.characterType = characterType
-        self.gender = gender
-        self.appearance = appearance
-        self.alive = alive
-        self.status = status
-        self.timesMoved = timesMoved
-        self.position = position
-        self.aware = aware
+    __slots__ = ()
 
     def isHuman(self):
         """
@@ -102,3 +92,22 @@ class Character:
             Returns a boolean based on whether or not the character is dead.
         """
         return self.status == CharacterHealth.DEAD
+
+class Character(CharacterBase):
+    """
+        Character in the story.
+    """
+    __slots__ = ("ID", "name", "characterType", "gender", "appearance", "alive", "status",
+                 "timesMoved", "position", "aware")
+
+    def __init__(self, ID, name, characterType, gender, appearance, alive, status, timesMoved, position, aware):
+        self.ID = ID
+        self.name = name
+        self.characterType = characterType
+        self.gender = gender
+        self.appearance = appearance
+        self.alive = alive
+        self.status = status
+        self.timesMoved = timesMoved
+        self.position = position
+        self.aware = aware
@@ -0,0 +1,121 @@
+import os
+import pickle
+import tempfile
+
+CHECKPOINT_VERSION = 1
+
+class Checkpointer:
+    """
+        Saves everything needed to carry on telling a story every few rounds:
+        the story state, the roster, the state of the story's random number
+        generator, how much narration has been written, the database changes
+        still held in memory and the options the story was started with.
+    """
+    def __init__(self, fileName, every=5, arguments=None):
+        """
+            Brief: __init__
+
+            Param: fileName is the name of the checkpoint file.
+            Param: every is the number of rounds between checkpoints.
+            Param: arguments is a dictionary of the command line arguments the
+            story was started with, kept so it resumes the same way.
+        """
+        if(every < 1):
+            raise ValueError("rounds between checkpoints must be at least 1: %s" % every)
+
+        self.fileName = fileName
+        self.every = every
+        self.arguments = arguments
+        self.story = None
+        self.saves = 0
+
+    def bind(self, storyState, characters, dataConnection, sink, rng):
+        """
+            Brief: bind
+
+            Sets the story being checkpointed.
+        """
+        self.story = (storyState, characters, dataConnection, sink, rng)
+
+    def __call__(self, roundNumber):
+        if(roundNumber % self.every == 0):
+            self.save(roundNumber)
+
+    def save(self, roundNumber):
+        """
+            Brief: save
+
+            Writes a checkpoint taken at the start of a round.
+
+            Param: roundNumber is the number of rounds told so far.
+        """
+        storyState, characters, dataConnection, sink, rng = self.story
+
+        sink.flush()
+
+        checkpoint = {"version": CHECKPOINT_VERSION,
+                      "round": roundNumber,
+                      "story": storyState,
+                      "roster": characters,
+                      "rng": rng.getstate(),
+                      "narration": sink.written,
+                      "action_deltas": dataConnection.actionDeltas,
+                      "outcome_deltas": dataConnection.outcomeDeltas,
+                      "story_records": dataConnection.storyRecords,
+                      "arguments": self.arguments}
+
+        writeAtomically(self.fileName, pickle.dumps(checkpoint, pickle.HIGHEST_PROTOCOL))
+
+        self.saves += 1
+
+    def remove(self):
+        """
+            Brief: remove
+
+            Deletes the checkpoint file once the story it belongs to is over.
+        """
+        if(os.path.exists(self.fileName)):
+            os.remove(self.fileName)
+
+def writeAtomically(fileName, data):
+    """
+        Brief: writeAtomically
+
+        Writes a file so that it either keeps its old contents or has all of
+        the new ones, whenever the process stops. The data goes to a temporary
+        file in the same directory, which then replaces the file.
+
+        Param: fileName is the name of the file written.
+        Param: data is the bytes written.
+    """
+    directory = os.path.dirname(os.path.abspath(fileName))
+    descriptor, temporaryName = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporaryName, fileName)
+    except BaseException:
+        os.remove(temporaryName)
+        raise
+
+def loadCheckpoint(fileName):
+    """
+        Brief: loadCheckpoint
+
+        Reads a checkpoint written by a Checkpointer.
+
+        Param: fileName is the name of the checkpoint file.
+
+        Returns the checkpoint as a dictionary.
+    """
+    with open(fileName, "rb") as f:
+        checkpoint = pickle.load(f)
+
+    if(checkpoint.get("version") != CHECKPOINT_VERSION):
+        raise ValueError("unsupported checkpoint version in %s" % fileName)
+
+    return checkpoint
@@ -1,18 +1,72 @@
+import math
+import os
 import sqlite3
+import time
 
 from character import CharacterType
 from story import Story
 
+# Final tensions are counted in buckets this many to each doubling, so a
+# percentile read from story_tension_rollup is within about 2% of the true one
+TENSION_BUCKETS_PER_DOUBLING = 16
+
+# The types of the fields of a story record, in order
+STORY_RECORD_TYPES = (float, int, int, float, str, int, int, int, float)
+
 class Database:
     """
         Connection to the database file.
     """
+    def __init__(self, fileName="outcomes.db", persistent=False, deferred=False, logFile=None,
+                 compactRecords=10000, compactSeconds=30.0):
+        """
+            Brief: __init__
+
+            Param: fileName is the name of the database file.
+            Param: persistent keeps a single connection open for the lifetime of
+            the instance and holds the action_likelihood percentages in memory,
+            so lookups made during a search do not touch the database file.
+            Param: deferred (implies persistent) keeps updateAction and
+            updateOutcome in memory only. The recorded changes are collected
+            with takeDeltas and written later with applyDeltas. The percentages
+            used by getActionUsage stay as loaded until then, so a search does
+            not depend on what else was counted in the same batch.
+            Param: logFile (implies persistent) appends updateAction and
+            updateOutcome as records to an event log instead of updating the
+            tables, and the database runs in WAL mode. The log is compacted into
+            the tables in one transaction once it holds compactRecords records
+            or compactSeconds have passed, when the instance is closed, and when
+            it is opened again after a crash.
+            Param: compactRecords is the number of log records that triggers a
+            compaction.
+            Param: compactSeconds is the number of seconds after which a record
+            triggers a compaction.
+        """
+        self.fileName = fileName
+        self.persistent = persistent or deferred or logFile is not None
+        self.deferred = deferred
+        self.logFile = logFile
+        self.compactRecords = compactRecords
+        self.compactSeconds = compactSeconds
+        self.log = None
+        self.logRecords = 0
+        self.lastCompaction = None
+        self.connection = None
+        self.likelihoodCache = None
+        self.actionCounts = None
+        self.actionTotals = None
+        self.actionDeltas = {}
+        self.outcomeDeltas = {}
+        self.storyRecords = []
+
     def createDBAndTables(self):
         """
             Brief: createDBAndTables
 
-            Creates two tables (if they do not already exist) to store the
-            amount of times an outcomes has occurred.
+            Creates the tables (if they do not already exist) to store the
+            amount of times an outcomes has occurred. action_totals holds the
+            running number of actions taken by each agent type so percentages
+            can be updated without scanning action_likelihood.
         """
         conn = self.openConnection()
 
@@ -26,12 +80,70 @@ class Database:
                      PRIMARY KEY(action, agent_type));
             ''') 
 
+        c.execute('''CREATE TABLE IF NOT EXISTS action_totals
+                     (agent_type VARCHAR(10) PRIMARY KEY,
+                     times_used INT DEFAULT 0);
+            ''')
+
         c.execute('''CREATE TABLE IF NOT EXISTS story_outcomes 
                      (winner VARCHAR(10) PRIMARY KEY,
                      times_won INT DEFAULT 0,
                      UNIQUE(winner));
             ''')    
 
+        # How much of each event log is already in the tables
+        c.execute('''CREATE TABLE IF NOT EXISTS event_log
+                     (log_file VARCHAR(255) PRIMARY KEY,
+                     applied_bytes INT DEFAULT 0);
+            ''')
+
+        # One row per story told. Reports read the rollup tables below, which
+        # are updated with every story, so they never scan the history.
+        c.execute('''CREATE TABLE IF NOT EXISTS story_history
+                     (story_id INTEGER PRIMARY KEY,
+                     finished_at DOUBLE,
+                     roster_size INT,
+                     rounds INT,
+                     final_tension DOUBLE,
+                     winner VARCHAR(10),
+                     humans_survived INT,
+                     humans_escaped INT,
+                     monsters_survived INT,
+                     seconds DOUBLE);
+            ''')
+
+        c.execute('''CREATE INDEX IF NOT EXISTS story_history_finished
+                     ON story_history (finished_at);
+            ''')
+
+        c.execute('''CREATE INDEX IF NOT EXISTS story_history_roster_size
+                     ON story_history (roster_size, finished_at);
+            ''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS story_daily_rollup
+                     (day VARCHAR(10),
+                     roster_size INT,
+                     winner VARCHAR(10),
+                     stories INT DEFAULT 0,
+                     total_rounds INT DEFAULT 0,
+                     total_seconds DOUBLE DEFAULT 0,
+                     PRIMARY KEY(day, roster_size, winner));
+            ''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS story_length_rollup
+                     (roster_size INT,
+                     rounds INT,
+                     stories INT DEFAULT 0,
+                     PRIMARY KEY(roster_size, rounds));
+            ''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS story_tension_rollup
+                     (roster_size INT,
+                     bucket INT,
+                     stories INT DEFAULT 0,
+                     PRIMARY KEY(roster_size, bucket));
+            ''')
+
         self.closeConnection(conn)
 
     def insertRecords(self):
@@ -75,6 +187,12 @@ class Database:
         c.execute('''INSERT OR IGNORE INTO story_outcomes (winner, times_won)
                      VALUES ('human', 0);''')
 
+        # Seed the totals from any counts recorded before action_totals existed
+        c.execute('''INSERT OR IGNORE INTO action_totals (agent_type, times_used)
+                     SELECT [agent_type], SUM([times_used])
+                     FROM [action_likelihood]
+                     GROUP BY [agent_type];''')
+
         self.closeConnection(conn)
 
     def determinePercent(self, action, character):
@@ -91,23 +209,16 @@ class Database:
 
         c = conn.cursor()
 
-        c.execute('''SELECT *
-                     FROM [action_likelihood]
-                     WHERE [agent_type] = ?;''', (character,))
-
-        actionTotal = 0
-        allActionTotal = 0
+        c.execute('''SELECT l.[times_used], t.[times_used]
+                     FROM [action_likelihood] l
+                         JOIN [action_totals] t ON t.[agent_type] = l.[agent_type]
+                     WHERE l.[action] = ?
+                         AND l.[agent_type] = ?;''', (action, character))
 
-        results = c.fetchall()
+        row = c.fetchone()
 
-        for row in results:   
-            if(row[2] > 0):
-                allActionTotal += row[2]
-                if(row[0] == action):
-                    actionTotal = row[2]
-
-        if(allActionTotal > 0):
-            percent = actionTotal / float(allActionTotal)
+        if(row is not None and row[1] > 0):
+            percent = row[0] / float(row[1])
         else:
             percent = 0.0
 
@@ -123,6 +234,21 @@ class Database:
 
             Param: action is the action being referenced.
         """
+        if(self.deferred):
+            key = (action, character)
+            self.actionDeltas[key] = self.actionDeltas.get(key, 0) + 1
+
+            return
+
+        if(self.logFile is not None):
+            if(self.likelihoodCache is None):
+                self.loadActionUsage()
+
+            self.appendRecord("a\t%s\t%s\n" % (action, character))
+            self.countAction(action, character, 1)
+
+            return
+
         conn = self.openConnection()
 
         c = conn.cursor()
@@ -132,42 +258,373 @@ class Database:
                      WHERE [action] = ?
                          AND [agent_type] = ?;''', (action, character))
 
-        conn.commit()
-
-        for update in ["escaped", "investigated", "ran", "attacked"]:
-            c.execute('''UPDATE [action_likelihood]
-                         SET [percentage] = ?
-                         WHERE [action] = ?
-                             AND [agent_type] = ?;''', (self.determinePercent(update, character), update, character))
-            conn.commit()
+        c.execute('''UPDATE [action_totals]
+                     SET [times_used] = [times_used] + 1
+                     WHERE [agent_type] = ?;''', (character,))
 
+        # The agent type's total changed, so rescale its percentages in place
+        c.execute('''UPDATE [action_likelihood]
+                     SET [percentage] = CAST([times_used] AS DOUBLE) /
+                         (SELECT [times_used]
+                          FROM [action_totals]
+                          WHERE [agent_type] = ?)
+                     WHERE [agent_type] = ?;''', (character, character))
 
         self.closeConnection(conn)
 
-    def updateOutcome(self, storyState):
+        # Keep the in-memory counters in step with the tables
+        if(self.likelihoodCache is not None):
+            self.countAction(action, character, 1)
+
+    def countAction(self, action, character, times):
+        """
+            Brief: countAction
+
+            Adds to the in-memory count of an action and rescales the cached
+            percentages of the agent type.
+
+            Param: action is the action being referenced.
+            Param: character is the agent type that used the action.
+            Param: times is the number of uses to add.
+        """
+        self.actionCounts[(action, character)] += times
+        self.actionTotals[character] += times
+
+        total = float(self.actionTotals[character])
+
+        for key in self.actionCounts:
+            if(key[1] == character):
+                self.likelihoodCache[key] = self.actionCounts[key] / total
+
+    def updateOutcome(self, storyState, rounds=None, seconds=None):
         """
             Brief: updateOutcome
 
             Updates the 'winner' of the story. This is used for reference and to observe
-            the results of all the outcomes.
+            the results of all the outcomes. The story is also added to the story
+            history.
 
             Param: storyState is the state of the story.
+            Param: rounds is the number of rounds the story took, if known.
+            Param: seconds is how long the story took to tell, if known.
         """
-        conn = self.openConnection()
-
-        c = conn.cursor()
-
         if(storyState.numHumansDead == storyState.numHumans):
             winner = CharacterType.MONSTER
         else:
             winner = CharacterType.HUMAN
 
+        record = (time.time(), storyState.numHumans + storyState.numMonsters, rounds, storyState.tension,
+                  winner, storyState.numHumans - storyState.numHumansDead, storyState.numEscaped,
+                  storyState.numMonsters - storyState.numMonstersDead, seconds)
+
+        if(self.deferred):
+            self.outcomeDeltas[winner] = self.outcomeDeltas.get(winner, 0) + 1
+            self.storyRecords.append(record)
+
+            return
+
+        if(self.logFile is not None):
+            fields = ["" if field is None else str(field) for field in record]
+
+            self.appendRecord("o\t%s\ns\t%s\n" % (winner, "\t".join(fields)), 2)
+
+            return
+
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
         c.execute('''UPDATE [story_outcomes]
                      SET [times_won] = [times_won] + 1
                      WHERE [winner] = ?;''', (winner,))
 
+        self.writeStories(c, [record])
+
+        self.closeConnection(conn)
+
+    def takeDeltas(self):
+        """
+            Brief: takeDeltas
+
+            Hands over the changes recorded by a deferred instance and starts a
+            new, empty set.
+
+            Returns a tuple of the action deltas, keyed by (action, agent type),
+            the outcome deltas, keyed by winner, and the list of story records.
+        """
+        deltas = (self.actionDeltas, self.outcomeDeltas, self.storyRecords)
+
+        self.actionDeltas = {}
+        self.outcomeDeltas = {}
+        self.storyRecords = []
+
+        return deltas
+
+    def applyDeltas(self, actionDeltas, outcomeDeltas, storyRecords=()):
+        """
+            Brief: applyDeltas
+
+            Adds aggregated action and outcome counts to the tables in a single
+            transaction and recomputes the percentages of the agent types touched.
+
+            Param: actionDeltas maps (action, agent type) to the number of uses.
+            Param: outcomeDeltas maps a winner to the number of stories won.
+            Param: storyRecords is a list of stories to add to the history.
+        """
+        conn = self.openConnection()
+
+        self.writeDeltas(conn.cursor(), actionDeltas, outcomeDeltas, storyRecords)
+
         self.closeConnection(conn)
+
+        if(self.likelihoodCache is not None):
+            for key in actionDeltas:
+                self.countAction(key[0], key[1], actionDeltas[key])
  
+    def logDeltas(self, actionDeltas, outcomeDeltas, storyRecords=()):
+        """
+            Brief: logDeltas
+
+            Appends aggregated action and outcome counts to the event log as
+            the records updateAction and updateOutcome would have written, so
+            the changes a deferred story held reach the tables through the
+            log like those of any other story.
+
+            Param: actionDeltas maps (action, agent type) to the number of uses.
+            Param: outcomeDeltas maps a winner to the number of stories won.
+            Param: storyRecords is a list of stories to add to the history.
+        """
+        if(self.likelihoodCache is None):
+            self.loadActionUsage()
+
+        records = []
+
+        for key in actionDeltas:
+            records.extend(["a\t%s\t%s\n" % key] * actionDeltas[key])
+
+        for winner in outcomeDeltas:
+            records.extend(["o\t%s\n" % winner] * outcomeDeltas[winner])
+
+        for record in storyRecords:
+            records.append("s\t%s\n" % "\t".join("" if field is None else str(field) for field in record))
+
+        if(len(records) > 0):
+            self.appendRecord("".join(records), len(records))
+
+        for key in actionDeltas:
+            self.countAction(key[0], key[1], actionDeltas[key])
+
+    def writeDeltas(self, c, actionDeltas, outcomeDeltas, storyRecords=()):
+        """
+            Brief: writeDeltas
+
+            Adds aggregated action and outcome counts to the tables, without
+            committing, and recomputes the percentages of the agent types touched.
+
+            Param: c is a cursor of the open connection.
+            Param: actionDeltas maps (action, agent type) to the number of uses.
+            Param: outcomeDeltas maps a winner to the number of stories won.
+            Param: storyRecords is a list of stories to add to the history.
+        """
+        agentTypes = set()
+
+        for key in actionDeltas:
+            c.execute('''UPDATE [action_likelihood]
+                         SET [times_used] = [times_used] + ?
+                         WHERE [action] = ?
+                             AND [agent_type] = ?;''', (actionDeltas[key], key[0], key[1]))
+
+            c.execute('''UPDATE [action_totals]
+                         SET [times_used] = [times_used] + ?
+                         WHERE [agent_type] = ?;''', (actionDeltas[key], key[1]))
+
+            agentTypes.add(key[1])
+
+        for agentType in agentTypes:
+            c.execute('''UPDATE [action_likelihood]
+                         SET [percentage] = CAST([times_used] AS DOUBLE) /
+                             (SELECT [times_used]
+                              FROM [action_totals]
+                              WHERE [agent_type] = ?)
+                         WHERE [agent_type] = ?;''', (agentType, agentType))
+
+        for winner in outcomeDeltas:
+            c.execute('''UPDATE [story_outcomes]
+                         SET [times_won] = [times_won] + ?
+                         WHERE [winner] = ?;''', (outcomeDeltas[winner], winner))
+
+        if(len(storyRecords) > 0):
+            self.writeStories(c, storyRecords)
+
+    def writeStories(self, c, storyRecords):
+        """
+            Brief: writeStories
+
+            Adds stories to story_history and folds them into the rollup tables,
+            without committing. The rollups are aggregated first, so each table
+            takes one batched statement however many stories there are.
+
+            Param: c is a cursor of the open connection.
+            Param: storyRecords is a list of (finished at, roster size, rounds,
+            final tension, winner, humans survived, humans escaped, monsters
+            survived, seconds) tuples. Rounds and seconds may be None.
+        """
+        c.executemany('''INSERT INTO [story_history] (finished_at, roster_size, rounds, final_tension, winner,
+                             humans_survived, humans_escaped, monsters_survived, seconds)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);''', storyRecords)
+
+        days = {}
+        lengths = {}
+        tensions = {}
+
+        for record in storyRecords:
+            finishedAt, rosterSize, rounds, tension, winner = record[:5]
+            seconds = record[8]
+
+            key = (time.strftime("%Y-%m-%d", time.gmtime(finishedAt)), rosterSize, winner)
+            totals = days.get(key, (0, 0, 0.0))
+            days[key] = (totals[0] + 1, totals[1] + (rounds or 0), totals[2] + (seconds or 0.0))
+
+            if(rounds is not None):
+                lengths[(rosterSize, rounds)] = lengths.get((rosterSize, rounds), 0) + 1
+
+            key = (rosterSize, tensionBucket(tension))
+            tensions[key] = tensions.get(key, 0) + 1
+
+        c.executemany('''INSERT OR IGNORE INTO [story_daily_rollup] (day, roster_size, winner)
+                         VALUES (?, ?, ?);''', list(days))
+
+        c.executemany('''UPDATE [story_daily_rollup]
+                         SET [stories] = [stories] + ?,
+                             [total_rounds] = [total_rounds] + ?,
+                             [total_seconds] = [total_seconds] + ?
+                         WHERE [day] = ?
+                             AND [roster_size] = ?
+                             AND [winner] = ?;''', [days[key] + key for key in days])
+
+        c.executemany('''INSERT OR IGNORE INTO [story_length_rollup] (roster_size, rounds)
+                         VALUES (?, ?);''', list(lengths))
+
+        c.executemany('''UPDATE [story_length_rollup]
+                         SET [stories] = [stories] + ?
+                         WHERE [roster_size] = ?
+                             AND [rounds] = ?;''', [(lengths[key],) + key for key in lengths])
+
+        c.executemany('''INSERT OR IGNORE INTO [story_tension_rollup] (roster_size, bucket)
+                         VALUES (?, ?);''', list(tensions))
+
+        c.executemany('''UPDATE [story_tension_rollup]
+                         SET [stories] = [stories] + ?
+                         WHERE [roster_size] = ?
+                             AND [bucket] = ?;''', [(tensions[key],) + key for key in tensions])
+
+    def openLog(self):
+        """
+            Brief: openLog
+
+            Compacts whatever an earlier run left in the event log and opens it
+            for appending.
+        """
+        if(self.log is not None):
+            return
+
+        self.compactLog()
+
+        self.log = open(self.logFile, "a")
+
+    def appendRecord(self, record, count=1):
+        """
+            Brief: appendRecord
+
+            Appends a record to the event log, compacting the log once it is
+            large or old enough.
+
+            Param: record is the line appended.
+            Param: count is the number of records in it, when several lines
+            are appended at once.
+        """
+        self.openLog()
+
+        self.log.write(record)
+        self.log.flush()
+
+        self.logRecords += count
+
+        if(self.logRecords >= self.compactRecords
+           or time.monotonic() - self.lastCompaction >= self.compactSeconds):
+            self.compactLog()
+
+    def compactLog(self):
+        """
+            Brief: compactLog
+
+            Adds every complete record of the event log to the tables in one
+            transaction, then empties the log. The transaction also records how
+            far into the log it got, so if the process dies before the log is
+            emptied the same records are not counted twice.
+        """
+        if(self.log is not None):
+            self.log.flush()
+
+        self.lastCompaction = time.monotonic()
+        self.logRecords = 0
+
+        if(not os.path.exists(self.logFile)):
+            return
+
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        c.execute('''SELECT [applied_bytes]
+                     FROM [event_log]
+                     WHERE [log_file] = ?;''', (self.logFile,))
+
+        row = c.fetchone()
+        appliedBytes = row[0] if row is not None else 0
+
+        with open(self.logFile, "rb") as f:
+            # A log shorter than what was applied was emptied after it
+            if(appliedBytes > os.fstat(f.fileno()).st_size):
+                appliedBytes = 0
+
+            f.seek(appliedBytes)
+            data = f.read()
+
+        # A record cut short by a crash is dropped
+        end = data.rfind(b"\n") + 1
+
+        actionDeltas = {}
+        outcomeDeltas = {}
+        storyRecords = []
+
+        for line in data[:end].decode("utf-8").splitlines():
+            fields = line.split("\t")
+
+            if(fields[0] == "a"):
+                key = (fields[1], fields[2])
+                actionDeltas[key] = actionDeltas.get(key, 0) + 1
+            elif(fields[0] == "o"):
+                outcomeDeltas[fields[1]] = outcomeDeltas.get(fields[1], 0) + 1
+            elif(fields[0] == "s"):
+                storyRecords.append(parseStoryRecord(fields[1:]))
+
+        self.writeDeltas(c, actionDeltas, outcomeDeltas, storyRecords)
+
+        c.execute('''INSERT OR REPLACE INTO [event_log] (log_file, applied_bytes)
+                     VALUES (?, ?);''', (self.logFile, appliedBytes + end))
+
+        self.closeConnection(conn)
+
+        with open(self.logFile, "r+b") as f:
+            f.truncate(0)
+
+        c.execute('''UPDATE [event_log]
+                     SET [applied_bytes] = 0
+                     WHERE [log_file] = ?;''', (self.logFile,))
+
+        self.closeConnection(conn)
+
     def closeConnection(self, conn):
         """
             Brief: closeConnection
@@ -177,19 +634,102 @@ class Database:
             Param: conn is the connection to the database.
         """
         conn.commit()
-        conn.close()
+
+        if(not self.persistent):
+            conn.close()
 
     def openConnection(self):
         """
             Brief: openConnection
 
-            Opens the connection to the database.
+            Opens the connection to the database. In persistent mode the same
+            connection is reused by every call.
 
             Returns the connection to the database.
         """
-        conn = sqlite3.connect("outcomes.db")
+        if(not self.persistent):
+            return sqlite3.connect(self.fileName)
+
+        if(self.connection is None):
+            self.connection = sqlite3.connect(self.fileName)
+
+            # Readers keep seeing the last compaction while the next is written
+            if(self.logFile is not None):
+                self.connection.execute("PRAGMA journal_mode=WAL;")
+
+        return self.connection
+
+    def close(self):
+        """
+            Brief: close
+
+            Closes the long-lived connection of a persistent instance and drops
+            the cached percentages. The event log, if any, is compacted first.
+        """
+        if(self.log is not None):
+            self.compactLog()
+            self.log.close()
+            self.log = None
+
+        if(self.connection is not None):
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+        self.likelihoodCache = None
+        self.actionCounts = None
+        self.actionTotals = None
+
+    def loadActionUsage(self):
+        """
+            Brief: loadActionUsage
+
+            Reads every row of action_likelihood into the in-memory counters and
+            percentages used by getActionUsage in persistent mode. Records left
+            in the event log are compacted first so they are counted.
+        """
+        if(self.logFile is not None):
+            self.openLog()
+
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        c.execute('''SELECT [action], [agent_type], [times_used], [percentage]
+                     FROM [action_likelihood];''')
+
+        self.likelihoodCache = {}
+        self.actionCounts = {}
+        self.actionTotals = {}
+
+        for row in c.fetchall():
+            self.likelihoodCache[(row[0], row[1])] = row[3]
+            self.actionCounts[(row[0], row[1])] = row[2]
+            self.actionTotals[row[1]] = self.actionTotals.get(row[1], 0) + row[2]
+
+        self.closeConnection(conn)
+
+    def snapshot(self):
+        """
+            Brief: snapshot
 
-        return conn
+            Makes a deferred instance holding a copy of the current in-memory
+            counters and percentages. It never opens the database file, so
+            many can be used at once, from any thread; their changes are
+            collected with takeDeltas and written through this instance.
+
+            Returns the new Database.
+        """
+        if(self.likelihoodCache is None):
+            self.loadActionUsage()
+
+        snapshot = Database(self.fileName, deferred=True)
+
+        snapshot.likelihoodCache = dict(self.likelihoodCache)
+        snapshot.actionCounts = dict(self.actionCounts)
+        snapshot.actionTotals = dict(self.actionTotals)
+
+        return snapshot
 
     def getActionUsage(self, action, character):
         """
@@ -201,6 +741,12 @@ class Database:
 
             Returns the percentage.
         """
+        if(self.persistent):
+            if(self.likelihoodCache is None):
+                self.loadActionUsage()
+
+            return self.likelihoodCache[(action, character)]
+
         conn = self.openConnection()
 
         c = conn.cursor()
@@ -235,3 +781,192 @@ class Database:
 
         for outcome in outcomes:
             print("%s: %s" % (outcome[0], outcome[1]))
+
+    def getWinRates(self, rosterSize=None, since=None):
+        """
+            Brief: getWinRates
+
+            Reads the human and monster wins of every day from the daily rollup.
+
+            Param: rosterSize limits the counts to rosters of that size.
+            Param: since is the first day counted, as "YYYY-MM-DD".
+
+            Returns a list of (day, stories, human wins, monster wins) tuples in
+            day order.
+        """
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        c.execute('''SELECT [day],
+                         SUM([stories]),
+                         SUM(CASE WHEN [winner] = ? THEN [stories] ELSE 0 END),
+                         SUM(CASE WHEN [winner] = ? THEN [stories] ELSE 0 END)
+                     FROM [story_daily_rollup]
+                     WHERE (? IS NULL OR [roster_size] = ?)
+                         AND (? IS NULL OR [day] >= ?)
+                     GROUP BY [day]
+                     ORDER BY [day];''', (CharacterType.HUMAN, CharacterType.MONSTER,
+                                           rosterSize, rosterSize, since, since))
+
+        rows = c.fetchall()
+
+        self.closeConnection(conn)
+
+        return rows
+
+    def getStoryLengths(self, rosterSize=None):
+        """
+            Brief: getStoryLengths
+
+            Reads how many stories took each number of rounds from the length
+            rollup.
+
+            Param: rosterSize limits the counts to rosters of that size.
+
+            Returns a list of (rounds, stories) tuples in order of rounds.
+        """
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        c.execute('''SELECT [rounds], SUM([stories])
+                     FROM [story_length_rollup]
+                     WHERE (? IS NULL OR [roster_size] = ?)
+                     GROUP BY [rounds]
+                     ORDER BY [rounds];''', (rosterSize, rosterSize))
+
+        rows = c.fetchall()
+
+        self.closeConnection(conn)
+
+        return rows
+
+    def getTensionPercentiles(self, percentiles=(50, 90, 99)):
+        """
+            Brief: getTensionPercentiles
+
+            Finds percentiles of the final tension of the stories of each roster
+            size from the tension rollup.
+
+            Param: percentiles is a list of percentiles between 0 and 100.
+
+            Returns a dictionary mapping each roster size to a tuple of the
+            number of stories and a dictionary of percentile to tension.
+        """
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        c.execute('''SELECT [roster_size], [bucket], [stories]
+                     FROM [story_tension_rollup]
+                     WHERE [stories] > 0
+                     ORDER BY [roster_size], [bucket];''')
+
+        buckets = {}
+
+        for rosterSize, bucket, stories in c.fetchall():
+            buckets.setdefault(rosterSize, []).append((bucket, stories))
+
+        self.closeConnection(conn)
+
+        results = {}
+
+        for rosterSize in buckets:
+            total = sum(stories for bucket, stories in buckets[rosterSize])
+            values = {}
+
+            for percentile in percentiles:
+                target = percentile / 100.0 * total
+                seen = 0
+
+                for bucket, stories in buckets[rosterSize]:
+                    seen += stories
+
+                    if(seen >= target):
+                        values[percentile] = bucketTension(bucket)
+                        break
+
+            results[rosterSize] = (total, values)
+
+        return results
+
+    def getStories(self, rosterSize=None, since=None, limit=20):
+        """
+            Brief: getStories
+
+            Reads the most recent stories of the history, newest first.
+
+            Param: rosterSize limits the stories to rosters of that size.
+            Param: since is the earliest finishing time read, in seconds since
+            the epoch.
+            Param: limit is the largest number of stories read.
+
+            Returns a list of story records.
+        """
+        conn = self.openConnection()
+
+        c = conn.cursor()
+
+        if(rosterSize is None):
+            c.execute('''SELECT [finished_at], [roster_size], [rounds], [final_tension], [winner],
+                             [humans_survived], [humans_escaped], [monsters_survived], [seconds]
+                         FROM [story_history]
+                         WHERE [finished_at] >= ?
+                         ORDER BY [finished_at] DESC
+                         LIMIT ?;''', (since or 0.0, limit))
+        else:
+            c.execute('''SELECT [finished_at], [roster_size], [rounds], [final_tension], [winner],
+                             [humans_survived], [humans_escaped], [monsters_survived], [seconds]
+                         FROM [story_history]
+                         WHERE [roster_size] = ?
+                             AND [finished_at] >= ?
+                         ORDER BY [finished_at] DESC
+                         LIMIT ?;''', (rosterSize, since or 0.0, limit))
+
+        rows = c.fetchall()
+
+        self.closeConnection(conn)
+
+        return rows
+
+def tensionBucket(tension):
+    """
+        Brief: tensionBucket
+
+        Returns the story_tension_rollup bucket of a final tension. Buckets are
+        logarithmic in the size of the tension and keep its sign.
+    """
+    bucket = int(round(math.log2(1 + abs(tension)) * TENSION_BUCKETS_PER_DOUBLING))
+
+    return bucket if tension >= 0 else -bucket
+
+def bucketTension(bucket):
+    """
+        Brief: bucketTension
+
+        Returns the tension a story_tension_rollup bucket stands for.
+    """
+    tension = 2 ** (abs(bucket) / float(TENSION_BUCKETS_PER_DOUBLING)) - 1
+
+    return tension if bucket >= 0 else -tension
+
+def parseStoryRecord(fields):
+    """
+        Brief: parseStoryRecord
+
+        Reads a story record written to the event log.
+
+        Param: fields is the list of tab-separated fields after the record type.
+
+        Returns the story record tuple.
+    """
+    record = []
+
+    for i in range(len(STORY_RECORD_TYPES)):
+        if(fields[i] == ""):
+            record.append(None)
+        else:
+            record.append(STORY_RECORD_TYPES[i](fields[i]))
+
+    return tuple(record)
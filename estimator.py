@@ -0,0 +1,201 @@
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from character import CharacterType
+from database import Database
+from lockstep import simulateLockstep
+from storyCreator import addSearchArguments, addWorldArguments, simulateStories
+
+# How the stories of an estimate are told: one at a time with the search
+# engine, or all at once with the action the search falls back on
+ENGINES = {"lockstep": simulateLockstep,
+           "search": simulateStories}
+
+def wilsonInterval(wins, stories, confidence=0.95):
+    """
+        Brief: wilsonInterval
+
+        Computes the Wilson score interval of a win rate, which stays inside
+        [0, 1] and behaves well for rates near 0 or 1 and for few stories.
+
+        Param: wins is the number of stories won.
+        Param: stories is the number of stories told.
+        Param: confidence is the confidence level of the interval.
+
+        Returns a tuple of the lower and upper bounds.
+    """
+    if(stories == 0):
+        return 0.0, 1.0
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = wins / float(stories)
+
+    centre = (rate + z * z / (2 * stories)) / (1 + z * z / stories)
+    margin = z * math.sqrt(rate * (1 - rate) / stories + z * z / (4 * stories * stories)) / (1 + z * z / stories)
+
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def estimateWinRates(fileName, maxStories, numWorkers=1, databaseName="outcomes.db", options=None,
+                     masterSeed=None, confidence=0.95, targetMargin=None, batchSize=200, engine="search"):
+    """
+        Brief: estimateWinRates
+
+        Estimates how often humans and monsters win stories told with a roster.
+        Stories are told headless in batches, across a pool of worker processes
+        if there is more than one, against the likelihoods currently in the
+        database, which are neither updated nor written, so every story is
+        drawn from the same distribution. Batches stop once the confidence
+        interval of the human win rate is narrower than the target margin on
+        either side.
+
+        The search engine tells story i as "storyCreator.py simulate" does with
+        the same seed, which costs as much as the search. The lockstep engine
+        tells each batch at once as a StoryBatch, which gives exactly the
+        estimate of the search engine with --search-budget-nodes 0, the
+        search options being otherwise ignored.
+
+        Param: fileName is the name of the file containing the character names.
+        Param: maxStories is the largest number of stories told.
+        Param: numWorkers is the number of worker processes.
+        Param: databaseName is the database file the likelihoods are read from.
+        Param: options holds the parsed search and world arguments, or None
+        for defaults.
+        Param: masterSeed is the seed of the stories. A random one is used if
+        it is None.
+        Param: confidence is the confidence level of the intervals.
+        Param: targetMargin is the half-width the interval must shrink to
+        before the estimate stops early, or None to tell maxStories stories.
+        Param: batchSize is the number of stories each worker tells between
+        checks of the interval.
+        Param: engine is "search" or "lockstep".
+
+        Returns a dictionary of the estimate.
+    """
+    if(masterSeed is None):
+        masterSeed = random.randrange(2 ** 32)
+
+    dataConnection = Database(databaseName)
+
+    dataConnection.createDBAndTables()
+    dataConnection.insertRecords()
+
+    simulate = ENGINES[engine]
+    numWorkers = max(1, numWorkers)
+    wins = {CharacterType.HUMAN: 0, CharacterType.MONSTER: 0}
+    stories = 0
+    pool = None
+
+    start = time.time()
+
+    if(numWorkers > 1):
+        pool = ProcessPoolExecutor(max_workers=numWorkers)
+
+    try:
+        while(stories < maxStories):
+            batches = []
+
+            for i in range(numWorkers):
+                size = min(batchSize, maxStories - stories - sum(batches))
+
+                if(size > 0):
+                    batches.append(size)
+
+            firstStories = [stories + sum(batches[:i]) for i in range(len(batches))]
+
+            if(pool is None):
+                results = [simulate(fileName, firstStories[0], batches[0], databaseName, masterSeed, options)]
+            else:
+                results = pool.map(simulate, [fileName] * len(batches), firstStories, batches,
+                                   [databaseName] * len(batches), [masterSeed] * len(batches),
+                                   [options] * len(batches))
+
+            for actionDeltas, outcomeDeltas, storyRecords in results:
+                for winner in outcomeDeltas:
+                    wins[winner] += outcomeDeltas[winner]
+
+            stories += sum(batches)
+
+            if(targetMargin is not None):
+                lower, upper = wilsonInterval(wins[CharacterType.HUMAN], stories, confidence)
+
+                if((upper - lower) / 2 <= targetMargin):
+                    break
+    finally:
+        if(pool is not None):
+            pool.shutdown()
+
+    elapsed = time.time() - start
+
+    estimate = {"roster": fileName,
+                "engine": engine,
+                "seed": masterSeed,
+                "stories": stories,
+                "confidence": confidence,
+                "seconds": elapsed,
+                "stories_per_second": stories / elapsed if elapsed > 0 else float("inf")}
+
+    for winner in [CharacterType.HUMAN, CharacterType.MONSTER]:
+        lower, upper = wilsonInterval(wins[winner], stories, confidence)
+
+        estimate[winner] = {"wins": wins[winner],
+                            "win_rate": wins[winner] / float(stories) if stories > 0 else 0.0,
+                            "interval": [lower, upper]}
+
+    return estimate
+
+def parseArguments(argv):
+    """
+        Brief: parseArguments
+
+        Parses the command line.
+
+        Param: argv is the list of command line arguments, without the program name.
+
+        Returns the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog="estimator.py",
+                                     description="Estimate how often humans and monsters win with a roster.")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="search",
+                        help="tell each story with the search engine (search), or every batch at once with the "
+                             "action the search falls back on, as --search-budget-nodes 0 does (lockstep)")
+    parser.add_argument("--stories", type=int, default=10000,
+                        help="largest number of stories told")
+    parser.add_argument("--margin", type=float, default=None,
+                        help="stop once the interval of the win rate is within this much of the estimate")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="confidence level of the intervals")
+    parser.add_argument("--batch", type=int, default=200,
+                        help="stories each worker tells between checks of the margin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the stories (random if omitted)")
+    parser.add_argument("--database", default="outcomes.db",
+                        help="database file the likelihoods are read from")
+    parser.add_argument("--output", default=None,
+                        help="file the JSON estimate is written to instead of standard output")
+    addWorldArguments(parser)
+    addSearchArguments(parser)
+    parser.add_argument("roster", help="file containing the character names")
+
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parseArguments(sys.argv[1:])
+
+    estimate = estimateWinRates(args.roster, args.stories, args.workers, args.database, args,
+                                args.seed, args.confidence, args.margin, args.batch, args.engine)
+
+    if(args.output is not None):
+        with open(args.output, "w") as f:
+            json.dump(estimate, f, indent=2)
+    else:
+        print(json.dumps(estimate, indent=2))
@@ -0,0 +1,332 @@
+from array import array
+
+from character import CharacterType
+from database import Database
+from outcome import ESCAPE_ROLL, KILL_ROLL
+from roster import Roster
+from rules import ACTION_CODES, ACTIONS, ATTACKED, DEFAULT_RULES, ESCAPED, INVESTIGATED, RAN
+from story import Story
+from storyCreator import buildRoster, loadWorld, readRoster, storyRandom
+from world import DEFAULT_WORLD
+
+class StoryBatch:
+    """
+        Tells many headless stories of one roster at once, a round at a time.
+        Every attribute of every character of every story is one slot of a
+        flat array, at story * width + character, and the story counters are
+        arrays indexed by story. A round chooses the actions of every story
+        still going, then carries out the first character's action in each of
+        them, then the second's, and so on, so the same few lines of code run
+        over all the stories in turn.
+
+        No search runs: every character takes the action the search engines
+        fall back on when their budget runs out, the legal action whose
+        immediate tension is best for it, as Action.getDefaultAction chooses
+        it. The rolls are those of actionOutcome and the world's moves, drawn
+        in the same order from the random number generator of each story, so
+        story i plays out exactly as story i of "storyCreator.py simulate
+        --search-budget-nodes 0" with the same seed, whatever else is in the
+        batch. Nothing is narrated.
+    """
+    def __init__(self, entries, rngs, successorTable, world=None, rules=None):
+        """
+            Brief: __init__
+
+            Rolls the characters of every story with buildRoster.
+
+            Param: entries is a list of roster entries, like those read by
+            readRoster.
+            Param: rngs is the list of the random number generators of the
+            stories, one per story.
+            Param: successorTable is the successor table of the rules with the
+            likelihoods the stories are told against.
+            Param: world is the World of the stories. It defaults to the four
+            positions in a row.
+            Param: rules is the RuleTable of legal actions. It defaults to the
+            rules in rules.py.
+        """
+        if(world is None):
+            world = DEFAULT_WORLD
+
+        if(rules is None):
+            rules = DEFAULT_RULES
+
+        numStories = len(rngs)
+
+        # One slot more than the roster for the character added when the
+        # roster rolls only one type
+        width = len(entries) + 1
+
+        self.world = world
+        self.rules = rules
+        self.successorTable = successorTable
+        self.rngs = rngs
+        self.width = width
+        self.numStories = numStories
+
+        # Positions run from -1, for the escaped, to the highest location
+        self.positionSlots = max(world.locations) + 2
+
+        self.types = array("b", bytes(numStories * width))
+        self.alive = array("b", bytes(numStories * width))
+        self.aware = array("b", bytes(numStories * width))
+        self.positions = array("l", [-1]) * (numStories * width)
+        self.occupants = array("l", [0]) * (numStories * self.positionSlots * 2)
+
+        self.numHumans = array("l", [0]) * numStories
+        self.numMonsters = array("l", [0]) * numStories
+        self.numHumansDead = array("l", [0]) * numStories
+        self.numEscaped = array("l", [0]) * numStories
+        self.numMonstersDead = array("l", [0]) * numStories
+        self.tension = array("d", [0.0]) * numStories
+        self.rounds = array("l", [0]) * numStories
+        self.sizes = array("l", [0]) * numStories
+        self.complete = array("b", bytes(numStories))
+
+        # Number of times each action was taken by each type
+        self.actionCounts = array("l", [0]) * (len(ACTIONS) * 2)
+
+        for story in range(numStories):
+            roster = buildRoster(entries, Story(0.0, 0, 0, 0, 0, 0, False), rngs[story], world)
+
+            for index in range(len(roster)):
+                self.addCharacter(story, index, roster.types[index], roster.positions[index])
+
+            self.sizes[story] = len(roster)
+
+        # The legal actions of every situation with the transition of each
+        self.choices = []
+
+        for code in range(len(rules.legalActions)):
+            self.choices.append([(ACTION_CODES[action],
+                                  successorTable[code * len(ACTIONS) + ACTION_CODES[action]])
+                                 for action in rules.legalActions[code]])
+
+    def addCharacter(self, story, index, typeCode, position):
+        slot = story * self.width + index
+
+        self.types[slot] = typeCode
+        self.alive[slot] = 1
+        self.positions[slot] = position
+        self.occupants[(story * self.positionSlots + position + 1) * 2 + typeCode] += 1
+
+        if(typeCode == Roster.HUMAN):
+            self.numHumans[story] += 1
+        else:
+            self.numMonsters[story] += 1
+
+    def run(self):
+        """
+            Brief: run
+
+            Tells every story to its end.
+        """
+        active = list(range(self.numStories))
+
+        while(len(active) > 0):
+            roundActions = [self.chooseActions(story) for story in active]
+
+            for index in range(self.width):
+                for i in range(len(active)):
+                    story = active[i]
+
+                    if(self.complete[story] == 0 and index < len(roundActions[i])):
+                        self.playAction(story, index, roundActions[i][index])
+
+            for story in active:
+                self.rounds[story] += 1
+
+            active = [story for story in active if self.complete[story] == 0]
+
+    def chooseActions(self, story):
+        """
+            Brief: chooseActions
+
+            Chooses the actions of a story's characters for the round from
+            their situations at its start, as getDefaultAction does, and moves
+            its tension on by them in roster order.
+
+            Returns the list of the action code of each character.
+        """
+        width = self.width
+        base = story * width
+        types = self.types
+        aware = self.aware
+        positions = self.positions
+        occupants = self.occupants
+        occupantBase = story * self.positionSlots
+        choices = self.choices
+
+        startTension = self.tension[story]
+        tension = startTension
+        actions = [None] * self.sizes[story]
+
+        for index in range(len(actions)):
+            slot = base + index
+            typeCode = types[slot]
+
+            conflict = occupants[(occupantBase + positions[slot] + 1) * 2 + 1 - typeCode] > 0
+            situation = typeCode * 8 + aware[slot] * 2 + conflict
+            legal = choices[situation]
+
+            chosen = None
+            chosenTension = None
+
+            for action, transition in legal:
+                if(transition is None):
+                    nextTension = startTension
+                else:
+                    nextTension = (startTension + transition[0]) * transition[1]
+
+                if(chosen is None
+                   or (typeCode == Roster.MONSTER and nextTension > chosenTension)
+                   or (typeCode == Roster.HUMAN and nextTension < chosenTension)):
+                    chosen = (action, transition)
+                    chosenTension = nextTension
+
+            actions[index] = chosen[0]
+
+            if(chosen[1] is not None):
+                tension = (tension + chosen[1][0]) * chosen[1][1]
+
+        self.tension[story] = tension
+
+        return actions
+
+    def playAction(self, story, index, action):
+        """
+            Brief: playAction
+
+            Carries out one character's action in a story, as playRound and
+            actionOutcome do, and ends the story once a side has won.
+        """
+        width = self.width
+        slot = story * width + index
+
+        if(self.alive[slot] == 0 or self.positions[slot] == -1):
+            return
+
+        typeCode = self.types[slot]
+        occupantBase = story * self.positionSlots
+        conflict = self.occupants[(occupantBase + self.positions[slot] + 1) * 2 + 1 - typeCode] > 0
+
+        # Attacks with nobody to attack are skipped
+        if(action == ACTION_CODES[ATTACKED] and not conflict):
+            return
+
+        rng = self.rngs[story]
+
+        self.actionCounts[action * 2 + typeCode] += 1
+
+        if(action == ACTION_CODES[ATTACKED]):
+            roll = rng.randint(1, 100)
+
+            if((typeCode == Roster.HUMAN and roll <= KILL_ROLL)
+               or (typeCode == Roster.MONSTER and roll > KILL_ROLL)):
+                # The first living character of the other type, wherever it is
+                for target in range(story * width, story * width + width):
+                    if(self.alive[target] == 1 and self.types[target] != typeCode):
+                        self.alive[target] = 0
+
+                        if(typeCode == Roster.HUMAN):
+                            self.numMonstersDead[story] += 1
+                        else:
+                            self.numHumansDead[story] += 1
+
+                        break
+        elif(action == ACTION_CODES[ESCAPED]):
+            if(rng.randint(1, 100) <= ESCAPE_ROLL):
+                self.moveCharacter(story, slot, -1)
+                self.numEscaped[story] += 1
+        elif(action == ACTION_CODES[INVESTIGATED]):
+            position = self.world.investigateMove(self.positions[slot], rng)
+            found = rng.randint(1, 2) == 1
+
+            self.moveCharacter(story, slot, position)
+
+            if(found and self.occupants[(occupantBase + position + 1) * 2 + 1 - typeCode] > 0):
+                self.aware[slot] = 1
+        elif(action == ACTION_CODES[RAN]):
+            self.moveCharacter(story, slot, self.world.fleeMove(self.positions[slot], rng))
+
+        if((self.numHumansDead[story] + self.numEscaped[story]) == self.numHumans[story]
+           or self.numMonstersDead[story] == self.numMonsters[story]):
+            self.complete[story] = 1
+
+    def moveCharacter(self, story, slot, position):
+        typeCode = self.types[slot]
+        occupantBase = story * self.positionSlots
+
+        self.occupants[(occupantBase + self.positions[slot] + 1) * 2 + typeCode] -= 1
+        self.occupants[(occupantBase + position + 1) * 2 + typeCode] += 1
+
+        self.positions[slot] = position
+
+    def winner(self, story):
+        """
+            Brief: winner
+
+            Returns the winner of a finished story, as updateOutcome decides it.
+        """
+        if(self.numHumansDead[story] == self.numHumans[story]):
+            return CharacterType.MONSTER
+
+        return CharacterType.HUMAN
+
+    def deltas(self):
+        """
+            Brief: deltas
+
+            Returns a tuple of the action deltas, keyed by (action, agent type),
+            and the outcome deltas, keyed by winner, of the batch.
+        """
+        actionDeltas = {}
+        outcomeDeltas = {}
+
+        for action in ACTIONS:
+            for typeCode in range(2):
+                times = self.actionCounts[ACTION_CODES[action] * 2 + typeCode]
+
+                if(times > 0):
+                    actionDeltas[(action, Roster.TYPES[typeCode])] = times
+
+        for story in range(self.numStories):
+            winner = self.winner(story)
+            outcomeDeltas[winner] = outcomeDeltas.get(winner, 0) + 1
+
+        return actionDeltas, outcomeDeltas
+
+def simulateLockstep(fileName, firstStory, numStories, databaseName, masterSeed, options=None):
+    """
+        Brief: simulateLockstep
+
+        Tells a number of headless stories at once with a StoryBatch, against
+        the likelihoods in the database. Story i draws from the same random
+        number generator as story i of a simulate batch with the same seed and
+        plays out the same as it does when the search has no budget.
+
+        Param: fileName is the name of the file containing the character names.
+        Param: firstStory is the index of the first story in the batch.
+        Param: numStories is the number of stories to tell.
+        Param: databaseName is the database file the likelihoods are read from.
+        Param: masterSeed is the seed of the batch.
+        Param: options holds the parsed world arguments, or None for defaults.
+
+        Returns a tuple of the action deltas, the outcome deltas and the story
+        records, like simulateStories. No story records are kept.
+    """
+    dataConnection = Database(databaseName, deferred=True)
+    dataConnection.loadActionUsage()
+
+    world = loadWorld(options)
+
+    rngs = [storyRandom(masterSeed, story) for story in range(firstStory, firstStory + numStories)]
+
+    batch = StoryBatch(list(readRoster(fileName)), rngs, DEFAULT_RULES.successorTable(dataConnection), world)
+    batch.run()
+
+    dataConnection.close()
+
+    actionDeltas, outcomeDeltas = batch.deltas()
+
+    return actionDeltas, outcomeDeltas, []
@@ -0,0 +1,288 @@
+import math
+import random
+import time
+
+from action import Action
+from outcome import playRound
+from roster import Roster
+from rules import ACTION_CODES
+
+class SearchNode:
+    """
+        A node of the search tree of a round: the actions of the characters
+        before it have been chosen. Its children are keyed by the action of
+        the next character able to act.
+    """
+    __slots__ = ("visits", "total", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}
+
+class MonteCarloSearch(Action):
+    """
+        Chooses the characters' actions with a Monte Carlo tree search instead
+        of searching every combination of actions. The tree of a round has a
+        level for each character able to act, in roster order, like the levels
+        of the minimax search, and is kept across the playouts of the round.
+        Each playout walks down the tree choosing actions with UCB1, adds one
+        new node, gives the characters below it random legal actions, carries
+        the round out with the real outcome chances of the story and then
+        plays random legal actions for a few more rounds. The tension the
+        playout ends at is its reward: monsters want it high and humans want
+        it low.
+
+        Like every search engine, getAction returns one action for each
+        character of the roster and sets the tension of the story to the one
+        the chosen actions lead to. The characters take the actions along the
+        most visited path of the tree. Characters below the end of that path,
+        and the dead and escaped, whose actions are never carried out, take
+        the greedy default action.
+    """
+
+    # Weight of the exploration term of UCB1
+    EXPLORATION = math.sqrt(2)
+
+    def __init__(self, dataConnection=None, transpositionTable=None, timeBudget=None, nodeBudget=None,
+                 rules=None, playRound=playRound, playouts=200, horizon=3, rng=None,
+                 seedFrom=None):
+        """
+            Brief: __init__
+
+            The transposition table is not used: the tree is
+            built again every round and tries every action before it has
+            statistics.
+
+            Param: playRound carries a round's actions out on a story and its
+            roster. It defaults to the one stories are told with.
+            Param: playouts is the number of playouts of a round.
+            Param: horizon is the number of rounds a playout lasts, counting the
+            round being chosen.
+            Param: rng is the random number generator the playouts are drawn
+            from. It defaults to a generator of the engine's own, so playouts
+            never draw from the story's.
+            Param: seedFrom is an optional random number generator that rng is
+            seeded from at the start of every round. Its state is read, never
+            advanced, so passing the story's keeps a seeded story the same
+            when it is told again or resumed.
+            Param: timeBudget and nodeBudget stop the playouts of a round early.
+            The node budget counts the rounds played out.
+        """
+        Action.__init__(self, dataConnection, None, timeBudget, nodeBudget, rules)
+
+        if(rng is None):
+            rng = random.Random()
+
+        self.playRound = playRound
+        self.playouts = playouts
+        self.horizon = horizon
+        self.rng = rng
+        self.seedFrom = seedFrom
+        self.playoutsRun = 0
+
+    def chooseActions(self, storyState, characters):
+        # The words of the generator's state, which hash the same in every run
+        if(self.seedFrom is not None):
+            self.rng.seed(hash(self.seedFrom.getstate()[1]))
+
+        acting = []
+        chosenActions = [None] * len(characters)
+
+        for index in range(len(characters)):
+            if(characters.alive[index] == 0 or characters.positions[index] == -1):
+                chosenActions[index] = self.getDefaultAction(storyState, characters, index)
+            else:
+                acting.append(index)
+
+        root = SearchNode()
+        bounds = [float("inf"), float("-inf")]
+
+        self.playoutsRun = 0
+
+        while(self.playoutsRun < self.playouts and not self.budgetSpent()):
+            playoutActions = list(chosenActions)
+            path = [root]
+            node = root
+
+            for index in acting:
+                # Below the new node the characters act at random
+                if(node is None):
+                    playoutActions[index] = self.rng.choice(self.legalActions[index])
+                    continue
+
+                action = self.selectAction(node, self.legalActions[index], characters.types[index], bounds)
+                child = node.children.get(action)
+
+                if(child is None):
+                    child = SearchNode()
+                    node.children[action] = child
+                    node = None
+                else:
+                    node = child
+
+                path.append(child)
+                playoutActions[index] = action
+
+            reward = self.playout(storyState, characters, playoutActions)
+
+            bounds[0] = min(bounds[0], reward)
+            bounds[1] = max(bounds[1], reward)
+
+            for visited in path:
+                visited.visits += 1
+                visited.total += reward
+
+            self.playoutsRun += 1
+
+        node = root
+
+        for index in acting:
+            action = None
+
+            if(node is not None):
+                action = self.mostVisited(node)
+
+            if(action is None):
+                chosenActions[index] = self.getDefaultAction(storyState, characters, index)
+                node = None
+            else:
+                chosenActions[index] = action
+                node = node.children[action]
+
+        # The tension the chosen actions lead to when taken in roster order
+        state = storyState.copy()
+
+        for index in range(len(characters)):
+            self.makeMove(state, characters[index], chosenActions[index])
+
+        return state.tension, chosenActions
+
+    def budgetSpent(self):
+        """
+            Brief: budgetSpent
+
+            Returns whether the time or node budget of the round has run out.
+        """
+        if(self.deadline is not None and time.perf_counter() > self.deadline):
+            return True
+
+        return self.nodeBudget is not None and self.nodesSearched >= self.nodeBudget
+
+    def selectAction(self, node, legalActions, typeCode, bounds):
+        """
+            Brief: selectAction
+
+            Picks the action of the character choosing at a node with UCB1.
+            Actions never tried come first, in the order of the legal actions.
+
+            Param: node is the SearchNode the character chooses at.
+            Param: legalActions is the list of the character's legal actions.
+            Param: typeCode is the roster type code of the character.
+            Param: bounds holds the lowest and highest rewards seen, which
+            scale the mean rewards between 0 and 1.
+
+            Returns the action.
+        """
+        for action in legalActions:
+            if(action not in node.children):
+                return action
+
+        spread = bounds[1] - bounds[0]
+        logVisits = math.log(node.visits)
+        chosenAction = None
+        chosenScore = None
+
+        for action in legalActions:
+            child = node.children[action]
+
+            if(spread > 0):
+                mean = (child.total / child.visits - bounds[0]) / spread
+            else:
+                mean = 0.5
+
+            # Humans want the tension low
+            if(typeCode == Roster.HUMAN):
+                mean = 1.0 - mean
+
+            score = mean + MonteCarloSearch.EXPLORATION * math.sqrt(logVisits / child.visits)
+
+            if(chosenAction is None or score > chosenScore):
+                chosenAction = action
+                chosenScore = score
+
+        return chosenAction
+
+    def mostVisited(self, node):
+        """
+            Brief: mostVisited
+
+            Returns the action tried most often at a node, or None if it has
+            no children.
+        """
+        chosenAction = None
+        chosenVisits = 0
+
+        for action in node.children:
+            if(node.children[action].visits > chosenVisits):
+                chosenAction = action
+                chosenVisits = node.children[action].visits
+
+        return chosenAction
+
+    def playout(self, storyState, characters, playoutActions):
+        """
+            Brief: playout
+
+            Plays the round with the given actions on a copy of the story, then
+            random legal actions until the horizon or the end of the story.
+
+            Param: storyState is the state of the story.
+            Param: characters is a Roster of Character instances.
+            Param: playoutActions is the list of the action of each character
+            this round.
+
+            Returns the tension the playout ends at.
+        """
+        state = storyState.copy()
+        roster = characters.copy()
+
+        for index in range(len(characters)):
+            self.makeMove(state, characters[index], playoutActions[index])
+
+        self.advance(state, roster, playoutActions)
+
+        successorTable = self.successorTable
+        legalActions = self.rules.legalActions
+
+        for roundNumber in range(1, self.horizon):
+            if(state.storyComplete):
+                break
+
+            situations = self.rules.situations(roster)
+            roundActions = []
+
+            for index in range(len(roster)):
+                action = self.rng.choice(legalActions[situations[index]])
+                transition = successorTable[situations[index] * len(ACTION_CODES) + ACTION_CODES[action]]
+
+                if(transition is not None):
+                    state.tension = (state.tension + transition[0]) * transition[1]
+
+                roundActions.append(action)
+
+            self.advance(state, roster, roundActions)
+
+        return state.tension
+
+    def advance(self, state, roster, roundActions):
+        """
+            Brief: advance
+
+            Carries out one round of a playout, drawing the outcomes from the
+            engine's random number generator.
+        """
+        for event in self.playRound(state, roster, roundActions, self.rng):
+            pass
+
+        self.nodesSearched += 1
@@ -0,0 +1,199 @@
+import json
+import sys
+
+class TextRenderer:
+    """
+        Renders the events of a story as its prose.
+    """
+    def writeEvent(self, sink, event):
+        sink.write(event.text())
+
+    def endSequence(self, sink):
+        sink.endSequence()
+
+class JsonRenderer:
+    """
+        Renders the events of a story as one JSON object per line, leaving out
+        those that only lay out the prose.
+    """
+    def writeEvent(self, sink, event):
+        if(not event.template.layout):
+            sink.writeText(json.dumps(event.toDict()) + "\n")
+
+    def endSequence(self, sink):
+        sink.flush()
+
+class NullRenderer:
+    """
+        Renders nothing.
+    """
+    def writeEvent(self, sink, event):
+        pass
+
+    def endSequence(self, sink):
+        pass
+
+RENDERERS = {"text": TextRenderer,
+             "json": JsonRenderer,
+             "none": NullRenderer}
+
+class NarrationSink:
+    """
+        Destination for the sentences of a story. Sentences of a sequence are
+        separated by a space and every sequence ends with a newline, the same
+        layout printSequence has always produced. written counts the characters
+        of narration written so far. The events of a story are turned into
+        text by the sink's renderer as they are written.
+    """
+    def __init__(self, renderer=None):
+        """
+            Brief: __init__
+
+            Param: renderer renders the events consumed. It defaults to a
+            TextRenderer.
+        """
+        if(renderer is None):
+            renderer = TextRenderer()
+
+        self.renderer = renderer
+        self.sequenceStarted = False
+        self.written = 0
+
+    def write(self, sentence):
+        """
+            Brief: write
+
+            Writes a sentence of the current sequence.
+
+            Param: sentence is the text being written.
+        """
+        if(self.sequenceStarted):
+            self.writeText(" ")
+
+        self.writeText(sentence)
+
+        self.sequenceStarted = self.sequenceStarted or sentence != ""
+
+    def writeText(self, text):
+        """
+            Brief: writeText
+
+            Writes text as it is, with no layout.
+        """
+        self.emit(text)
+        self.written += len(text)
+
+    def endSequence(self):
+        """
+            Brief: endSequence
+
+            Ends the current sequence.
+        """
+        self.writeText("\n")
+        self.flush()
+
+        self.sequenceStarted = False
+
+    def writeSequence(self, storySequence):
+        """
+            Brief: writeSequence
+
+            Writes a list of sentences as one sequence.
+
+            Param: storySequence is a list of sentences.
+        """
+        for sentence in storySequence:
+            self.write(sentence)
+
+        self.endSequence()
+
+    def consume(self, narration):
+        """
+            Brief: consume
+
+            Renders everything yielded by a narration generator as it arrives.
+            None marks the end of a sequence.
+
+            Param: narration is an iterable of NarrationEvents and None markers.
+        """
+        renderer = self.renderer
+
+        for event in narration:
+            if(event is None):
+                renderer.endSequence(self)
+            else:
+                renderer.writeEvent(self, event)
+
+    def emit(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class StreamSink(NarrationSink):
+    """
+        Writes the story to an open text stream, standard output by default.
+    """
+    def __init__(self, stream=None, renderer=None):
+        NarrationSink.__init__(self, renderer)
+
+        if(stream is None):
+            stream = sys.stdout
+
+        self.stream = stream
+
+    def emit(self, text):
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+class FileSink(StreamSink):
+    """
+        Writes the story to a file.
+    """
+    def __init__(self, fileName, position=None, renderer=None):
+        """
+            Brief: __init__
+
+            Param: fileName is the name of the file written.
+            Param: position is the number of characters already written by a
+            story being resumed. They are kept, anything after them is
+            discarded, and the story carries on from there.
+            Param: renderer renders the events written.
+        """
+        if(position is None):
+            StreamSink.__init__(self, open(fileName, "w"), renderer)
+            return
+
+        StreamSink.__init__(self, open(fileName, "r+"), renderer)
+
+        self.stream.read(position)
+        self.stream.seek(self.stream.tell())
+        self.stream.truncate()
+
+        self.written = position
+
+    def close(self):
+        self.stream.close()
+
+class NullSink(NarrationSink):
+    """
+        Discards the story, for headless runs. The events are only run
+        through, so nothing is ever formatted.
+    """
+    def __init__(self):
+        NarrationSink.__init__(self, NullRenderer())
+
+    def write(self, sentence):
+        pass
+
+    def endSequence(self):
+        pass
+
+    def consume(self, narration):
+        for event in narration:
+            pass
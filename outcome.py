@@ -0,0 +1,156 @@
+import random
+
+from action import Action
+from character import Gender
+from templates import narrationEvent
+
+# Attacks and escapes roll from 1 to 100. A human's attack kills on a roll up
+# to KILL_ROLL and a monster's on anything higher, and an escape works on a
+# roll up to ESCAPE_ROLL.
+KILL_ROLL = 30
+ESCAPE_ROLL = 10
+
+def actionOutcome(storyState, characters, character, action, rng=random):
+    """
+        Brief: actionOutcome
+
+        Updates the storyState and character information based on the given action.
+
+        Param: storyState is the state of the story
+        Param: characters is a Roster of Character instances
+        Param: character is the particular character performing the action.
+        Param: action is the action that is being processed.
+        Param: rng is the random number generator of the story.
+
+        Returns the NarrationEvent of the action performed and its results.
+    """
+    event = narrationEvent(action, "acted", None, character.name)
+
+    if(action == Action.ATTACKED):
+        randomizer = rng.randint(1,100)
+
+        if(isConflict(characters, character)):
+            for otherCharacter in characters:
+                if(otherCharacter.ID == character.ID 
+                   or not otherCharacter.alive):
+                    continue
+                elif(character.isHuman() and otherCharacter.isMonster() 
+                     and randomizer <= KILL_ROLL):
+                    storyState.numMonstersDead += 1
+                    otherCharacter.alive = False
+                    event = narrationEvent(action, "killed_monster", None, character.name, otherCharacter.name)
+                    break
+                elif(character.isHuman() and otherCharacter.isMonster() 
+                     and randomizer > KILL_ROLL):
+                    event = narrationEvent(action, "missed_monster", None, character.name, otherCharacter.name)
+                    break
+                elif(character.isMonster() and otherCharacter.isHuman()
+                     and randomizer > KILL_ROLL):
+                    storyState.numHumansDead += 1
+                    otherCharacter.alive = False
+
+                    event = narrationEvent(action, "killed_human", pronounGender(otherCharacter),
+                                           character.name, otherCharacter.name)
+                    break
+                elif(character.isMonster() and otherCharacter.isHuman()
+                     and character.alive and randomizer <= KILL_ROLL):
+                    event = narrationEvent(action, "missed_human", pronounGender(otherCharacter),
+                                           character.name, otherCharacter.name)
+                    break
+
+    elif(action == Action.ESCAPED):
+        randomizer = rng.randint(1,100)
+
+        if(randomizer <= ESCAPE_ROLL):
+            characters.moveCharacter(character, -1)
+            storyState.numEscaped += 1
+            event = narrationEvent(action, "escaped", None, character.name)
+        else:
+            event = narrationEvent(action, "failed", None, character.name)
+    elif(action == Action.INVESTIGATED):
+        position = characters.world.investigateMove(character.position, rng)
+        findRandomizer = rng.randint(1,2)
+
+        characters.moveCharacter(character, position)
+
+        if(findRandomizer == 1 and isConflict(characters, character)):
+            character.aware = True
+        
+            for otherCharacter in characters:
+                if(character.isHuman() and otherCharacter.isMonster()):
+                    event = narrationEvent(action, "found_monster", None, character.name, otherCharacter.name)
+                    break
+                elif(character.isMonster() and otherCharacter.isHuman()):
+                    event = narrationEvent(action, "found_human", None, character.name, otherCharacter.name)
+        elif(findRandomizer > 1 or not isConflict(characters, character)):
+            event = narrationEvent(action, "found_nothing", None, character.name)
+    elif(action == Action.RAN):
+        characters.moveCharacter(character, characters.world.fleeMove(character.position, rng))
+
+        if(character.isHuman()):
+            event = narrationEvent(action, "fled_human", None, character.name)
+        else:
+            event = narrationEvent(action, "fled_monster", None, character.name)
+
+    return event
+
+def pronounGender(character):
+    """
+        Brief: pronounGender
+
+        Returns the gender the narration refers to a character by.
+    """
+    if(character.gender == Gender.MALE):
+        return Gender.MALE
+
+    return Gender.FEMALE
+
+def isConflict(characters, character):
+    """
+        Brief: isConflict
+
+        Checks to see if the position the character is currently in is occupied
+        by the opposite character type.
+
+        Param: characters is a Roster of Character instances
+        Param: character is the particular character being used as a reference.
+
+        Returns a boolean based on whether or not there is a  conflict or not.
+    """
+    return characters.isConflict(character)
+
+def playRound(storyState, characters, characterActions, rng=random, dataConnection=None):
+    """
+        Brief: playRound
+
+        Carries out the actions chosen for a round, in roster order, until
+        they are done or the story is complete. Attacks with nobody to attack
+        and the actions of the dead and escaped are skipped.
+
+        Param: storyState is the state of the story.
+        Param: characters is a Roster of Character instances.
+        Param: characterActions is the list of the action of each character.
+        Param: rng is the random number generator of the story.
+        Param: dataConnection is the Database every action taken is recorded
+        in, or None to record nothing.
+
+        Yields the NarrationEvent of each action taken.
+    """
+    for i in range(len(characterActions)):
+        if(characterActions[i] == Action.ATTACKED 
+           and not isConflict(characters, characters[i])):
+            continue
+        elif(characters[i].alive
+             and characters[i].position > -1):
+            event = actionOutcome(storyState, characters, characters[i], characterActions[i], rng)
+
+            # Store results to database to determine the likelihood of actions
+            if(dataConnection is not None):
+                dataConnection.updateAction(characterActions[i], characters[i].characterType)
+
+            yield event
+
+        if((storyState.numHumansDead + storyState.numEscaped) == storyState.numHumans 
+            or storyState.numMonstersDead == storyState.numMonsters):
+            storyState.storyComplete = True
+            break
@@ -0,0 +1,175 @@
+import json
+import time
+
+class RoundProfile:
+    """
+        What one call to getAction did.
+    """
+    def __init__(self, roundNumber):
+        self.round = roundNumber
+        self.nodesPerLevel = []
+        self.cutoffsPerLevel = []
+        self.successorsGenerated = 0
+        self.databaseLookups = 0
+        self.seconds = 0.0
+
+    def countLevel(self, counts, level):
+        while(len(counts) <= level):
+            counts.append(0)
+
+        counts[level] += 1
+
+    def toDictionary(self):
+        """
+            Brief: toDictionary
+
+            Returns the profile as a dictionary that can be written as JSON.
+        """
+        nodes = sum(self.nodesPerLevel)
+        cutoffs = sum(self.cutoffsPerLevel)
+
+        cutoffsPerLevel = self.cutoffsPerLevel + [0] * (len(self.nodesPerLevel) - len(self.cutoffsPerLevel))
+
+        return {"round": self.round,
+                "seconds": self.seconds,
+                "nodes": nodes,
+                "nodes_per_level": self.nodesPerLevel,
+                "cutoffs": cutoffs,
+                "cutoffs_per_level": cutoffsPerLevel,
+                "cutoff_rate": cutoffs / float(nodes) if nodes > 0 else 0.0,
+                "successors_generated": self.successorsGenerated,
+                "database_lookups": self.databaseLookups}
+
+class CountingConnection:
+    """
+        Passes calls through to a Database, counting the action usage lookups.
+    """
+    def __init__(self, dataConnection, profiler):
+        self.dataConnection = dataConnection
+        self.profiler = profiler
+
+    def getActionUsage(self, action, character):
+        self.profiler.current.databaseLookups += 1
+
+        return self.dataConnection.getActionUsage(action, character)
+
+    def __getattr__(self, name):
+        return getattr(self.dataConnection, name)
+
+class SearchProfiler:
+    """
+        Records node counts, alpha-beta cutoffs, successor generation, database
+        lookups and wall time for every round an Action searches. The profiler
+        wraps the methods of the Action it is attached to, so an Action without
+        a profiler runs unchanged code.
+    """
+    def __init__(self):
+        self.rounds = []
+        self.current = None
+
+    def attach(self, searchAgent):
+        """
+            Brief: attach
+
+            Starts profiling an Action.
+
+            Param: searchAgent is the Action being profiled.
+
+            Returns the Action.
+        """
+        profiler = self
+
+        getAction = searchAgent.getAction
+        maxValue = searchAgent.maxValue
+        minValue = searchAgent.minValue
+        makeMove = searchAgent.makeMove
+
+        def profiledGetAction(storyState, characters):
+            profiler.current = RoundProfile(len(profiler.rounds))
+            profiler.rounds.append(profiler.current)
+
+            start = time.perf_counter()
+
+            try:
+                return getAction(storyState, characters)
+            finally:
+                profiler.current.seconds = time.perf_counter() - start
+
+        def profiledMaxValue(state, characters, character, actions, values, level, a, b):
+            profiler.current.countLevel(profiler.current.nodesPerLevel, level)
+
+            value = maxValue(state, characters, character, actions, values, level, a, b)
+
+            # maxValue stops early exactly when its value rises above beta
+            if(value > b):
+                profiler.current.countLevel(profiler.current.cutoffsPerLevel, level)
+
+            return value
+
+        def profiledMinValue(state, characters, character, actions, values, level, a, b):
+            profiler.current.countLevel(profiler.current.nodesPerLevel, level)
+
+            value = minValue(state, characters, character, actions, values, level, a, b)
+
+            # minValue stops early exactly when its value falls below alpha
+            if(value < a):
+                profiler.current.countLevel(profiler.current.cutoffsPerLevel, level)
+
+            return value
+
+        def profiledMakeMove(state, character, action):
+            profiler.current.successorsGenerated += 1
+
+            return makeMove(state, character, action)
+
+        searchAgent.getAction = profiledGetAction
+        searchAgent.maxValue = profiledMaxValue
+        searchAgent.minValue = profiledMinValue
+        searchAgent.makeMove = profiledMakeMove
+        searchAgent.dataConnection = CountingConnection(searchAgent.dataConnection, self)
+
+        return searchAgent
+
+    def summary(self):
+        """
+            Brief: summary
+
+            Returns the totals over every round profiled.
+        """
+        summary = {"rounds": len(self.rounds),
+                   "seconds": 0.0,
+                   "nodes": 0,
+                   "cutoffs": 0,
+                   "successors_generated": 0,
+                   "database_lookups": 0,
+                   "slowest_round": None}
+
+        slowest = None
+
+        for roundProfile in self.rounds:
+            summary["seconds"] += roundProfile.seconds
+            summary["nodes"] += sum(roundProfile.nodesPerLevel)
+            summary["cutoffs"] += sum(roundProfile.cutoffsPerLevel)
+            summary["successors_generated"] += roundProfile.successorsGenerated
+            summary["database_lookups"] += roundProfile.databaseLookups
+
+            if(slowest is None or roundProfile.seconds > slowest.seconds):
+                slowest = roundProfile
+
+        if(slowest is not None):
+            summary["slowest_round"] = slowest.round
+
+        return summary
+
+    def dump(self, fileName):
+        """
+            Brief: dump
+
+            Writes the summary and every round to a JSON file.
+
+            Param: fileName is the name of the file written.
+        """
+        with open(fileName, "w") as f:
+            json.dump({"summary": self.summary(),
+                       "rounds": [roundProfile.toDictionary() for roundProfile in self.rounds]},
+                      f, indent=2)
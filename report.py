@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+
+from database import Database
+
+def buildReport(dataConnection, rosterSize=None, since=None, percentiles=(50, 90, 99), recent=0):
+    """
+        Brief: buildReport
+
+        Gathers the story history report from the rollup tables, so it costs
+        the same however many stories have been recorded.
+
+        Param: dataConnection is the Database the report is read from.
+        Param: rosterSize limits the win rates and story lengths to rosters of
+        that size.
+        Param: since is the first day of the win rates, as "YYYY-MM-DD".
+        Param: percentiles is a list of the tension percentiles reported.
+        Param: recent is the number of the latest stories listed.
+
+        Returns the report as a dictionary.
+    """
+    winRates = []
+
+    for day, stories, humanWins, monsterWins in dataConnection.getWinRates(rosterSize, since):
+        winRates.append({"day": day,
+                         "stories": stories,
+                         "human_wins": humanWins,
+                         "monster_wins": monsterWins,
+                         "human_win_rate": humanWins / float(stories) if stories > 0 else 0.0})
+
+    lengths = []
+
+    for rounds, stories in dataConnection.getStoryLengths(rosterSize):
+        lengths.append({"rounds": rounds, "stories": stories})
+
+    tensions = []
+    tensionPercentiles = dataConnection.getTensionPercentiles(percentiles)
+
+    for size in sorted(tensionPercentiles):
+        stories, values = tensionPercentiles[size]
+
+        tensions.append({"roster_size": size,
+                         "stories": stories,
+                         "percentiles": dict(("p%g" % percentile, values[percentile]) for percentile in values)})
+
+    report = {"win_rates": winRates,
+              "story_lengths": lengths,
+              "tension_percentiles": tensions}
+
+    if(recent > 0):
+        fields = ["finished_at", "roster_size", "rounds", "final_tension", "winner", "humans_survived",
+                  "humans_escaped", "monsters_survived", "seconds"]
+
+        report["recent_stories"] = [dict(zip(fields, row))
+                                    for row in dataConnection.getStories(rosterSize, limit=recent)]
+
+    return report
+
+def printReport(report, stream=sys.stdout):
+    """
+        Brief: printReport
+
+        Writes a report made by buildReport as text.
+
+        Param: report is the report.
+        Param: stream is the file the report is written to.
+    """
+    stream.write("Win rates\n")
+    stream.write("%-12s %10s %10s %10s %8s\n" % ("day", "stories", "human", "monster", "human %"))
+
+    for row in report["win_rates"]:
+        stream.write("%-12s %10d %10d %10d %7.1f%%\n" % (row["day"], row["stories"], row["human_wins"],
+                                                         row["monster_wins"], 100 * row["human_win_rate"]))
+
+    stream.write("\nStory lengths\n")
+    stream.write("%-12s %10s\n" % ("rounds", "stories"))
+
+    for row in report["story_lengths"]:
+        stream.write("%-12d %10d\n" % (row["rounds"], row["stories"]))
+
+    stream.write("\nFinal tension percentiles\n")
+
+    for row in report["tension_percentiles"]:
+        values = ", ".join("%s %.1f" % (name, row["percentiles"][name]) for name in row["percentiles"])
+
+        stream.write("%d characters (%d stories): %s\n" % (row["roster_size"], row["stories"], values))
+
+    if("recent_stories" in report):
+        stream.write("\nRecent stories\n")
+
+        for row in report["recent_stories"]:
+            stream.write("%s\n" % json.dumps(row))
+
+def parseArguments(argv):
+    """
+        Brief: parseArguments
+
+        Parses the command line.
+
+        Param: argv is the list of command line arguments, without the program name.
+
+        Returns the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog="report.py",
+                                     description="Report on the stories recorded in the database.")
+    parser.add_argument("--database", default="outcomes.db",
+                        help="database file the history is read from")
+    parser.add_argument("--roster-size", type=int, default=None,
+                        help="only report win rates and story lengths for rosters of this size")
+    parser.add_argument("--since", default=None,
+                        help="first day of the win rates, as YYYY-MM-DD")
+    parser.add_argument("--percentiles", default="50,90,99",
+                        help="comma-separated final tension percentiles")
+    parser.add_argument("--recent", type=int, default=0,
+                        help="also list this many of the latest stories")
+    parser.add_argument("--json", action="store_true",
+                        help="write the report as JSON")
+
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parseArguments(sys.argv[1:])
+
+    dataConnection = Database(args.database)
+
+    dataConnection.createDBAndTables()
+
+    report = buildReport(dataConnection, args.roster_size, args.since,
+                         [float(percentile) for percentile in args.percentiles.split(",")], args.recent)
+
+    if(args.json):
+        print(json.dumps(report, indent=2))
+    else:
+        printReport(report)
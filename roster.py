@@ -0,0 +1,293 @@
+from array import array
+
+from character import CharacterBase, CharacterHealth, CharacterType
+from world import DEFAULT_WORLD
+
+class CharacterView(CharacterBase):
+    """
+        A character stored in a Roster. Its attributes are read from and written
+        to the roster's columns, so views are cheap to create and hold no data
+        of their own.
+    """
+    __slots__ = ("roster", "index")
+
+    def __init__(self, roster, index):
+        self.roster = roster
+        self.index = index
+
+    @property
+    def ID(self):
+        return self.roster.ids[self.index]
+
+    @property
+    def name(self):
+        return self.roster.names[self.index]
+
+    @property
+    def characterType(self):
+        return Roster.TYPES[self.roster.types[self.index]]
+
+    @property
+    def gender(self):
+        return self.roster.genders[self.index]
+
+    @property
+    def appearance(self):
+        return self.roster.appearanceValues[self.roster.appearances[self.index]]
+
+    @property
+    def alive(self):
+        return self.roster.alive[self.index] == 1
+
+    @alive.setter
+    def alive(self, alive):
+        self.roster.alive[self.index] = 1 if alive else 0
+
+    @property
+    def status(self):
+        return Roster.STATUSES[self.roster.statuses[self.index]]
+
+    @status.setter
+    def status(self, status):
+        self.roster.statuses[self.index] = Roster.STATUSES.index(status)
+
+    @property
+    def timesMoved(self):
+        return self.roster.timesMoved[self.index]
+
+    @timesMoved.setter
+    def timesMoved(self, timesMoved):
+        self.roster.timesMoved[self.index] = timesMoved
+
+    @property
+    def position(self):
+        return self.roster.positions[self.index]
+
+    @position.setter
+    def position(self, position):
+        self.roster.moveCharacter(self, position)
+
+    @property
+    def aware(self):
+        return self.roster.aware[self.index] == 1
+
+    @aware.setter
+    def aware(self, aware):
+        self.roster.aware[self.index] = 1 if aware else 0
+
+    def isHuman(self):
+        return self.roster.types[self.index] == Roster.HUMAN
+
+    def isMonster(self):
+        return self.roster.types[self.index] == Roster.MONSTER
+
+class Roster:
+    """
+        The characters of a story, stored as one compact array per attribute,
+        with an index of how many humans and monsters occupy each position.
+        Indexing the roster returns a CharacterView of the character. The
+        roster also holds the World its characters move around.
+    """
+    TYPES = [CharacterType.HUMAN, CharacterType.MONSTER]
+    HUMAN = 0
+    MONSTER = 1
+
+    STATUSES = [CharacterHealth.HEALTHY, CharacterHealth.INJURED, CharacterHealth.DEAD]
+
+    def __init__(self, characters=(), world=None):
+        """
+            Brief: __init__
+
+            Param: characters is an iterable of Character instances.
+            Param: world is the World of the story. It defaults to the four
+            positions in a row.
+        """
+        if(world is None):
+            world = DEFAULT_WORLD
+
+        self.world = world
+        self.ids = array("l")
+        self.names = []
+        self.types = array("b")
+        self.genders = array("b")
+        self.appearances = array("H")
+        self.alive = array("b")
+        self.statuses = array("b")
+        self.timesMoved = array("l")
+        self.positions = array("l")
+        self.aware = array("b")
+
+        # Appearances are few distinct words, so each is stored once
+        self.appearanceValues = []
+        self.appearanceCodes = {}
+
+        self.occupants = {}
+
+        for character in characters:
+            self.append(character)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if(isinstance(index, slice)):
+            return [CharacterView(self, i) for i in range(*index.indices(len(self.ids)))]
+
+        if(index < 0):
+            index += len(self.ids)
+
+        if(index < 0 or index >= len(self.ids)):
+            raise IndexError("roster index out of range")
+
+        return CharacterView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield CharacterView(self, index)
+
+    def copy(self):
+        """
+            Brief: copy
+
+            Makes a roster whose characters start out the same as this one's
+            and can act without changing it. Names and appearances never
+            change, so they are shared.
+
+            Returns the new Roster.
+        """
+        roster = Roster(world=self.world)
+
+        roster.ids = self.ids
+        roster.names = self.names
+        roster.types = self.types
+        roster.genders = self.genders
+        roster.appearances = self.appearances
+        roster.appearanceValues = self.appearanceValues
+        roster.appearanceCodes = self.appearanceCodes
+        roster.alive = array("b", self.alive)
+        roster.statuses = array("b", self.statuses)
+        roster.timesMoved = array("l", self.timesMoved)
+        roster.positions = array("l", self.positions)
+        roster.aware = array("b", self.aware)
+
+        for position in self.occupants:
+            roster.occupants[position] = list(self.occupants[position])
+
+        return roster
+
+    def append(self, character):
+        """
+            Brief: append
+
+            Adds a character to the roster and to the occupancy of its position.
+
+            Param: character is the Character being added.
+        """
+        appearanceCode = self.appearanceCodes.get(character.appearance)
+
+        if(appearanceCode is None):
+            appearanceCode = len(self.appearanceValues)
+            self.appearanceValues.append(character.appearance)
+            self.appearanceCodes[character.appearance] = appearanceCode
+
+        self.ids.append(character.ID)
+        self.names.append(character.name)
+        self.types.append(Roster.TYPES.index(character.characterType))
+        self.genders.append(character.gender)
+        self.appearances.append(appearanceCode)
+        self.alive.append(1 if character.alive else 0)
+        self.statuses.append(Roster.STATUSES.index(character.status))
+        self.timesMoved.append(character.timesMoved)
+        self.positions.append(character.position)
+        self.aware.append(1 if character.aware else 0)
+
+        self.addOccupant(character.position, self.types[-1], 1)
+
+    def addOccupant(self, position, typeCode, amount):
+        """
+            Brief: addOccupant
+
+            Adjusts the number of characters of a type at a position.
+        """
+        counts = self.occupants.get(position)
+
+        if(counts is None):
+            counts = [0, 0]
+            self.occupants[position] = counts
+
+        counts[typeCode] += amount
+
+    def moveCharacter(self, character, position):
+        """
+            Brief: moveCharacter
+
+            Moves a character to a new position and updates the occupancy index.
+
+            Param: character is the CharacterView being moved.
+            Param: position is the position the character moves to.
+        """
+        index = character.index
+
+        if(position == self.positions[index]):
+            return
+
+        self.addOccupant(self.positions[index], self.types[index], -1)
+        self.addOccupant(position, self.types[index], 1)
+
+        self.positions[index] = position
+
+    def countAt(self, position, characterType):
+        """
+            Brief: countAt
+
+            Returns the number of characters of a type at a position.
+        """
+        counts = self.occupants.get(position)
+
+        if(counts is None):
+            return 0
+
+        return counts[Roster.TYPES.index(characterType)]
+
+    def isConflict(self, character):
+        """
+            Brief: isConflict
+
+            Checks to see if the position the character is currently in is occupied
+            by the opposite character type. Like the original scan, every character
+            at the position counts, including the dead.
+
+            Param: character is the particular character being used as a reference.
+
+            Returns a boolean based on whether or not there is a conflict or not.
+        """
+        counts = self.occupants.get(self.positions[character.index])
+
+        return counts is not None and counts[1 - self.types[character.index]] > 0
+
+    def conflictMask(self):
+        """
+            Brief: conflictMask
+
+            Checks every character for a conflict at once by looking up, per
+            position, whether the opposite type is present.
+
+            Returns an array holding 1 for each character in conflict and 0
+            otherwise.
+        """
+        # Whether a human (index 0) or monster (index 1) at each position
+        # would face the other type
+        facing = {}
+
+        for position in self.occupants:
+            counts = self.occupants[position]
+            facing[position] = (1 if counts[1] > 0 else 0, 1 if counts[0] > 0 else 0)
+
+        mask = array("b", bytes(len(self.ids)))
+        positions = self.positions
+        types = self.types
+
+        for index in range(len(mask)):
+            mask[index] = facing[positions[index]][types[index]]
+
+        return mask
@@ -0,0 +1,186 @@
+from array import array
+
+from character import CharacterHealth, CharacterType
+from roster import Roster
+
+ESCAPED = "escaped"
+INVESTIGATED = "investigated"
+RAN = "ran"
+ATTACKED = "attacked"
+
+ACTIONS = [ESCAPED, INVESTIGATED, RAN, ATTACKED]
+ACTION_CODES = {ESCAPED: 0, INVESTIGATED: 1, RAN: 2, ATTACKED: 3}
+
+HUMAN = CharacterType.HUMAN
+MONSTER = CharacterType.MONSTER
+
+# The actions a character may take. Each rule is (character type, injured,
+# aware, in conflict, actions) and the first rule matching a character's
+# situation applies; None matches either value.
+LEGAL_ACTION_RULES = [
+    (HUMAN,   None,  True, True,  [ATTACKED, INVESTIGATED, RAN]),
+    (MONSTER, True,  True, True,  [ATTACKED, RAN]),
+    (MONSTER, False, True, True,  [ATTACKED]),
+    (HUMAN,   None,  True, False, [ESCAPED, INVESTIGATED, RAN]),
+    (MONSTER, True,  True, False, [INVESTIGATED, RAN]),
+    (None,    None,  None, None,  [INVESTIGATED]),
+]
+
+# How an action changes the tension of the story. Each rule is (character
+# type, injured, aware, in conflict, action, delta) and the first rule
+# matching applies; an action no rule matches leaves the story unchanged.
+# The delta is added to the tension before the likelihood modifier of the
+# action multiplies it.
+TRANSITION_RULES = [
+    (None,    None, None, None, ESCAPED,      -1),
+    (None,    None, True, True, INVESTIGATED,  3),
+    (None,    None, None, True, INVESTIGATED,  2),
+    (None,    None, None, None, INVESTIGATED,  1),
+    (HUMAN,   None, True, True, RAN,           4),
+    (MONSTER, True, True, True, RAN,          -1),
+    (HUMAN,   None, True, True, ATTACKED,      5),
+    (MONSTER, True, True, True, ATTACKED,      2),
+]
+
+# Likely actions raise the tension for humans and lower it for monsters
+LIKELIHOOD_SIGNS = {HUMAN: 1, MONSTER: -1}
+
+class RuleTable:
+    """
+        The legal action and transition rules compiled into flat lists indexed
+        by situation code, so the search looks a rule up instead of branching.
+        A situation code packs a character's type, whether it is injured,
+        aware and in conflict into a number from 0 to 15.
+    """
+    SITUATIONS = 16
+
+    def __init__(self, legalActionRules=None, transitionRules=None):
+        """
+            Brief: __init__
+
+            Param: legalActionRules is a list of rules like LEGAL_ACTION_RULES,
+            which it defaults to.
+            Param: transitionRules is a list of rules like TRANSITION_RULES,
+            which it defaults to.
+        """
+        if(legalActionRules is None):
+            legalActionRules = LEGAL_ACTION_RULES
+
+        if(transitionRules is None):
+            transitionRules = TRANSITION_RULES
+
+        self.legalActions = []
+        self.deltas = []
+
+        for code in range(RuleTable.SITUATIONS):
+            situation = RuleTable.decodeSituation(code)
+
+            self.legalActions.append(None)
+
+            for rule in legalActionRules:
+                if(RuleTable.matches(rule[:4], situation)):
+                    self.legalActions[code] = list(rule[4])
+                    break
+
+            if(self.legalActions[code] is None):
+                raise ValueError("no legal action rule matches %s" % (situation,))
+
+            for action in ACTIONS:
+                delta = None
+
+                for rule in transitionRules:
+                    if(rule[4] == action and RuleTable.matches(rule[:4], situation)):
+                        delta = rule[5]
+                        break
+
+                self.deltas.append(delta)
+
+    @staticmethod
+    def situationCode(typeCode, injured, aware, conflict):
+        """
+            Brief: situationCode
+
+            Returns the situation code of a character.
+
+            Param: typeCode is the roster type code of the character.
+        """
+        return typeCode * 8 + injured * 4 + aware * 2 + conflict
+
+    @staticmethod
+    def decodeSituation(code):
+        """
+            Brief: decodeSituation
+
+            Returns the (character type, injured, aware, in conflict) tuple of a
+            situation code.
+        """
+        return (Roster.TYPES[code >> 3], bool(code & 4), bool(code & 2), bool(code & 1))
+
+    @staticmethod
+    def matches(pattern, situation):
+        for i in range(len(pattern)):
+            if(pattern[i] is not None and pattern[i] != situation[i]):
+                return False
+
+        return True
+
+    def situations(self, characters):
+        """
+            Brief: situations
+
+            Finds the situation code of every character of a roster at once.
+
+            Param: characters is a Roster of Character instances.
+
+            Returns an array holding the code of each character.
+        """
+        conflicts = characters.conflictMask()
+        types = characters.types
+        statuses = characters.statuses
+        aware = characters.aware
+
+        injured = Roster.STATUSES.index(CharacterHealth.INJURED)
+
+        codes = array("b", bytes(len(characters)))
+
+        for index in range(len(codes)):
+            codes[index] = types[index] * 8 + (statuses[index] == injured) * 4 + aware[index] * 2 + conflicts[index]
+
+        return codes
+
+    def successorTable(self, dataConnection):
+        """
+            Brief: successorTable
+
+            Combines the transition rules with the current action likelihoods.
+
+            Param: dataConnection is the Database the likelihoods are read from.
+
+            Returns a list indexed by situation code * 4 + action code holding
+            the (delta, modifier) pair of each transition, or None where the
+            story is left unchanged.
+        """
+        modifiers = {}
+
+        for characterType in LIKELIHOOD_SIGNS:
+            for action in ACTIONS:
+                usage = dataConnection.getActionUsage(action, characterType)
+
+                modifiers[(characterType, action)] = 1 + LIKELIHOOD_SIGNS[characterType] * usage
+
+        table = []
+
+        for code in range(RuleTable.SITUATIONS):
+            characterType = Roster.TYPES[code >> 3]
+
+            for action in ACTIONS:
+                delta = self.deltas[code * len(ACTIONS) + ACTION_CODES[action]]
+
+                if(delta is None):
+                    table.append(None)
+                else:
+                    table.append((delta, modifiers[(characterType, action)]))
+
+        return table
+
+DEFAULT_RULES = RuleTable()
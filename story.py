@@ -2,6 +2,9 @@ class Story:
     """
         The story state
     """
+    __slots__ = ("tension", "numHumans", "numMonsters", "numHumansDead", "numEscaped",
+                 "numMonstersDead", "storyComplete")
+
     def __init__(self, tension, numHumans, numMonsters, numHumansDead, numEscaped, numMonstersDead, storyComplete):
         self.tension = tension
         self.numHumans = numHumans
@@ -10,3 +13,12 @@ class Story:
         self.numEscaped = numEscaped
         self.numMonstersDead = numMonstersDead
         self.storyComplete = storyComplete
+
+    def copy(self):
+        """
+            Brief: copy
+
+            Returns a new Story with the same state.
+        """
+        return Story(self.tension, self.numHumans, self.numMonsters, self.numHumansDead,
+                     self.numEscaped, self.numMonstersDead, self.storyComplete)
@@ -1,69 +1,260 @@
+import argparse
+import csv
+import json
+import os
 import random
 import sys
+import time
 
-from action import Action
+from concurrent.futures import ProcessPoolExecutor
+
+from action import Action, ParallelSearch, PositionSearch, closeSearchPools
+from checkpoint import Checkpointer, loadCheckpoint
 from character import CharacterHealth, CharacterType, Gender, SubjectAdjective, Character
 from database import Database
+from mcts import MonteCarloSearch
+from narration import RENDERERS, FileSink, NullSink, StreamSink
+from outcome import playRound
+from profiler import SearchProfiler
+from roster import Roster
 from story import Story    
+from templates import CHARACTER, STORY, WORLD, narrationEvent
+from transposition import TranspositionTable
+from world import World
 
-def determineGender():
+def determineGender(rng=random):
     """
         Brief: determineGender
 
         Randomly select a gender for a character.
 
+        Param: rng is the random number generator of the story.
+
         Returns the selected gender.
     """
-    randomizer = random.randint(1,2)
+    randomizer = rng.randint(1,2)
 
     if(randomizer == 1):
         return Gender.MALE
     else:
         return Gender.FEMALE
 
-def determineCharacterType():
+def determineCharacterType(rng=random):
     """
         Brief: determineCharacterType
 
         Randomly select a character type (monster or human) for a character.
 
+        Param: rng is the random number generator of the story.
+
         Returns the selected character type.
     """
-    randomizer = random.randint(1,2)
+    randomizer = rng.randint(1,2)
 
     if(randomizer == 1):
         return CharacterType.HUMAN
     else:
         return CharacterType.MONSTER
 
-def loadCharacters(fileName, storyState):
+def readRoster(fileName, rosterFormat=None):
+    """
+        Brief: readRoster
+
+        Reads the entries of a roster file one at a time. A plain text roster
+        holds one name per line, and only the first word of each line is used.
+        A CSV roster has a header row and a JSONL roster one JSON object per
+        line. Both need a name, and may set the type, gender, position and
+        appearance of a character. Blank lines are skipped. An entry that is
+        not an object or whose fields parseRosterEntry rejects raises a
+        ValueError naming its line.
+
+        Param: fileName is the name of the file.
+        Param: rosterFormat is "names", "csv" or "jsonl". If it is None, the
+        format is taken from the file extension.
+
+        Yields a dictionary for each character, holding the fields given.
+    """
+    if(rosterFormat is None):
+        extension = os.path.splitext(fileName)[1].lower()
+
+        if(extension == ".csv"):
+            rosterFormat = "csv"
+        elif(extension in [".jsonl", ".ndjson"]):
+            rosterFormat = "jsonl"
+        else:
+            rosterFormat = "names"
+
+    with open(fileName, "r", newline="") as f:
+        if(rosterFormat == "csv"):
+            reader = csv.DictReader(f)
+
+            for entry in reader:
+                yield checkRosterEntry(fileName, reader.line_num, entry)
+        elif(rosterFormat == "jsonl"):
+            lineNumber = 0
+
+            for line in f:
+                lineNumber += 1
+
+                if(line.strip() != ""):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError as error:
+                        raise ValueError("%s line %d: %s" % (fileName, lineNumber, error))
+
+                    if(not isinstance(entry, dict)):
+                        raise ValueError("%s line %d: roster entries are JSON objects: %s"
+                                         % (fileName, lineNumber, line.strip()))
+
+                    yield checkRosterEntry(fileName, lineNumber, entry)
+        elif(rosterFormat == "names"):
+            for line in f:
+                line = line.strip()
+
+                if(line != ""):
+                    yield {"name": line.split(' ')[0]}
+        else:
+            raise ValueError("unknown roster format: %s" % rosterFormat)
+
+def checkRosterEntry(fileName, lineNumber, entry):
+    """
+        Brief: checkRosterEntry
+
+        Checks an entry read from a roster file with parseRosterEntry.
+
+        Param: fileName is the name of the file.
+        Param: lineNumber is the line the entry ends on.
+        Param: entry is the dictionary read.
+
+        Returns the entry.
+    """
+    try:
+        parseRosterEntry(entry)
+    except ValueError as error:
+        raise ValueError("%s line %d: %s" % (fileName, lineNumber, error))
+
+    return entry
+
+def parseRosterEntry(entry):
+    """
+        Brief: parseRosterEntry
+
+        Checks the fields of a roster entry. Fields that are missing or empty
+        come back as None, to be randomly generated.
+
+        Param: entry is a dictionary read by readRoster.
+
+        Returns a tuple of the name, character type, gender, position and
+        appearance.
+    """
+    fields = {}
+
+    for key in ["name", "type", "gender", "position", "appearance"]:
+        value = entry.get(key)
+
+        if(isinstance(value, str)):
+            value = value.strip()
+
+        fields[key] = None if value == "" else value
+
+    if(fields["name"] is None):
+        raise ValueError("roster entry has no name: %s" % (entry,))
+
+    characterType = fields["type"]
+
+    if(characterType is not None):
+        characterType = str(characterType).lower()
+
+        if(characterType not in [CharacterType.HUMAN, CharacterType.MONSTER]):
+            raise ValueError("unknown character type for %s: %s" % (fields["name"], fields["type"]))
+
+    gender = fields["gender"]
+
+    if(gender is not None):
+        if(str(gender).lower() in ["male", "m", str(Gender.MALE)]):
+            gender = Gender.MALE
+        elif(str(gender).lower() in ["female", "f", str(Gender.FEMALE)]):
+            gender = Gender.FEMALE
+        else:
+            raise ValueError("unknown gender for %s: %s" % (fields["name"], fields["gender"]))
+
+    position = fields["position"]
+
+    if(position is not None):
+        # Positions are whole numbers; 1.5 or true must not be cut to one
+        if(isinstance(position, bool) or (isinstance(position, float) and not position.is_integer())):
+            raise ValueError("position of %s is not a whole number: %s" % (fields["name"], fields["position"]))
+
+        try:
+            position = int(position)
+        except (TypeError, ValueError):
+            raise ValueError("position of %s is not a whole number: %s" % (fields["name"], fields["position"]))
+
+    return str(fields["name"]), characterType, gender, position, fields["appearance"]
+
+def loadCharacters(fileName, storyState, rng=random, rosterFormat=None, world=None):
     """
         Brief: loadCharacters
 
-        Read from a specified text file, containing names of characters, and
-        generate a Character instance for each one. Character information
-        like character type, gender, description and position they enter the 
-        story world is randomly generated. Saves the characters to a list.
+        Read from a specified roster file and generate a Character instance for
+        each entry as it is read. Character information like character type,
+        gender, description and position they enter the story world is
+        randomly generated unless the roster sets it. Saves the characters to
+        a Roster.
 
         Param: fileName is the name of the file
         Param: storyState is the state of the story
+        Param: rng is the random number generator of the story
+        Param: rosterFormat is the format of the file, see readRoster
+        Param: world is the World the characters are placed in. It defaults to
+        the four positions in a row.
+
+        Returns a Roster of Character instances called characters.
+    """
+    return buildRoster(readRoster(fileName, rosterFormat), storyState, rng, world)
 
-        Returns a list of Character instances called characters.
+def buildRoster(entries, storyState, rng=random, world=None):
     """
-    characters = []
-    charactersInList = []
+        Brief: buildRoster
 
-    f = open(fileName,  'r+')
+        Generates a Character instance for each roster entry, rolling whatever
+        the entry leaves out, and adds a human or monster if the roster has
+        none.
 
-    for line in f:
-        characters.append(line[:-1].split(' '))
+        Param: entries is an iterable of dictionaries like those read by
+        readRoster.
+        Param: storyState is the state of the story
+        Param: rng is the random number generator of the story
+        Param: world is the World the characters are placed in. It defaults to
+        the four positions in a row.
+
+        Returns a Roster of Character instances called characters.
+    """
+    charactersInList = Roster(world=world)
+    world = charactersInList.world
 
     ID = 0
-    for character in characters:
-        characterAdded = Character(ID, character[0], determineCharacterType(), 
-                                   determineGender(), selectDescription(1), 
+    for entry in entries:
+        name, characterType, gender, position, appearance = parseRosterEntry(entry)
+
+        # Roll only what the roster leaves out, in the usual order
+        if(characterType is None):
+            characterType = determineCharacterType(rng)
+
+        if(gender is None):
+            gender = determineGender(rng)
+
+        if(appearance is None):
+            appearance = selectDescription(1, rng)
+
+        if(position is None):
+            position = world.randomLocation(rng)
+        elif(not world.hasLocation(position)):
+            raise ValueError("%s starts at %d, which is not on the map" % (name, position))
+
+        characterAdded = Character(ID, name, characterType, gender, appearance,
                                    True, CharacterHealth.HEALTHY, 0, 
-                                   random.randint(1,4), False)
+                                   position, False)
 
         charactersInList.append(characterAdded)
 
@@ -76,103 +267,89 @@ def loadCharacters(fileName, storyState):
 
     if(storyState.numHumans == 0):
         charactersInList.append(Character(ID, "The Human", CharacterType.HUMAN, 
-                                determineGender(), selectDescription(1), 
+                                determineGender(rng), selectDescription(1, rng), 
                                 True, CharacterHealth.HEALTHY, 0, 
-                                random.randint(1,4), False))
+                                world.randomLocation(rng), False))
 
         storyState.numHumans += 1
     elif(storyState.numMonsters == 0):
         charactersInList.append(Character(ID, "The Monster", CharacterType.MONSTER, 
-                                determineGender(), selectDescription(1), 
+                                determineGender(rng), selectDescription(1, rng), 
                                 True, CharacterHealth.HEALTHY, 0, 
-                                random.randint(1,4), False))
+                                world.randomLocation(rng), False))
 
         storyState.numMonsters += 1
 
-    f.close()
-
     return charactersInList
 
+# Separates the parts of the story
+STORY_BREAK = narrationEvent(STORY, "break")
+
 def introduceWorld(storyState, characters):
     """
         Brief: introduceWorld
 
-        Checks to see the number of monsters and humans, and returns a simple
-        introduction to the storySequence list.
+        Checks to see the number of monsters and humans, and yields a simple
+        introduction to the story sequence.
 
         Param: characters is a list of Character instances.
 
-        Returns a list containing the introductory text of the story sequence.
+        Yields the NarrationEvents introducing the story sequence.
     """
-    storySequence = []
-
-    storySequence.append("In this world there are monsters and humans.")
+    yield narrationEvent(WORLD, "introduced")
 
     if(storyState.numHumans == 1):
-        storySequence.append(" A human must find " + str(storyState.numMonsters) + 
-                             " monsters, and destroy them.")
+        yield narrationEvent(WORLD, "one_human", None, storyState.numMonsters)
     elif(storyState.numMonsters == 1):
-        storySequence.append(" The humans must find the monster, and destroy it.")
+        yield narrationEvent(WORLD, "one_monster")
     else:
-        storySequence.append(" The " + str(storyState.numHumans) + 
-                             " humans must find the " + str(storyState.numMonsters) + 
-                             " monsters, and destroy them.")
-
-    return storySequence
+        yield narrationEvent(WORLD, "many", None, storyState.numHumans, storyState.numMonsters)
 
 def introduceCharacters(characters):
     """
         Brief: introduceCharacters
 
-        Checks to see t-he number of monsters and humans, and returns a list 
-        containing a sentence for each character, describing them using the 
-        randomly generated descriptions.
+        Checks to see t-he number of monsters and humans, and yields a 
+        sentence for each character, describing them using the randomly 
+        generated descriptions.
 
         Param: characters is a list of Character instances
 
-        Returns a list containing the introductory text of the story sequence.
+        Yields the NarrationEvents introducing the characters.
     """
-    storySequence = []
-
     for character in characters:
-        storySequence.append(character.name + " was a " + character.appearance + 
-                             " " + character.characterType + ".")
-
-    return storySequence
+        yield narrationEvent(CHARACTER, "introduced", None, character.name, character.appearance,
+                             character.characterType)
 
 def concludeStory(storyState, characters):
     """
         Brief: concludeStory
 
-        Saves the results of the story to the storySequence list.
+        Yields the results of the story.
 
         Param: storyState is the state of the story.
         Param: characters is the list of Character instances.
 
-        Returns a list contaiing the conclusion of the story.
+        Yields the NarrationEvents concluding the story.
     """
-    storySequence = []
-
-    storySequence.append("\n\n")
+    yield STORY_BREAK
 
-    storySequence.append("Thus, the story ends.")
+    yield narrationEvent(STORY, "ended")
 
     if(storyState.numMonsters == storyState.numMonstersDead and storyState.numMonsters > 1):
-        storySequence.append("The monsters were defeated.")
+        yield narrationEvent(STORY, "monsters_defeated")
     elif(storyState.numMonsters == storyState.numMonstersDead):
-        storySequence.append("The monsters was defeated.")
+        yield narrationEvent(STORY, "monster_defeated")
     else:
-        storySequence.append("The humans had failed to defeat the monsters.")
+        yield narrationEvent(STORY, "humans_failed")
 
     for character in characters:
         if(character.alive):
-            storySequence.append(character.name + " survived.")
+            yield narrationEvent(CHARACTER, "survived", None, character.name)
         elif(character.position == -1):
-            storySequence.append(character.name + " escaped.")
+            yield narrationEvent(CHARACTER, "escaped", None, character.name)
         else:
-            storySequence.append(character.name + " died.")
-
-    return storySequence
+            yield narrationEvent(CHARACTER, "died", None, character.name)
 
 def printSequence(storySequence):
     """
@@ -183,17 +360,9 @@ def printSequence(storySequence):
         Param: storySequence is a list containing the introductions and 
         action strings performed by each characters.
     """
-    storyString = ""
-
-    for sequence in storySequence:
-        if(storyString == ""):
-            storyString = sequence
-        else:
-            storyString = storyString + " " + sequence
-
-    print(storyString)    
+    StreamSink().writeSequence(storySequence)
     
-def selectDescription(descriptionType):
+def selectDescription(descriptionType, rng=random):
     """
         Brief: selectDescription
 
@@ -202,213 +371,574 @@ def selectDescription(descriptionType):
         Param: descriptionType is used to differentiate between a description 
         for a character themselves, an action, and other features of the 
         character.
+        Param: rng is the random number generator of the story.
 
         Returns an adjective or adverb.
     """
     if(descriptionType == 1):
         words = [SubjectAdjective.ATTRACTIVE, SubjectAdjective.BEAUTIFUL,
-		 SubjectAdjective.FETCHING, SubjectAdjective.GROTESQUE,
-		 SubjectAdjective.HANDSOME, SubjectAdjective.HIDEOUS,
-		 SubjectAdjective.PRETTY, SubjectAdjective.TERRIBLE,
-		 SubjectAdjective.UGLY, SubjectAdjective.VILE]
-	
-	randomizer = random.randint(0, len(words) - 1)
+                 SubjectAdjective.FETCHING, SubjectAdjective.GROTESQUE,
+                 SubjectAdjective.HANDSOME, SubjectAdjective.HIDEOUS,
+                 SubjectAdjective.PRETTY, SubjectAdjective.TERRIBLE,
+                 SubjectAdjective.UGLY, SubjectAdjective.VILE]
+
+        randomizer = rng.randint(0, len(words) - 1)
 
         return words[randomizer]
 
-def actionOutcome(storyState, characters, character, action):
+def storyRandom(masterSeed, storyIndex):
     """
-        Brief: actionOutcome
+        Brief: storyRandom
 
-        Updates the storyState and character information based on the given action.
+        Creates the random number generator of one story in a seeded batch. It
+        depends only on the master seed and the story's index, so a story plays
+        out the same however the batch is split, and can be told again alone.
 
-        Param: storyState is the state of the story
-        Param: characters is a list of Character instances
-        Param: character is the particular character performing the action.
-        Param: action is the action that is being processed.
-
-        Returns a string detailing the action performed and their results.
-    """
-    actionString = character.name + " " + action + " "
-    if(action == Action.ATTACKED):
-        randomizer = random.randint(1,100)
-
-        if(isConflict(characters, character)):
-            for otherCharacter in characters:
-                if(otherCharacter.ID == character.ID 
-                   or not otherCharacter.alive):
-                    continue
-                elif(character.isHuman() and otherCharacter.isMonster() 
-                     and randomizer < 31):
-                    storyState.numMonstersDead += 1
-                    otherCharacter.alive = False
-                    actionString += "the monster, " + otherCharacter.name + ", killing it. "
-                    break
-                elif(character.isHuman() and otherCharacter.isMonster() 
-                     and randomizer > 30):
-                    actionString += "the monster, " + otherCharacter.name + ", but failed to kill it. "
-                    break
-                elif(character.isMonster() and otherCharacter.isHuman()
-                     and randomizer > 30):
-                    storyState.numHumansDead += 1
-                    otherCharacter.alive = False
-
-                    if(otherCharacter.gender == Gender.MALE):
-                        actionString = character.name + " " + action + " " + otherCharacter.name + ", killing him. "
-                    else:
-                        actionString = character.name + " " + action + " " + otherCharacter.name + ", killing her. "
-                    break
-                elif(character.isMonster() and otherCharacter.isHuman()
-                     and character.alive and randomizer < 31):
-                    if(otherCharacter.gender == Gender.MALE):
-                        actionString += otherCharacter.name + ", but he managed to get away. "
-                    else:
-                        actionString += otherCharacter.name + ", but she managed to get away. "
-                    break
-
-    elif(action == Action.ESCAPED):
-        randomizer = random.randint(1,100)
-
-        if(randomizer < 11):
-            character.position = -1
-            storyState.numEscaped += 1
-            actionString += "from the monsters' domain. "
-        else:
-            actionString = character.name + " attempted to escape from the monster' domain, but failed. "
-    elif(action == Action.INVESTIGATED):
-        randomizer = random.randint(1,3)
-        findRandomizer = random.randint(1,2)
-
-        if(randomizer == 1 and (character.position > 1 and character.position < 4)): 
-            character.position -= 1
-        elif(randomizer == 2 and (character.position > 1 and character.position < 4)): 
-            character.position += 1
-        elif(randomizer == 3):
-            character.position = character.position
-        elif(character.position == 1): 
-            character.position = 2
-        elif(character.position == 4): 
-            character.position = 3
-
-        if(findRandomizer == 1 and isConflict(characters, character)):
-            character.aware = True
-        
-            for otherCharacter in characters:
-                if(character.isHuman() and otherCharacter.isMonster()):
-                    actionString += "finding the monster, " + otherCharacter.name + ". "
-                    break
-                elif(character.isMonster() and otherCharacter.isHuman()):
-                    actionString = " The monster, " + character.name + ", " + action + " finding " + otherCharacter.name + ". "
-        elif(findRandomizer > 1 or not isConflict(characters, character)):
-            actionString += "finding nothing."
-    elif(action == Action.RAN):
-        randomizer = random.randint(1,2)
-
-        if(randomizer == 1 and character.position > 2):
-            character.position -= 2
-        elif(randomizer == 2 and character.position < 3):
-           character.position += 2
-
-        if(character.isHuman()):
-            actionString += "fleeing in terror. "
-        else:
-            actionString += "fleeing to tend to its wounds. "
+        Param: masterSeed is the seed of the batch.
+        Param: storyIndex is the position of the story in the batch.
+
+        Returns a random.Random instance.
+    """
+    return random.Random("%d/%d" % (masterSeed, storyIndex))
+
+def tellStory(fileName, dataConnection, sink=None, searchAgent=None, rng=random, checkpoint=None,
+              world=None):
+    """
+        Brief: tellStory
+
+        Loads the characters and lets them act until the story is complete,
+        recording every action taken in the database. Each sentence is written
+        to the sink as soon as it is produced.
+
+        Param: fileName is the name of the file containing the character names.
+        Param: dataConnection is the Database used for action likelihoods.
+        Param: sink is the NarrationSink the story is written to. It defaults
+        to standard output; headless runs pass a NullSink.
+        Param: searchAgent chooses the characters' actions each round. It
+        defaults to a plain Action searching with dataConnection.
+        Param: rng is the random number generator of the story. It defaults to
+        the global random module.
+        Param: checkpoint is an optional Checkpointer saving the story as it
+        is told.
+        Param: world is the World of the story. It defaults to the four
+        positions in a row.
+
+        Returns the final state of the story.
+    """
+    storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+
+    characters = loadCharacters(fileName, storyState, rng, world=world)
+
+    if(sink is None):
+        sink = StreamSink()
+
+    if(searchAgent is None):
+        searchAgent = Action(dataConnection)
+
+    if(checkpoint is not None):
+        checkpoint.bind(storyState, characters, dataConnection, sink, rng)
 
-    return actionString
+    sink.consume(narrateStory(storyState, characters, dataConnection, searchAgent, rng, checkpoint))
 
+    return storyState
 
-def isConflict(characters, character):
+def resumeStory(savedStory, dataConnection, sink, searchAgent, rng, checkpoint=None):
     """
-        Brief: isConflict
+        Brief: resumeStory
+
+        Carries on telling a story from a checkpoint, from the start of the
+        round it was taken at.
+
+        Param: savedStory is the checkpoint read by loadCheckpoint.
+        Param: dataConnection is the Database used for action likelihoods.
+        Changes the story held in memory when it was saved are restored.
+        Param: sink is the NarrationSink the rest of the story is written to.
+        Param: searchAgent chooses the characters' actions each round.
+        Param: rng is the random number generator of the story. Its state is
+        set to the saved one.
+        Param: checkpoint is an optional Checkpointer saving the story as it
+        is told.
+
+        Returns the final state of the story.
+    """
+    storyState = savedStory["story"]
+    characters = savedStory["roster"]
 
-        Checks to see if the position the character is currently in is occupied
-        by the opposite character type.
+    rng.setstate(savedStory["rng"])
 
-        Param: characters is a list of Character instances
-        Param: character is the particular character being used as a reference.
+    dataConnection.actionDeltas = savedStory["action_deltas"]
+    dataConnection.outcomeDeltas = savedStory["outcome_deltas"]
+    dataConnection.storyRecords = savedStory.get("story_records", [])
+
+    if(checkpoint is not None):
+        checkpoint.bind(storyState, characters, dataConnection, sink, rng)
 
-        Returns a boolean based on whether or not there is a  conflict or not.
+    sink.consume(narrateStory(storyState, characters, dataConnection, searchAgent, rng,
+                              checkpoint, savedStory["round"]))
+
+    return storyState
+
+def narrateStory(storyState, characters, dataConnection, searchAgent, rng=random, checkpoint=None,
+                 firstRound=None):
     """
-    humansInPosition = 0
-    monstersInPosition = 0
+        Brief: narrateStory
+
+        Lets the characters act until the story is complete, recording every
+        action taken and the outcome in the database.
+
+        Param: storyState is the state of the story.
+        Param: characters is a Roster of Character instances.
+        Param: dataConnection is the Database used for action likelihoods.
+        Param: searchAgent chooses the characters' actions each round.
+        Param: rng is the random number generator of the story.
+        Param: checkpoint is called with the number of rounds told at the start
+        of every round, once everything before it has been written.
+        Param: firstRound is the round a resumed story carries on from. The
+        story is introduced only when it is None.
+
+        Yields the NarrationEvents of the story as they happen, with None after
+        each sequence.
+    """
+    roundNumber = firstRound
+    start = time.time()
+
+    if(firstRound is None):
+        # Introduce world
+        yield from introduceWorld(storyState, characters)
+
+        yield STORY_BREAK
+        yield None
+
+        # Introduce characters to the story.
+        yield from introduceCharacters(characters)
+
+        yield None
+
+        roundNumber = 0
+
+    # Characters act building tension
+    while(not storyState.storyComplete):
+        if(checkpoint is not None):
+            checkpoint(roundNumber)
+
+        roundNumber += 1
 
-    for c in characters:
-        if(c.ID == character.ID):
-            continue
-        elif(c.isHuman() and c.position == character.position):
-            humansInPosition += 1
-        elif(c.isMonster() and c.position == character.position):
-            monstersInPosition += 1
+        yield STORY_BREAK
 
-    if((character.isMonster() and humansInPosition > 0)
-       or (character.isHuman() and monstersInPosition > 0)):
-        return True
+        characterActions = searchAgent.getAction(storyState, characters)
+
+        yield from playRound(storyState, characters, characterActions, rng, dataConnection)
+
+        yield None
+
+    # Story concludes
+    yield from concludeStory(storyState, characters)
+
+    yield None
+
+    dataConnection.updateOutcome(storyState, roundNumber, time.time() - start)
+
+SEARCH_ENGINES = {"minimax": Action,
+                  "position": PositionSearch,
+                  "parallel": ParallelSearch,
+                  "mcts": MonteCarloSearch}
+
+def createSearchAgent(dataConnection, options=None, rng=random):
+    """
+        Brief: createSearchAgent
+
+        Builds the Action that chooses the characters' actions from the search
+        options given on the command line.
+
+        Param: dataConnection is the Database used for action likelihoods.
+        Param: options holds the parsed search arguments, or None for defaults.
+        Param: rng is the random number generator of the story, which the
+        playouts of the Monte Carlo engine are seeded from every round.
+
+        Returns the Action.
+    """
+    if(options is None):
+        return Action(dataConnection)
+
+    transpositionTable = None
+
+    if(options.transposition_size > 0):
+        transpositionTable = TranspositionTable(options.transposition_size)
+
+    searchEngine = SEARCH_ENGINES[options.search_engine]
+
+    if(searchEngine is ParallelSearch):
+        return ParallelSearch(dataConnection, transpositionTable, options.search_budget_ms,
+                              options.search_budget_nodes, workers=options.search_workers)
+
+    if(searchEngine is MonteCarloSearch):
+        return MonteCarloSearch(dataConnection, timeBudget=options.search_budget_ms,
+                                nodeBudget=options.search_budget_nodes, playouts=options.mcts_playouts,
+                                horizon=options.mcts_horizon, seedFrom=rng)
+
+    return searchEngine(dataConnection, transpositionTable,
+                        options.search_budget_ms, options.search_budget_nodes)
+
+def simulateStories(fileName, firstStory, numStories, databaseName, masterSeed, options=None):
+    """
+        Brief: simulateStories
+
+        Tells a number of headless stories in one worker. Actions and outcomes
+        are counted in memory and returned instead of written to the database.
+        Every story gets its own random number generator and search agent, so
+        it plays out the same whichever worker tells it.
+
+        Param: fileName is the name of the file containing the character names.
+        Param: firstStory is the index of the first story in the batch.
+        Param: numStories is the number of stories to tell.
+        Param: databaseName is the database file the likelihoods are read from.
+        Param: masterSeed is the seed of the batch.
+        Param: options holds the parsed search arguments, or None for defaults.
+
+        Returns a tuple of the action deltas, the outcome deltas and the story
+        records.
+    """
+    dataConnection = Database(databaseName, deferred=True)
+    dataConnection.loadActionUsage()
+
+    world = loadWorld(options)
+
+    try:
+        for story in range(firstStory, firstStory + numStories):
+            rng = storyRandom(masterSeed, story)
+            searchAgent = createSearchAgent(dataConnection, options, rng)
+
+            tellStory(fileName, dataConnection, NullSink(), searchAgent, rng, world=world)
+    finally:
+        # The worker telling this batch cannot exit while search pools it
+        # started are still open
+        closeSearchPools()
+
+    deltas = dataConnection.takeDeltas()
+
+    dataConnection.close()
+
+    return deltas
+
+def runSimulation(fileName, numStories, numWorkers, databaseName="outcomes.db", options=None,
+                  masterSeed=None, firstStory=0):
+    """
+        Brief: runSimulation
+
+        Splits a batch of headless stories across a pool of worker processes and
+        merges their action and outcome counts into the database in a single
+        transaction.
+
+        Param: fileName is the name of the file containing the character names.
+        Param: numStories is the number of stories to tell.
+        Param: numWorkers is the number of worker processes.
+        Param: databaseName is the database file to update.
+        Param: options holds the parsed search arguments, or None for defaults.
+        Param: masterSeed is the seed of the batch. A random one is used if it
+        is None.
+        Param: firstStory is the index given to the first story, so part of a
+        batch can be told again on its own.
+
+        Returns the number of stories told per second.
+    """
+    if(masterSeed is None):
+        masterSeed = random.randrange(2 ** 32)
+
+    dataConnection = Database(databaseName)
+
+    dataConnection.createDBAndTables()
+    dataConnection.insertRecords()
+
+    numWorkers = max(1, min(numWorkers, numStories))
+    batches = [numStories // numWorkers] * numWorkers
+
+    for i in range(numStories % numWorkers):
+        batches[i] += 1
+
+    firstStories = []
+
+    for i in range(numWorkers):
+        firstStories.append(firstStory + sum(batches[:i]))
+
+    actionDeltas = {}
+    outcomeDeltas = {}
+    storyRecords = []
+
+    start = time.time()
+
+    if(numWorkers == 1):
+        results = [simulateStories(fileName, firstStory, numStories, databaseName, masterSeed, options)]
+    else:
+        with ProcessPoolExecutor(max_workers=numWorkers) as pool:
+            results = list(pool.map(simulateStories, [fileName] * numWorkers,
+                                    firstStories, batches, [databaseName] * numWorkers,
+                                    [masterSeed] * numWorkers, [options] * numWorkers))
+
+    for workerActions, workerOutcomes, workerStories in results:
+        for key in workerActions:
+            actionDeltas[key] = actionDeltas.get(key, 0) + workerActions[key]
+
+        for winner in workerOutcomes:
+            outcomeDeltas[winner] = outcomeDeltas.get(winner, 0) + workerOutcomes[winner]
+
+        storyRecords.extend(workerStories)
+
+    dataConnection.applyDeltas(actionDeltas, outcomeDeltas, storyRecords)
+
+    elapsed = time.time() - start
+
+    if(elapsed > 0):
+        return numStories / elapsed
+    else:
+        return float("inf")
+
+def loadWorld(options=None):
+    """
+        Brief: loadWorld
+
+        Loads the World named by the --world option.
+
+        Param: options holds the parsed arguments, or None for defaults.
+
+        Returns the World, or None for the default one.
+    """
+    if(options is None or getattr(options, "world", None) is None):
+        return None
+
+    return World.load(options.world)
+
+def positiveInteger(text):
+    """
+        Brief: positiveInteger
+
+        Reads a command line argument that must be a whole number of at least 1.
+
+        Param: text is the argument as given.
+
+        Returns the number.
+    """
+    try:
+        number = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("not a whole number: %s" % text)
+
+    if(number < 1):
+        raise argparse.ArgumentTypeError("must be at least 1: %s" % text)
+
+    return number
+
+def addWorldArguments(parser):
+    """
+        Brief: addWorldArguments
+
+        Adds the options describing the world of the story.
+
+        Param: parser is the ArgumentParser the options are added to.
+    """
+    parser.add_argument("--world", default=None,
+                        help="JSON file of the world map (default: four positions in a row)")
+
+def addSearchArguments(parser):
+    """
+        Brief: addSearchArguments
+
+        Adds the options controlling the search for the characters' actions.
+
+        Param: parser is the ArgumentParser the options are added to.
+    """
+    parser.add_argument("--search-engine", choices=sorted(SEARCH_ENGINES), default="minimax",
+                        help="search over the whole roster (minimax), find the same actions without searching "
+                             "when only humans choose (position), search on several cores (parallel) or play "
+                             "rounds out at random (mcts)")
+    parser.add_argument("--search-workers", type=int, default=None,
+                        help="worker processes of the parallel search engine (default: one per core)")
+    parser.add_argument("--mcts-playouts", type=int, default=200,
+                        help="playouts of each round of the mcts engine")
+    parser.add_argument("--mcts-horizon", type=int, default=3,
+                        help="rounds each playout of the mcts engine lasts")
+    parser.add_argument("--transposition-size", type=int, default=0,
+                        help="number of search states to cache between rounds (0 disables the cache)")
+    parser.add_argument("--search-budget-ms", type=float, default=None,
+                        help="milliseconds each round may search before settling for the best actions so far")
+    parser.add_argument("--search-budget-nodes", type=int, default=None,
+                        help="search states each round may visit before settling for the best actions so far")
+
+def parseArguments(argv):
+    """
+        Brief: parseArguments
+
+        Parses the command line. "storyCreator.py roster.txt" tells a single
+        story, "storyCreator.py simulate --stories N --workers K roster.txt"
+        runs a headless batch.
+
+        Param: argv is the list of command line arguments, without the program name.
+
+        Returns the parsed arguments.
+    """
+    if(len(argv) > 0 and argv[0] == "simulate"):
+        parser = argparse.ArgumentParser(prog="storyCreator.py simulate",
+                                         description="Run headless stories to build the likelihood tables.")
+        parser.add_argument("--stories", type=int, default=100,
+                            help="number of stories to tell")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="number of worker processes")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="master seed of the batch (random if omitted)")
+        parser.add_argument("--first-story", type=int, default=0,
+                            help="index of the first story, to tell part of a seeded batch again")
+        addWorldArguments(parser)
+        addSearchArguments(parser)
+        parser.add_argument("roster", help="file containing the character names")
+
+        args = parser.parse_args(argv[1:])
+        args.command = "simulate"
     else:
-        return False
+        parser = argparse.ArgumentParser(prog="storyCreator.py",
+                                         description="Tell a story about monsters and humans.")
+        addWorldArguments(parser)
+        addSearchArguments(parser)
+        parser.add_argument("--output", default=None,
+                            help="file the story is written to instead of standard output")
+        parser.add_argument("--narration", choices=sorted(RENDERERS), default="text",
+                            help="write the story as prose (text), as JSON events (json) or not at all (none)")
+        parser.add_argument("--profile", default=None,
+                            help="file a JSON profile of every round's search is written to")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="tell the story of a seeded simulate batch with this master seed")
+        parser.add_argument("--story-index", type=int, default=0,
+                            help="index of the story in the seeded batch")
+        parser.add_argument("--event-log", default=None,
+                            help="append actions and outcomes to this log and compact it into the database in batches")
+        parser.add_argument("--compact-records", type=int, default=10000,
+                            help="number of logged records that triggers a compaction")
+        parser.add_argument("--compact-seconds", type=float, default=30.0,
+                            help="seconds after which a logged record triggers a compaction")
+        parser.add_argument("--checkpoint", default=None,
+                            help="file the story is saved to every few rounds so it can be resumed; the story is "
+                                 "written to the database when it ends")
+        parser.add_argument("--checkpoint-every", type=positiveInteger, default=5,
+                            help="number of rounds between checkpoints")
+        parser.add_argument("--resume", default=None,
+                            help="carry on the story saved in this checkpoint, with the options it was started with")
+        parser.add_argument("roster", nargs="?", default=None,
+                            help="file containing the character names")
+
+        args = parser.parse_args(argv)
+        args.command = "story"
+
+        if(args.roster is None and args.resume is None):
+            parser.error("a roster file or --resume is required")
+
+    return args
 
 if __name__ == '__main__':
-    storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+    args = parseArguments(sys.argv[1:])
+
+    if(args.command == "simulate"):
+        if(args.seed is None):
+            args.seed = random.randrange(2 ** 32)
+
+        storiesPerSecond = runSimulation(args.roster, args.stories, args.workers, options=args,
+                                         masterSeed=args.seed, firstStory=args.first_story)
+
+        print("%d stories told at %.1f stories per second (seed %d)" % (args.stories, storiesPerSecond, args.seed))
+
+        Database().getOutcomes()
+        sys.exit(0)
+
+    savedStory = None
+
+    # A resumed story is told with the options it was started with
+    if(args.resume is not None):
+        savedStory = loadCheckpoint(args.resume)
+
+        # Options added since the checkpoint was written keep their defaults
+        arguments = dict(vars(args))
+        arguments.update(savedStory["arguments"])
+        arguments["resume"] = args.resume
+        arguments["checkpoint"] = args.checkpoint or args.resume
 
-    characters = loadCharacters(sys.argv[1], storyState)
+        args = argparse.Namespace(**arguments)
 
-    # Create DB and Table that will be used to store outcomes
-    dataConnection = Database()
+    # Create DB and Table that will be used to store outcomes. A single
+    # connection is kept open for the whole story. A seeded story is told the
+    # way a simulate batch tells it, with its writes held until the end. So is
+    # a checkpointed one: its checkpoints carry the writes held so far, and a
+    # resumed story would count the rounds it tells again twice if they had
+    # already been written.
+    deferred = args.seed is not None or args.checkpoint is not None
+
+    dataConnection = Database(persistent=True, deferred=deferred, logFile=args.event_log,
+                              compactRecords=args.compact_records, compactSeconds=args.compact_seconds)
 
     dataConnection.createDBAndTables()
     dataConnection.insertRecords()
 
-    storySequence = []
-
-    # Introduce world
-    storySequence = introduceWorld(storyState, characters)
+    if(args.seed is not None):
+        rng = storyRandom(args.seed, args.story_index)
+    else:
+        rng = random
 
-    storySequence.append("\n\n")
+    searchAgent = createSearchAgent(dataConnection, args, rng)
 
-    printSequence(storySequence)
+    profiler = None
 
-    # Introduce characters to the story.
-    storySequence = introduceCharacters(characters)
+    if(args.profile is not None):
+        profiler = SearchProfiler()
+        profiler.attach(searchAgent)
 
-    printSequence(storySequence)
+    narrationWritten = None
 
-    storySequence = []
+    if(savedStory is not None):
+        narrationWritten = savedStory["narration"]
 
-    # Characters act building tension
-    while(not storyState.storyComplete):
-        storySequence.append("\n\n")
+    if(args.output is not None):
+        sink = FileSink(args.output, narrationWritten, RENDERERS[args.narration]())
+    else:
+        sink = StreamSink(renderer=RENDERERS[args.narration]())
+        sink.written = narrationWritten or 0
 
-        a = Action()
+    checkpoint = None
 
-        characterActions = a.getAction(storyState, characters)
+    if(args.checkpoint is not None):
+        checkpoint = Checkpointer(args.checkpoint, args.checkpoint_every, vars(args))
 
-        for i in range(len(characterActions)):
-            if(characterActions[i] == Action.ATTACKED 
-               and not isConflict(characters, characters[i])):
-                continue
-            elif(characters[i].alive
-                 and characters[i].position > -1):
-                storySequence.append(actionOutcome(storyState, characters, characters[i], characterActions[i]))
+    if(savedStory is not None):
+        resumeStory(savedStory, dataConnection, sink, searchAgent, rng, checkpoint)
+    else:
+        tellStory(args.roster, dataConnection, sink, searchAgent, rng, checkpoint, loadWorld(args))
 
-                # Store results to database to determine the likelihood of actions
-                dataConnection.updateAction(characterActions[i], characters[i].characterType)
+    sink.close()
 
-            if((storyState.numHumansDead + storyState.numEscaped) == storyState.numHumans 
-                or storyState.numMonstersDead == storyState.numMonsters):
-                storyState.storyComplete = True
-                break
+    if(checkpoint is not None):
+        checkpoint.remove()
 
-        printSequence(storySequence)
+    if(deferred):
+        actionDeltas, outcomeDeltas, storyRecords = dataConnection.takeDeltas()
 
-        storySequence = []
+        # Held writes go through the event log when there is one
+        if(dataConnection.logFile is not None):
+            dataConnection.logDeltas(actionDeltas, outcomeDeltas, storyRecords)
+        else:
+            dataConnection.applyDeltas(actionDeltas, outcomeDeltas, storyRecords)
 
-    # Story concludes
-    storySequence = concludeStory(storyState, characters)
+    if(profiler is not None):
+        profiler.dump(args.profile)
 
-    printSequence(storySequence)
+    if(dataConnection.log is not None):
+        dataConnection.compactLog()
 
-    dataConnection.updateOutcome(storyState)
     dataConnection.getOutcomes()
     print("ATTACK: %s" % dataConnection.getActionUsage("attacked", "human"))
     print("ESCAPE: %s" % dataConnection.getActionUsage("escaped", "human"))
     print("INVESTIGATE: %s" % dataConnection.getActionUsage("investigated", "human"))
     print("RAN: %s" % dataConnection.getActionUsage("ran", "human"))
+
+    transpositionTable = searchAgent.transpositionTable
+
+    if(transpositionTable is not None):
+        print("TRANSPOSITION TABLE: %d hits, %d misses, %d evictions (%.1f%% hit rate)"
+              % (transpositionTable.hits, transpositionTable.misses,
+                 transpositionTable.evictions, 100 * transpositionTable.hitRate()))
+
+    dataConnection.close()
@@ -0,0 +1,473 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from database import Database
+from narration import RENDERERS, NarrationSink
+from story import Story
+from storyCreator import (SEARCH_ENGINES, addWorldArguments, buildRoster, createSearchAgent, loadWorld,
+                          narrateStory, parseRosterEntry, storyRandom)
+from world import DEFAULT_WORLD
+
+# Marks the end of a story's narration on its queue
+END_OF_STORY = None
+
+class StoryCancelled(Exception):
+    """
+        Raised inside a worker when the client of its story has gone away.
+    """
+    pass
+
+class QueueSink(NarrationSink):
+    """
+        Collects each sequence of a story told in a worker thread and hands it
+        to the event loop. A full queue blocks the worker while its client
+        catches up, for at most writeTimeout seconds a sequence; after that,
+        or once the client has gone away, the story is cancelled at the end of
+        its next sequence, whatever it is rendered as, and the worker is free.
+    """
+    def __init__(self, loop, queue, renderer=None, writeTimeout=30.0):
+        NarrationSink.__init__(self, renderer)
+
+        self.loop = loop
+        self.queue = queue
+        self.writeTimeout = writeTimeout
+        self.text = []
+        self.cancelled = False
+
+    def consume(self, narration):
+        renderer = self.renderer
+
+        for event in narration:
+            if(event is None):
+                if(self.cancelled):
+                    raise StoryCancelled()
+
+                renderer.endSequence(self)
+            else:
+                renderer.writeEvent(self, event)
+
+    def emit(self, text):
+        self.text.append(text)
+
+    def flush(self):
+        sequence = "".join(self.text)
+        self.text = []
+
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(sequence), self.loop)
+
+        try:
+            future.result(self.writeTimeout)
+        except FutureTimeout:
+            future.cancel()
+            self.cancelled = True
+
+            raise StoryCancelled()
+
+class BatchWriter:
+    """
+        Owns the only Database that writes to the database file. Stories are
+        told against snapshots of its percentages and hand in their action and
+        outcome counts when they end; the counts of every story waiting are
+        merged and written in one transaction. Once maxPending stories are
+        waiting, submit blocks until the next batch is written.
+    """
+    def __init__(self, dataConnection, maxPending=64, batchSize=32, interval=0.05):
+        """
+            Brief: __init__
+
+            Param: dataConnection is the persistent Database written to.
+            Param: maxPending is the number of finished stories that may wait
+            to be written.
+            Param: batchSize is the largest number of stories written at once.
+            Param: interval is the number of seconds the writer waits after the
+            first story of a batch for others to arrive.
+        """
+        self.dataConnection = dataConnection
+        self.batchSize = batchSize
+        self.interval = interval
+        self.queue = asyncio.Queue(maxPending)
+        self.task = None
+        self.batches = 0
+        self.stories = 0
+
+    def start(self):
+        self.dataConnection.loadActionUsage()
+
+        self.task = asyncio.ensure_future(self.run())
+
+    def snapshot(self):
+        """
+            Brief: snapshot
+
+            Returns a deferred Database a story can be told with, starting from
+            the percentages written so far.
+        """
+        return self.dataConnection.snapshot()
+
+    async def submit(self, actionDeltas, outcomeDeltas, storyRecords):
+        await self.queue.put((actionDeltas, outcomeDeltas, storyRecords))
+
+    async def run(self):
+        running = True
+
+        while(running):
+            batch = [await self.queue.get()]
+
+            if(batch[0] is not END_OF_STORY):
+                await asyncio.sleep(self.interval)
+
+            while(len(batch) < self.batchSize and not self.queue.empty()):
+                batch.append(self.queue.get_nowait())
+
+            actionDeltas = {}
+            outcomeDeltas = {}
+            storyRecords = []
+
+            for deltas in batch:
+                if(deltas is END_OF_STORY):
+                    running = False
+                    continue
+
+                for key in deltas[0]:
+                    actionDeltas[key] = actionDeltas.get(key, 0) + deltas[0][key]
+
+                for winner in deltas[1]:
+                    outcomeDeltas[winner] = outcomeDeltas.get(winner, 0) + deltas[1][winner]
+
+                storyRecords.extend(deltas[2])
+
+                self.stories += 1
+
+            if(len(actionDeltas) > 0 or len(outcomeDeltas) > 0):
+                self.dataConnection.applyDeltas(actionDeltas, outcomeDeltas, storyRecords)
+                self.batches += 1
+
+    async def close(self):
+        """
+            Brief: close
+
+            Writes every story still waiting and closes the database.
+        """
+        await self.queue.put(END_OF_STORY)
+        await self.task
+
+        self.dataConnection.close()
+
+class StoryServer:
+    """
+        Tells stories for clients of a local TCP or Unix socket. A client sends
+        one JSON object on a line:
+
+            {"roster": ["Mina", {"name": "Dracula", "type": "monster"}],
+             "seed": 7, "story_index": 0, "search_engine": "position"}
+
+        Only the roster is required. Its entries are names or objects with the
+        fields of a JSONL roster file. With a seed the story is the one
+        "storyCreator.py --seed" tells. The search options match the command
+        line ones, with underscores, and "narration": "json" sends the story
+        as JSON events instead of prose.
+
+        The server answers with JSON lines: {"text": ...} for every sequence
+        of the story as it is told, then {"winner": ..., "tension": ...}, or
+        {"error": ...} if the request cannot be served. A client that closes
+        its connection, or only its sending side, before the answer cancels
+        its story, and so does one that takes more than writeTimeout seconds
+        to read a line.
+    """
+    def __init__(self, writer, workers=4, maxStories=None, maxWaiting=32, maxCharacters=16, world=None,
+                 writeTimeout=30.0):
+        """
+            Brief: __init__
+
+            Param: writer is the BatchWriter recording the stories.
+            Param: workers is the number of threads telling stories.
+            Param: maxStories is the number of stories told at once. It
+            defaults to the number of workers, as a story admitted beyond them
+            would only wait for a thread.
+            Param: maxWaiting is the number of requests that may wait for a
+            story to finish before new ones are turned away.
+            Param: maxCharacters is the largest roster accepted.
+            Param: world is the World every story is told in, or None for the
+            default one.
+            Param: writeTimeout is the number of seconds a client may take to
+            read a line before its story is cancelled.
+        """
+        if(maxStories is None):
+            maxStories = workers
+
+        self.writer = writer
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = asyncio.Semaphore(maxStories)
+        self.maxStories = maxStories
+        self.maxWaiting = maxWaiting
+        self.maxCharacters = maxCharacters
+        self.world = world
+        self.writeTimeout = writeTimeout
+        self.requests = 0
+
+    def parseRequest(self, line):
+        """
+            Brief: parseRequest
+
+            Checks a request line.
+
+            Param: line is the bytes of the request.
+
+            Returns a tuple of the roster entries, the random number generator
+            of the story and the search and narration options.
+        """
+        request = json.loads(line.decode("utf-8"))
+
+        if(not isinstance(request, dict) or not isinstance(request.get("roster"), list)):
+            raise ValueError("request needs a roster list")
+
+        entries = []
+        world = self.world or DEFAULT_WORLD
+
+        for entry in request["roster"]:
+            if(isinstance(entry, str)):
+                entry = {"name": entry}
+            elif(not isinstance(entry, dict)):
+                raise ValueError("roster entries are names or objects: %s" % (entry,))
+
+            name, characterType, gender, position, appearance = parseRosterEntry(entry)
+
+            if(position is not None and not world.hasLocation(position)):
+                raise ValueError("%s starts at %d, which is not on the map" % (name, position))
+
+            entries.append(entry)
+
+        if(len(entries) > self.maxCharacters):
+            raise ValueError("roster has more than %d characters" % self.maxCharacters)
+
+        if(request.get("seed") is not None):
+            rng = storyRandom(int(request["seed"]), int(request.get("story_index", 0)))
+        else:
+            rng = random.Random()
+
+        options = argparse.Namespace(search_engine=request.get("search_engine", "minimax"),
+                                     transposition_size=int(request.get("transposition_size", 0)),
+                                     search_budget_ms=None,
+                                     search_budget_nodes=None,
+                                     search_workers=None,
+                                     mcts_playouts=int(request.get("mcts_playouts", 200)),
+                                     mcts_horizon=int(request.get("mcts_horizon", 3)),
+                                     narration=request.get("narration", "text"))
+
+        if(request.get("search_budget_ms") is not None):
+            options.search_budget_ms = float(request["search_budget_ms"])
+
+        if(request.get("search_budget_nodes") is not None):
+            options.search_budget_nodes = int(request["search_budget_nodes"])
+
+        if(options.search_engine not in SEARCH_ENGINES):
+            raise ValueError("unknown search engine: %s" % options.search_engine)
+
+        if(options.narration not in RENDERERS):
+            raise ValueError("unknown narration: %s" % options.narration)
+
+        return entries, rng, options
+
+    def tellStory(self, entries, rng, options, dataConnection, sink):
+        """
+            Brief: tellStory
+
+            Tells one story in a worker thread.
+
+            Returns a tuple of the final state of the story and its action and
+            outcome deltas.
+        """
+        storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+
+        characters = buildRoster(entries, storyState, rng, self.world)
+        searchAgent = createSearchAgent(dataConnection, options, rng)
+
+        sink.consume(narrateStory(storyState, characters, dataConnection, searchAgent, rng))
+
+        return storyState, dataConnection.takeDeltas()
+
+    async def send(self, stream, message):
+        stream.write((json.dumps(message) + "\n").encode("utf-8"))
+
+        await asyncio.wait_for(stream.drain(), self.writeTimeout)
+
+    async def relay(self, queue, stream, sink):
+        """
+            Brief: relay
+
+            Sends each sequence of a story to its client as it arrives. If the
+            client goes away or stops reading, the story is cancelled and the
+            rest of its sequences are dropped.
+        """
+        while(True):
+            sequence = await queue.get()
+
+            if(sequence is END_OF_STORY):
+                return
+
+            if(not sink.cancelled):
+                try:
+                    await self.send(stream, {"text": sequence})
+                except (ConnectionError, TimeoutError):
+                    sink.cancelled = True
+
+    async def watch(self, reader, sink):
+        """
+            Brief: watch
+
+            Cancels a story once its client has closed the connection, which is
+            otherwise only noticed when the next line is sent to it.
+        """
+        try:
+            while(await reader.read(4096) != b""):
+                pass
+        except ConnectionError:
+            pass
+
+        sink.cancelled = True
+
+    async def handle(self, reader, stream):
+        try:
+            try:
+                entries, rng, options = self.parseRequest(await reader.readline())
+            except (ValueError, TypeError) as error:
+                await self.send(stream, {"error": str(error)})
+                return
+
+            if(self.requests >= self.maxStories + self.maxWaiting):
+                await self.send(stream, {"error": "server busy"})
+                return
+
+            self.requests += 1
+
+            try:
+                async with self.slots:
+                    await self.serve(entries, rng, options, reader, stream)
+            finally:
+                self.requests -= 1
+        except (ConnectionError, TimeoutError):
+            pass
+        finally:
+            stream.close()
+
+    async def serve(self, entries, rng, options, reader, stream):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(4)
+        sink = QueueSink(loop, queue, RENDERERS[options.narration](), self.writeTimeout)
+
+        relay = asyncio.ensure_future(self.relay(queue, stream, sink))
+        watch = asyncio.ensure_future(self.watch(reader, sink))
+        error = None
+
+        try:
+            storyState, deltas = await loop.run_in_executor(self.executor, self.tellStory, entries, rng,
+                                                            options, self.writer.snapshot(), sink)
+        except StoryCancelled:
+            return
+        except Exception as failure:
+            error = failure
+        finally:
+            watch.cancel()
+
+            await queue.put(END_OF_STORY)
+            await relay
+
+        # The client hears why its story stopped once what was told is sent
+        if(error is not None):
+            await self.send(stream, {"error": str(error)})
+            return
+
+        # A story is only counted once it has been told to the end
+        await self.writer.submit(*deltas)
+
+        await self.send(stream, {"winner": next(iter(deltas[1])), "tension": storyState.tension})
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+async def serve(args):
+    """
+        Brief: serve
+
+        Runs the server until it is interrupted.
+
+        Param: args holds the parsed command line arguments.
+    """
+    dataConnection = Database(args.database, persistent=True)
+
+    dataConnection.createDBAndTables()
+    dataConnection.insertRecords()
+
+    writer = BatchWriter(dataConnection, args.max_pending, args.batch_size)
+    writer.start()
+
+    storyServer = StoryServer(writer, args.workers, args.max_stories, args.max_waiting, args.max_characters,
+                              loadWorld(args), args.write_timeout)
+
+    if(args.socket is not None):
+        server = await asyncio.start_unix_server(storyServer.handle, path=args.socket)
+        print("Listening on %s" % args.socket)
+    else:
+        server = await asyncio.start_server(storyServer.handle, args.host, args.port)
+        print("Listening on %s:%d" % (args.host, args.port))
+
+    sys.stdout.flush()
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        storyServer.close()
+        await writer.close()
+
+        print("%d stories written in %d batches" % (writer.stories, writer.batches))
+
+def parseArguments(argv):
+    """
+        Brief: parseArguments
+
+        Parses the command line.
+
+        Param: argv is the list of command line arguments, without the program name.
+
+        Returns the parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog="storyServer.py",
+                                     description="Tell stories for clients of a local socket.")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="TCP port to listen on")
+    parser.add_argument("--socket", default=None,
+                        help="Unix socket to listen on instead of TCP")
+    parser.add_argument("--database", default="outcomes.db",
+                        help="database file the stories are recorded in")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="number of threads telling stories")
+    parser.add_argument("--max-stories", type=int, default=None,
+                        help="number of stories told at once (default: the number of workers)")
+    parser.add_argument("--max-waiting", type=int, default=32,
+                        help="number of requests that may wait for a story slot before new ones are refused")
+    parser.add_argument("--max-characters", type=int, default=16,
+                        help="largest roster accepted")
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="finished stories that may wait to be written before stories block")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="largest number of stories written in one transaction")
+    parser.add_argument("--write-timeout", type=float, default=30.0,
+                        help="seconds a client may take to read a line before its story is cancelled")
+    addWorldArguments(parser)
+
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve(parseArguments(sys.argv[1:])))
+    except KeyboardInterrupt:
+        pass
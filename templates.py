@@ -0,0 +1,134 @@
+from character import Gender
+from rules import ATTACKED, ESCAPED, INVESTIGATED, RAN
+
+WORLD = "world"
+CHARACTER = "character"
+STORY = "story"
+
+GENDER_NAMES = {Gender.MALE: "male", Gender.FEMALE: "female"}
+
+class NarrationTemplate:
+    """
+        A sentence of the story with its blanks. Templates are built once, when
+        the module is loaded, and a NarrationEvent only fills in the blanks
+        when the sentence is rendered as text.
+    """
+    __slots__ = ("key", "fields", "text", "layout")
+
+    def __init__(self, key, fields, text, layout=False):
+        """
+            Brief: __init__
+
+            Param: key is the (subject, outcome, gender) tuple the template is
+            found by. The subject is an action, or WORLD, CHARACTER or STORY
+            for the rest of the story; gender is None unless the sentence
+            depends on it.
+            Param: fields names the values filling the blanks, in order.
+            Param: text is the sentence, with a %s for each blank.
+            Param: layout marks templates that only lay out the text.
+        """
+        self.key = key
+        self.fields = fields
+        self.text = text
+        self.layout = layout
+
+class NarrationEvent:
+    """
+        Something that happened in the story: a template and the values of its
+        blanks. Rendering it is left to the sink it is written to, so a story
+        nobody reads is never formatted.
+    """
+    __slots__ = ("template", "arguments")
+
+    def __init__(self, template, arguments=()):
+        self.template = template
+        self.arguments = arguments
+
+    def text(self):
+        """
+            Brief: text
+
+            Returns the sentence of the event.
+        """
+        if(len(self.arguments) == 0):
+            return self.template.text
+
+        return self.template.text % self.arguments
+
+    def toDict(self):
+        """
+            Brief: toDict
+
+            Returns the event as a dictionary of its subject, outcome, gender
+            and the values of its blanks.
+        """
+        subject, outcome, gender = self.template.key
+
+        event = {"subject": subject, "outcome": outcome}
+
+        if(gender is not None):
+            event["gender"] = GENDER_NAMES[gender]
+
+        for i in range(len(self.arguments)):
+            event[self.template.fields[i]] = self.arguments[i]
+
+        return event
+
+TEMPLATES = {}
+
+def addTemplate(subject, outcome, gender, fields, text, layout=False):
+    TEMPLATES[(subject, outcome, gender)] = NarrationTemplate((subject, outcome, gender), fields, text, layout)
+
+addTemplate(WORLD, "introduced", None, (), "In this world there are monsters and humans.")
+addTemplate(WORLD, "one_human", None, ("monsters",), " A human must find %s monsters, and destroy them.")
+addTemplate(WORLD, "one_monster", None, (), " The humans must find the monster, and destroy it.")
+addTemplate(WORLD, "many", None, ("humans", "monsters"),
+            " The %s humans must find the %s monsters, and destroy them.")
+
+addTemplate(CHARACTER, "introduced", None, ("name", "appearance", "type"), "%s was a %s %s.")
+addTemplate(CHARACTER, "survived", None, ("name",), "%s survived.")
+addTemplate(CHARACTER, "escaped", None, ("name",), "%s escaped.")
+addTemplate(CHARACTER, "died", None, ("name",), "%s died.")
+
+addTemplate(STORY, "break", None, (), "\n\n", layout=True)
+addTemplate(STORY, "ended", None, (), "Thus, the story ends.")
+addTemplate(STORY, "monsters_defeated", None, (), "The monsters were defeated.")
+addTemplate(STORY, "monster_defeated", None, (), "The monsters was defeated.")
+addTemplate(STORY, "humans_failed", None, (), "The humans had failed to defeat the monsters.")
+
+# An action nothing came of
+for action in [ESCAPED, INVESTIGATED, RAN, ATTACKED]:
+    addTemplate(action, "acted", None, ("name",), "%s " + action + " ")
+
+addTemplate(ATTACKED, "killed_monster", None, ("name", "target"), "%s attacked the monster, %s, killing it. ")
+addTemplate(ATTACKED, "missed_monster", None, ("name", "target"),
+            "%s attacked the monster, %s, but failed to kill it. ")
+addTemplate(ATTACKED, "killed_human", Gender.MALE, ("name", "target"), "%s attacked %s, killing him. ")
+addTemplate(ATTACKED, "killed_human", Gender.FEMALE, ("name", "target"), "%s attacked %s, killing her. ")
+addTemplate(ATTACKED, "missed_human", Gender.MALE, ("name", "target"),
+            "%s attacked %s, but he managed to get away. ")
+addTemplate(ATTACKED, "missed_human", Gender.FEMALE, ("name", "target"),
+            "%s attacked %s, but she managed to get away. ")
+
+addTemplate(ESCAPED, "escaped", None, ("name",), "%s escaped from the monsters' domain. ")
+addTemplate(ESCAPED, "failed", None, ("name",), "%s attempted to escape from the monster' domain, but failed. ")
+
+addTemplate(INVESTIGATED, "found_monster", None, ("name", "target"), "%s investigated finding the monster, %s. ")
+addTemplate(INVESTIGATED, "found_human", None, ("name", "target"), " The monster, %s, investigated finding %s. ")
+addTemplate(INVESTIGATED, "found_nothing", None, ("name",), "%s investigated finding nothing.")
+
+addTemplate(RAN, "fled_human", None, ("name",), "%s ran fleeing in terror. ")
+addTemplate(RAN, "fled_monster", None, ("name",), "%s ran fleeing to tend to its wounds. ")
+
+def narrationEvent(subject, outcome, gender=None, *arguments):
+    """
+        Brief: narrationEvent
+
+        Makes the event of the template with the given key.
+
+        Param: subject, outcome and gender are the key of the template.
+        Param: arguments are the values of its blanks.
+
+        Returns the NarrationEvent.
+    """
+    return NarrationEvent(TEMPLATES[(subject, outcome, gender)], arguments)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+@pytest.fixture
+def databaseName(tmp_path):
+    """
+        Returns the name of a new database holding the starting likelihoods.
+    """
+    fileName = str(tmp_path / "outcomes.db")
+    dataConnection = Database(fileName, persistent=True)
+
+    dataConnection.createDBAndTables()
+    dataConnection.insertRecords()
+    dataConnection.close()
+
+    return fileName
+
+@pytest.fixture
+def rosterName(tmp_path):
+    """
+        Returns the name of a roster file of eight names.
+    """
+    fileName = tmp_path / "roster.txt"
+    fileName.write_text("".join("Character %d\n" % i for i in range(8)))
+
+    return str(fileName)
@@ -0,0 +1,104 @@
+import pickle
+import random
+
+import pytest
+
+from action import Action
+from checkpoint import Checkpointer, loadCheckpoint
+from database import Database
+from narration import FileSink
+from storyCreator import parseArguments, resumeStory, storyRandom, tellStory
+
+class Crash(Exception):
+    pass
+
+class CrashingSearch(Action):
+    """
+        Searches like Action until its given round, where the process telling
+        the story dies.
+    """
+    def __init__(self, dataConnection, crashAt):
+        Action.__init__(self, dataConnection)
+
+        self.crashAt = crashAt
+        self.rounds = 0
+
+    def getAction(self, storyState, characters):
+        self.rounds += 1
+
+        if(self.rounds == self.crashAt):
+            raise Crash()
+
+        return Action.getAction(self, storyState, characters)
+
+def openDatabase(databaseName):
+    dataConnection = Database(databaseName, deferred=True)
+    dataConnection.loadActionUsage()
+
+    return dataConnection
+
+def tellToFile(fileName, rosterName, databaseName, crashAt=None, checkpoint=None):
+    """
+        Tells story 0 of the batch with seed 6 to a file, and returns the
+        changes it held.
+    """
+    dataConnection = openDatabase(databaseName)
+    sink = FileSink(fileName)
+
+    try:
+        tellStory(rosterName, dataConnection, sink, CrashingSearch(dataConnection, crashAt), storyRandom(6, 0),
+                  checkpoint)
+    finally:
+        sink.close()
+
+    return dataConnection.takeDeltas()
+
+def storyRecords(deltas):
+    # Leave out when the story finished and how long it took
+    return [record[1:-1] for record in deltas[2]]
+
+@pytest.mark.parametrize("every, crashAt", [(1, 1), (1, 4), (2, 2), (2, 5), (3, 6)])
+def test_resumed_story_matches_uninterrupted_one(databaseName, rosterName, tmp_path, every, crashAt):
+    expected = tellToFile(str(tmp_path / "expected.txt"), rosterName, databaseName)
+
+    fileName = str(tmp_path / "story.txt")
+    checkpointName = str(tmp_path / "story.checkpoint")
+
+    with pytest.raises(Crash):
+        tellToFile(fileName, rosterName, databaseName, crashAt, Checkpointer(checkpointName, every))
+
+    savedStory = loadCheckpoint(checkpointName)
+
+    assert savedStory["round"] == (crashAt - 1) // every * every
+
+    dataConnection = openDatabase(databaseName)
+    sink = FileSink(fileName, savedStory["narration"])
+
+    resumeStory(savedStory, dataConnection, sink, Action(dataConnection), random.Random(),
+                Checkpointer(checkpointName, every))
+
+    sink.close()
+
+    with open(fileName) as told, open(str(tmp_path / "expected.txt")) as f:
+        assert told.read() == f.read()
+
+    resumed = dataConnection.takeDeltas()
+
+    assert resumed[:2] == expected[:2]
+    assert storyRecords(resumed) == storyRecords(expected)
+
+def test_checkpoints_need_a_round_between_them(tmp_path):
+    with pytest.raises(ValueError, match="at least 1"):
+        Checkpointer(str(tmp_path / "story.checkpoint"), 0)
+
+@pytest.mark.parametrize("every", ["0", "-2", "two"])
+def test_command_line_rejects_bad_checkpoint_intervals(rosterName, every):
+    with pytest.raises(SystemExit):
+        parseArguments(["--checkpoint-every", every, rosterName])
+
+def test_other_checkpoint_versions_are_refused(tmp_path):
+    fileName = tmp_path / "story.checkpoint"
+    fileName.write_bytes(pickle.dumps({"version": 0}))
+
+    with pytest.raises(ValueError, match="unsupported checkpoint version"):
+        loadCheckpoint(str(fileName))
@@ -0,0 +1,133 @@
+import io
+import shutil
+import sqlite3
+
+from action import Action
+from database import Database
+from narration import StreamSink
+from storyCreator import storyRandom, tellStory
+
+# The columns that do not depend on when a story was told or how long it took
+TABLES = {"action_likelihood": "action, agent_type, times_used, percentage",
+          "action_totals": "agent_type, times_used",
+          "story_outcomes": "*",
+          "story_history": "roster_size, rounds, final_tension, winner, humans_survived, humans_escaped, "
+                           "monsters_survived",
+          "story_length_rollup": "*",
+          "story_tension_rollup": "*"}
+
+def readTables(databaseName):
+    conn = sqlite3.connect(databaseName)
+    tables = {}
+
+    for table in TABLES:
+        tables[table] = sorted(conn.execute("SELECT %s FROM %s;" % (TABLES[table], table)).fetchall(), key=repr)
+
+    conn.close()
+
+    return tables
+
+def copyDatabase(databaseName, tmp_path, name):
+    fileName = str(tmp_path / name)
+    shutil.copy(databaseName, fileName)
+
+    return fileName
+
+def tellStories(rosterName, dataConnection, seeds):
+    """
+        Tells a seeded story for each seed, one after the other, with the
+        likelihoods the earlier ones left, and returns their narration.
+    """
+    stream = io.StringIO()
+
+    for seed in seeds:
+        rng = storyRandom(seed, 0)
+        tellStory(rosterName, dataConnection, StreamSink(stream), Action(dataConnection), rng)
+
+    dataConnection.close()
+
+    return stream.getvalue()
+
+def test_database_modes_tell_and_record_the_same_stories(databaseName, rosterName, tmp_path):
+    seeds = range(6)
+    modes = {"per call": Database(copyDatabase(databaseName, tmp_path, "perCall.db")),
+             "persistent": Database(copyDatabase(databaseName, tmp_path, "persistent.db"), persistent=True),
+             "event log": Database(copyDatabase(databaseName, tmp_path, "logged.db"),
+                                   logFile=str(tmp_path / "events.log"), compactRecords=25)}
+
+    told = {}
+
+    for mode in modes:
+        told[mode] = (tellStories(rosterName, modes[mode], seeds), readTables(modes[mode].fileName))
+
+    assert told["persistent"] == told["per call"]
+    assert told["event log"] == told["per call"]
+
+def test_held_changes_reach_the_tables_the_same_way(databaseName, rosterName, tmp_path):
+    deferred = Database(databaseName, deferred=True)
+    tellStories(rosterName, deferred, range(4))
+
+    deltas = deferred.takeDeltas()
+
+    applied = Database(copyDatabase(databaseName, tmp_path, "applied.db"), persistent=True)
+    applied.applyDeltas(*deltas)
+    applied.close()
+
+    logged = Database(copyDatabase(databaseName, tmp_path, "logged.db"), logFile=str(tmp_path / "events.log"))
+    logged.logDeltas(*deltas)
+    logged.close()
+
+    assert readTables(logged.fileName) == readTables(applied.fileName)
+    assert sum(deltas[1].values()) == 4
+
+def likelihoodCounts(databaseName):
+    return dict(((row[0], row[1]), row[2]) for row in readTables(databaseName)["action_likelihood"])
+
+def test_record_cut_short_by_a_crash_is_dropped(databaseName, tmp_path):
+    logFile = tmp_path / "events.log"
+    logFile.write_text("a\tattacked\thuman\na\tattacked\thuman\no\tmonster\na\tran\tmon")
+
+    before = likelihoodCounts(databaseName)
+
+    dataConnection = Database(databaseName, logFile=str(logFile))
+    dataConnection.openLog()
+    dataConnection.close()
+
+    after = likelihoodCounts(databaseName)
+
+    assert after[("attacked", "human")] == before[("attacked", "human")] + 2
+    assert after[("ran", "monster")] == before[("ran", "monster")]
+    assert logFile.read_text() == ""
+
+def test_log_applied_before_a_crash_is_not_counted_again(databaseName, tmp_path):
+    logFile = tmp_path / "events.log"
+    records = "a\tattacked\thuman\no\tmonster\n"
+
+    # The process died after its compaction was committed, before the log
+    # was emptied
+    logFile.write_text(records)
+
+    conn = sqlite3.connect(databaseName)
+    conn.execute("INSERT INTO event_log (log_file, applied_bytes) VALUES (?, ?);", (str(logFile), len(records)))
+    conn.commit()
+    conn.close()
+
+    before = readTables(databaseName)
+
+    dataConnection = Database(databaseName, logFile=str(logFile))
+    dataConnection.openLog()
+    dataConnection.close()
+
+    assert readTables(databaseName) == before
+    assert logFile.read_text() == ""
+
+def test_cached_likelihoods_match_the_tables(databaseName):
+    dataConnection = Database(databaseName, persistent=True)
+    dataConnection.loadActionUsage()
+
+    fresh = Database(databaseName)
+
+    for key in dataConnection.likelihoodCache:
+        assert dataConnection.getActionUsage(*key) == fresh.getActionUsage(*key)
+
+    dataConnection.close()
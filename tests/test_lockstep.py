@@ -0,0 +1,38 @@
+from estimator import estimateWinRates, parseArguments
+from lockstep import simulateLockstep
+from storyCreator import simulateStories
+
+def test_lockstep_stories_match_search_without_budget(databaseName, rosterName):
+    options = parseArguments(["--search-budget-nodes", "0", rosterName])
+
+    searched = simulateStories(rosterName, 0, 100, databaseName, 7, options)
+    batched = simulateLockstep(rosterName, 0, 100, databaseName, 7, options)
+
+    assert batched[0] == searched[0]
+    assert batched[1] == searched[1]
+
+def test_lockstep_stories_do_not_depend_on_the_batch(databaseName, rosterName):
+    whole = simulateLockstep(rosterName, 0, 60, databaseName, 3)
+    first = simulateLockstep(rosterName, 0, 25, databaseName, 3)
+    rest = simulateLockstep(rosterName, 25, 35, databaseName, 3)
+
+    for winner in whole[1]:
+        assert whole[1][winner] == first[1].get(winner, 0) + rest[1].get(winner, 0)
+
+def test_engines_estimate_the_same_interval(databaseName, rosterName):
+    options = parseArguments(["--search-budget-nodes", "0", rosterName])
+    estimates = {}
+
+    for engine in ["search", "lockstep"]:
+        estimates[engine] = estimateWinRates(rosterName, 150, 1, databaseName, options, masterSeed=11,
+                                             batchSize=50, engine=engine)
+
+    for winner in ["human", "monster"]:
+        assert estimates["lockstep"][winner]["wins"] == estimates["search"][winner]["wins"]
+        assert estimates["lockstep"][winner]["interval"] == estimates["search"][winner]["interval"]
+
+def test_estimates_default_to_the_search_engine(databaseName, rosterName):
+    options = parseArguments([rosterName])
+
+    assert options.engine == "search"
+    assert estimateWinRates(rosterName, 5, 1, databaseName, options, masterSeed=1)["engine"] == "search"
@@ -0,0 +1,54 @@
+import random
+
+from database import Database
+from mcts import MonteCarloSearch
+from storyCreator import parseArguments, simulateStories
+from story import Story
+from test_search import randomRoster
+
+def test_default_engine_chooses_legal_actions(databaseName, tmp_path, monkeypatch):
+    # With no Database given, the engine reads outcomes.db where it runs
+    monkeypatch.chdir(tmp_path)
+
+    searchAgent = MonteCarloSearch()
+    rng = random.Random(41)
+
+    for trial in range(20):
+        characters = randomRoster(rng, rng.randint(1, 6))
+        chosenActions = searchAgent.getAction(Story(0.0, 0, 0, 0, 0, 0, False), characters)
+
+        assert len(chosenActions) == len(characters)
+        assert all(chosenActions[index] in searchAgent.legalActions[index] for index in range(len(characters)))
+
+def test_engines_seeded_alike_choose_alike(databaseName):
+    dataConnection = Database(databaseName, persistent=True)
+    dataConnection.loadActionUsage()
+
+    rng = random.Random(42)
+    seedFrom = random.Random(7)
+    state = seedFrom.getstate()
+
+    for trial in range(10):
+        characters = randomRoster(rng, rng.randint(2, 7))
+        first = Story(20.0, 0, 0, 0, 0, 0, False)
+        second = Story(20.0, 0, 0, 0, 0, 0, False)
+
+        chosenActions = MonteCarloSearch(dataConnection, playouts=50, seedFrom=seedFrom).getAction(first, characters)
+
+        assert MonteCarloSearch(dataConnection, playouts=50, seedFrom=seedFrom).getAction(second, characters) \
+            == chosenActions
+        assert second.tension == first.tension
+
+    # The story's generator is read, never drawn from
+    assert seedFrom.getstate() == state
+
+    dataConnection.close()
+
+def test_seeded_batch_plays_out_the_same_again(databaseName, rosterName):
+    options = parseArguments(["simulate", "--search-engine", "mcts", "--mcts-playouts", "40", rosterName])
+
+    first = simulateStories(rosterName, 0, 4, databaseName, 11, options)
+    second = simulateStories(rosterName, 0, 4, databaseName, 11, options)
+
+    assert first[:2] == second[:2]
+    assert [record[1:-1] for record in first[2]] == [record[1:-1] for record in second[2]]
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import random
+
+from database import Database
+from narration import FileSink, JsonRenderer, NullSink, StreamSink
+from storyCreator import createSearchAgent, storyRandom, tellStory
+
+# The story "storyCreator.py --seed 7" tells of the roster in conftest.py
+EXPECTED_STORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "seed7.txt")
+
+def printSequence(storySequence):
+    """
+        The layout printSequence built a whole sequence in before narration
+        was streamed.
+    """
+    storyString = ""
+
+    for sequence in storySequence:
+        if(storyString == ""):
+            storyString = sequence
+        else:
+            storyString = storyString + " " + sequence
+
+    return storyString + "\n"
+
+def tellSeeded(rosterName, databaseName, seed, sink):
+    """
+        Tells story 0 of a seeded batch to a sink, the way a simulate batch
+        does, and returns its final state and the changes it held.
+    """
+    dataConnection = Database(databaseName, deferred=True)
+    dataConnection.loadActionUsage()
+
+    rng = storyRandom(seed, 0)
+    storyState = tellStory(rosterName, dataConnection, sink, createSearchAgent(dataConnection, None, rng), rng)
+
+    deltas = dataConnection.takeDeltas()
+
+    dataConnection.close()
+
+    return storyState, deltas
+
+def test_sequences_keep_the_printed_layout():
+    rng = random.Random(8)
+
+    for trial in range(200):
+        storySequence = [rng.choice(["", "Mina ran.", "The monster, Dracula, attacked.", " "])
+                         for i in range(rng.randint(0, 6))]
+        stream = io.StringIO()
+
+        sink = StreamSink(stream)
+        sink.writeSequence(storySequence)
+
+        assert stream.getvalue() == printSequence(storySequence)
+        assert sink.written == len(stream.getvalue())
+
+def test_seeded_story_is_told_as_recorded(databaseName, rosterName):
+    stream = io.StringIO()
+
+    tellSeeded(rosterName, databaseName, 7, StreamSink(stream))
+
+    with open(EXPECTED_STORY) as f:
+        assert stream.getvalue() == f.read()
+
+def test_sinks_tell_the_same_story(databaseName, rosterName, tmp_path):
+    stream = io.StringIO()
+    fileName = str(tmp_path / "story.txt")
+
+    streamed = tellSeeded(rosterName, databaseName, 3, StreamSink(stream))
+
+    sink = FileSink(fileName)
+    written = tellSeeded(rosterName, databaseName, 3, sink)
+    sink.close()
+
+    headless = tellSeeded(rosterName, databaseName, 3, NullSink())
+
+    with open(fileName) as f:
+        assert f.read() == stream.getvalue()
+
+    for storyState, deltas in [written, headless]:
+        assert storyState.tension == streamed[0].tension
+        assert deltas[:2] == streamed[1][:2]
+
+def test_json_events_follow_the_story(databaseName, rosterName):
+    text = io.StringIO()
+    events = io.StringIO()
+
+    told = tellSeeded(rosterName, databaseName, 5, StreamSink(text))
+    rendered = tellSeeded(rosterName, databaseName, 5, StreamSink(events, JsonRenderer()))
+
+    assert rendered[0].tension == told[0].tension
+    assert rendered[1][:2] == told[1][:2]
+
+    events = [json.loads(line) for line in events.getvalue().splitlines()]
+    introduced = [event for event in events if event["subject"] == "character" and event["outcome"] == "introduced"]
+
+    # Layout is left out, and every character is introduced
+    assert all(event["outcome"] != "break" for event in events)
+    assert len(introduced) == told[0].numHumans + told[0].numMonsters
+    assert all("%s was a %s %s." % (event["name"], event["appearance"], event["type"]) in text.getvalue()
+               for event in introduced)
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from character import CharacterType, Gender
+from story import Story
+from storyCreator import buildRoster, loadCharacters, readRoster
+from world import World
+
+def writeRoster(tmp_path, name, text):
+    fileName = tmp_path / name
+    fileName.write_text(text)
+
+    return str(fileName)
+
+def test_names_roster_keeps_first_words(tmp_path):
+    fileName = writeRoster(tmp_path, "roster.txt", "Mina Harker\n\n  Dracula  \nVan Helsing\n")
+
+    assert list(readRoster(fileName)) == [{"name": "Mina"}, {"name": "Dracula"}, {"name": "Van"}]
+
+def test_structured_rosters_set_their_fields(tmp_path):
+    csvName = writeRoster(tmp_path, "roster.csv", "name,type,gender,position\nMina,human,f,2\nDracula,MONSTER,,\n")
+    jsonlName = writeRoster(tmp_path, "roster.jsonl", '{"name": "Mina", "type": "human", "gender": "female", '
+                                                     '"position": 2}\n\n{"name": "Dracula", "type": "monster"}\n')
+
+    for fileName in [csvName, jsonlName]:
+        characters = loadCharacters(fileName, Story(0.0, 0, 0, 0, 0, 0, False), random.Random(1))
+
+        assert characters[0].characterType == CharacterType.HUMAN
+        assert characters[0].gender == Gender.FEMALE
+        assert characters[0].position == 2
+        assert characters[1].characterType == CharacterType.MONSTER
+
+@pytest.mark.parametrize("name, text, message", [
+    ("roster.jsonl", '{"name": "Mina"}\n{"name": \n', "roster.jsonl line 2"),
+    ("roster.jsonl", '["Mina"]\n', "roster entries are JSON objects"),
+    ("roster.jsonl", '{"type": "human"}\n', "roster entry has no name"),
+    ("roster.jsonl", '{"name": "Mina", "type": "ghost"}\n', "unknown character type for Mina: ghost"),
+    ("roster.jsonl", '{"name": "Mina", "gender": "x"}\n', "unknown gender for Mina: x"),
+    ("roster.jsonl", '{"name": "Mina", "position": 1.5}\n', "position of Mina is not a whole number: 1.5"),
+    ("roster.jsonl", '{"name": "Mina", "position": true}\n', "position of Mina is not a whole number: True"),
+    ("roster.csv", "name,position\nMina,1\nDracula,two\n", "roster.csv line 3: position of Dracula"),
+    ("roster.csv", "name,type\n,human\n", "roster entry has no name"),
+])
+def test_bad_entries_name_their_line(tmp_path, name, text, message):
+    fileName = writeRoster(tmp_path, name, text)
+
+    with pytest.raises(ValueError, match=message):
+        list(readRoster(fileName))
+
+def test_unknown_format_is_rejected(tmp_path):
+    fileName = writeRoster(tmp_path, "roster.txt", "Mina\n")
+
+    with pytest.raises(ValueError, match="unknown roster format: xml"):
+        list(readRoster(fileName, "xml"))
+
+def test_positions_must_be_on_the_map():
+    world = World([(1, 2)])
+
+    with pytest.raises(ValueError, match="Mina starts at 3, which is not on the map"):
+        buildRoster([{"name": "Mina", "position": 3}], Story(0.0, 0, 0, 0, 0, 0, False), random.Random(1), world)
+
+def test_one_sided_rosters_get_an_opponent():
+    storyState = Story(0.0, 0, 0, 0, 0, 0, False)
+
+    characters = buildRoster([{"name": "Mina", "type": "human"}, {"name": "Lucy", "type": "human"}], storyState,
+                             random.Random(1))
+
+    assert len(characters) == 3
+    assert characters[2].name == "The Monster"
+    assert (storyState.numHumans, storyState.numMonsters) == (2, 1)
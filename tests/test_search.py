@@ -0,0 +1,108 @@
+import functools
+import random
+
+import pytest
+
+from action import Action, ParallelSearch, PositionSearch, closeSearchPools
+from character import Character, CharacterHealth, CharacterType, Gender
+from database import Database
+from roster import Roster
+from rules import INVESTIGATED, RAN, ATTACKED, RuleTable
+from story import Story
+from transposition import TranspositionTable
+
+def randomRoster(rng, size):
+    """
+        Returns a Roster of size characters of random types, positions and
+        awareness, some of them dead or escaped.
+    """
+    characters = Roster()
+
+    for index in range(size):
+        characterType = rng.choice([CharacterType.HUMAN, CharacterType.MONSTER])
+        position = rng.choice([1, 2, 3, 4]) if rng.random() < 0.9 else -1
+
+        characters.append(Character(index, "Character %d" % index, characterType, Gender.FEMALE, "tall",
+                                    rng.random() < 0.9, CharacterHealth.HEALTHY, 0, position,
+                                    rng.random() < 0.6))
+
+    return characters
+
+def randomLikelihoods(rng, dataConnection):
+    """
+        Gives every action a random likelihood, sometimes 0 or 1, which makes
+        some transitions flat.
+    """
+    for key in dataConnection.likelihoodCache:
+        dataConnection.likelihoodCache[key] = rng.choice([0.0, 0.5, 1.0, rng.random()])
+
+@pytest.fixture
+def dataConnection(databaseName):
+    dataConnection = Database(databaseName, persistent=True)
+    dataConnection.loadActionUsage()
+
+    yield dataConnection
+
+    dataConnection.close()
+
+def compareEngines(engine, dataConnection, rng, rounds, maxSize, rules=None):
+    for trial in range(rounds):
+        randomLikelihoods(rng, dataConnection)
+
+        characters = randomRoster(rng, rng.randint(1, maxSize))
+        tension = rng.choice([0.0, rng.uniform(-50.0, 150.0)])
+
+        searched = Story(tension, 0, 0, 0, 0, 0, False)
+        found = Story(tension, 0, 0, 0, 0, 0, False)
+
+        expected = Action(dataConnection, rules=rules).getAction(searched, characters)
+
+        assert engine(dataConnection, rules=rules).getAction(found, characters) == expected
+        assert found.tension == searched.tension
+
+def test_position_search_matches_minimax(dataConnection):
+    compareEngines(PositionSearch, dataConnection, random.Random(13), 400, 10)
+
+def test_position_search_matches_minimax_when_monsters_choose(dataConnection):
+    rules = RuleTable([(None, None, None, None, [INVESTIGATED, RAN, ATTACKED])])
+
+    compareEngines(PositionSearch, dataConnection, random.Random(14), 100, 7, rules)
+
+def test_parallel_search_matches_minimax(dataConnection):
+    try:
+        compareEngines(functools.partial(ParallelSearch, workers=2), dataConnection, random.Random(21), 30, 12)
+    finally:
+        closeSearchPools()
+
+def test_parallel_search_matches_minimax_when_monsters_choose(dataConnection):
+    rules = RuleTable([(None, None, None, None, [INVESTIGATED, RAN, ATTACKED])])
+
+    try:
+        compareEngines(functools.partial(ParallelSearch, workers=2), dataConnection, random.Random(22), 30, 10,
+                       rules)
+    finally:
+        closeSearchPools()
+
+def test_transposition_table_keeps_the_minimax_choice(dataConnection):
+    # One small table lives through every trial, as it does through a story,
+    # so entries are reused across rosters and likelihoods and evicted
+    transpositionTable = TranspositionTable(500)
+
+    def searchWithTable(dataConnection, rules=None):
+        return Action(dataConnection, transpositionTable, rules=rules)
+
+    compareEngines(searchWithTable, dataConnection, random.Random(31), 200, 8)
+
+    assert transpositionTable.hits > 0
+    assert transpositionTable.evictions > 0
+
+def test_transposition_table_keeps_the_minimax_choice_when_monsters_choose(dataConnection):
+    rules = RuleTable([(None, None, None, None, [INVESTIGATED, RAN, ATTACKED])])
+    transpositionTable = TranspositionTable(500)
+
+    def searchWithTable(dataConnection, rules=None):
+        return Action(dataConnection, transpositionTable, rules=rules)
+
+    compareEngines(searchWithTable, dataConnection, random.Random(32), 100, 7, rules)
+
+    assert transpositionTable.hits > 0
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from database import Database
+from narration import NullRenderer
+from storyServer import BatchWriter, QueueSink, StoryCancelled, StoryServer
+
+# The story "storyCreator.py --seed 7" tells of the roster in conftest.py
+EXPECTED_STORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "seed7.txt")
+
+# Names rosters keep the first word of each line, so this is that roster
+SEVEN_ROSTER = ["Character"] * 8
+
+def runServer(databaseName, client, **options):
+    """
+        Serves stories on a TCP port while client(port) runs, then writes
+        every story handed in. Returns what the client returned and the
+        writer.
+    """
+    async def run():
+        writer = BatchWriter(Database(databaseName, persistent=True), interval=0.0)
+        writer.start()
+
+        storyServer = StoryServer(writer, **options)
+        server = await asyncio.start_server(storyServer.handle, "127.0.0.1", 0)
+
+        try:
+            async with server:
+                result = await client(server.sockets[0].getsockname()[1])
+        finally:
+            storyServer.close()
+            await writer.close()
+
+        return result, writer
+
+    return asyncio.run(run())
+
+async def request(port, message):
+    """
+        Sends one request and returns every line of the answer.
+    """
+    reader, stream = await asyncio.open_connection("127.0.0.1", port)
+
+    if(isinstance(message, dict)):
+        message = json.dumps(message)
+
+    stream.write((message + "\n").encode("utf-8"))
+    await stream.drain()
+
+    answer = [json.loads(line) for line in (await reader.read()).decode("utf-8").splitlines()]
+    stream.close()
+
+    return answer
+
+def test_seeded_request_tells_the_command_line_story(databaseName):
+    async def client(port):
+        return await request(port, {"roster": SEVEN_ROSTER, "seed": 7})
+
+    answer, writer = runServer(databaseName, client)
+
+    with open(EXPECTED_STORY) as f:
+        assert "".join(line["text"] for line in answer[:-1]) == f.read()
+
+    assert set(answer[-1]) == {"winner", "tension"}
+    assert writer.stories == 1
+
+@pytest.mark.parametrize("message, error", [
+    ("not json", "Expecting value"),
+    ({"seed": 7}, "request needs a roster list"),
+    ({"roster": [7]}, "roster entries are names or objects: 7"),
+    ({"roster": [{"type": "human"}]}, "roster entry has no name"),
+    ({"roster": ["Mina", "Dracula"], "search_engine": "oracle"}, "unknown search engine: oracle"),
+    ({"roster": ["Mina", "Dracula"], "narration": "html"}, "unknown narration: html"),
+    ({"roster": ["Mina", {"name": "Dracula", "position": 99}]}, "Dracula starts at 99, which is not on the map"),
+    ({"roster": ["Mina"] * 5}, "roster has more than 4 characters"),
+])
+def test_bad_requests_are_answered_with_an_error(databaseName, message, error):
+    async def client(port):
+        return await request(port, message)
+
+    answer, writer = runServer(databaseName, client, maxCharacters=4)
+
+    assert len(answer) == 1
+    assert error in answer[0]["error"]
+    assert writer.stories == 0
+
+def test_story_of_a_client_that_leaves_is_not_recorded(databaseName):
+    async def client(port):
+        reader, stream = await asyncio.open_connection("127.0.0.1", port)
+
+        stream.write((json.dumps({"roster": SEVEN_ROSTER, "seed": 7}) + "\n").encode("utf-8"))
+        await stream.drain()
+        stream.close()
+
+        # A client that stays gets its story once the one left behind is dropped
+        return await request(port, {"roster": SEVEN_ROSTER, "seed": 7})
+
+    answer, writer = runServer(databaseName, client, workers=1)
+
+    assert "winner" in answer[-1]
+    assert writer.stories == 1
+
+def test_full_queue_cancels_the_story_after_the_write_timeout():
+    async def fill():
+        queue = asyncio.Queue(1)
+        await queue.put("waiting")
+
+        sink = QueueSink(asyncio.get_running_loop(), queue, writeTimeout=0.01)
+        sink.write("Mina ran.")
+
+        await asyncio.get_running_loop().run_in_executor(None, sink.endSequence)
+
+    with pytest.raises(StoryCancelled):
+        asyncio.run(fill())
+
+def test_cancelled_story_stops_at_the_end_of_a_sequence():
+    sink = QueueSink(None, None, NullRenderer())
+    sink.cancelled = True
+    consumed = []
+
+    def narration():
+        consumed.append("first")
+        yield None
+        consumed.append("second")
+        yield None
+
+    with pytest.raises(StoryCancelled):
+        sink.consume(narration())
+
+    assert consumed == ["first"]
@@ -0,0 +1,59 @@
+import pytest
+
+from action import closeSearchPools
+from storyCreator import parseArguments, runSimulation, simulateStories
+from test_database import copyDatabase, readTables
+
+@pytest.fixture
+def largeRosterName(tmp_path):
+    """
+        Returns the name of a roster file of twelve names, enough for the
+        parallel engine to split its search.
+    """
+    fileName = tmp_path / "large.txt"
+    fileName.write_text("".join("Character %d\n" % i for i in range(12)))
+
+    return str(fileName)
+
+def simulate(rosterName, databaseName, *arguments):
+    options = parseArguments(["simulate"] + list(arguments) + [rosterName])
+
+    try:
+        actionDeltas, outcomeDeltas, storyRecords = simulateStories(rosterName, 0, 8, databaseName, 3, options)
+    finally:
+        closeSearchPools()
+
+    # Leave out when each story finished and how long it took
+    return actionDeltas, outcomeDeltas, [record[1:-1] for record in storyRecords]
+
+@pytest.mark.parametrize("arguments", [
+    ["--search-engine", "position"],
+    ["--search-engine", "parallel", "--search-workers", "2"],
+    ["--transposition-size", "1000"],
+    ["--search-engine", "position", "--transposition-size", "1000"],
+])
+def test_engines_tell_the_minimax_stories(databaseName, largeRosterName, arguments):
+    expected = simulate(largeRosterName, databaseName)
+
+    assert simulate(largeRosterName, databaseName, *arguments) == expected
+
+def test_batch_is_the_same_however_it_is_split(databaseName, rosterName, tmp_path):
+    databaseNames = []
+
+    for workers in [1, 3]:
+        fileName = copyDatabase(databaseName, tmp_path, "%d.db" % workers)
+        options = parseArguments(["simulate", rosterName])
+
+        runSimulation(rosterName, 10, workers, fileName, options, masterSeed=9)
+        databaseNames.append(fileName)
+
+    assert readTables(databaseNames[0]) == readTables(databaseNames[1])
+
+def test_part_of_a_batch_is_told_again_alone(databaseName, rosterName):
+    options = parseArguments(["simulate", rosterName])
+
+    whole = simulateStories(rosterName, 0, 6, databaseName, 4, options)
+    first = simulateStories(rosterName, 0, 3, databaseName, 4, options)
+    rest = simulateStories(rosterName, 3, 3, databaseName, 4, options)
+
+    assert [record[1:-1] for record in whole[2]] == [record[1:-1] for record in first[2] + rest[2]]
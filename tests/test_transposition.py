@@ -0,0 +1,47 @@
+from transposition import Bound, StateKey, TranspositionTable
+
+def test_keys_with_the_same_hash_stay_apart():
+    # hash(-1) == hash(-2) in CPython, and so do these tuples
+    first = StateKey((-1,))
+    second = StateKey((-2,))
+
+    assert hash(first) == hash(second)
+    assert first != second
+    assert first == StateKey((-1,))
+
+def test_colliding_state_is_not_found():
+    transpositionTable = TranspositionTable()
+    transpositionTable.store((0.0, StateKey((-1,))), 5.0, float("-inf"), float("inf"), ("attacked",))
+
+    assert transpositionTable.lookup((0.0, StateKey((-2,))), float("-inf"), float("inf")) is None
+    assert transpositionTable.principalActions((0.0, StateKey((-2,)))) == ()
+    assert transpositionTable.lookup((0.0, StateKey((-1,))), float("-inf"), float("inf")).value == 5.0
+
+def test_bounds_answer_only_the_windows_they_settle():
+    transpositionTable = TranspositionTable()
+    lower = (0.0, StateKey((1,)))
+    upper = (0.0, StateKey((2,)))
+
+    # Searched with (0, 10): failing high gives a lower bound, low an upper one
+    transpositionTable.store(lower, 12.0, 0.0, 10.0, ())
+    transpositionTable.store(upper, -3.0, 0.0, 10.0, ())
+
+    assert transpositionTable.entries[lower].bound == Bound.LOWER
+    assert transpositionTable.entries[upper].bound == Bound.UPPER
+
+    assert transpositionTable.lookup(lower, 0.0, 11.0) is not None
+    assert transpositionTable.lookup(lower, 0.0, 13.0) is None
+    assert transpositionTable.lookup(upper, -2.0, 10.0) is not None
+    assert transpositionTable.lookup(upper, -4.0, 10.0) is None
+
+def test_least_recently_used_entry_is_evicted():
+    transpositionTable = TranspositionTable(2)
+    keys = [(0.0, StateKey((index,))) for index in range(3)]
+
+    transpositionTable.store(keys[0], 1.0, float("-inf"), float("inf"), ())
+    transpositionTable.store(keys[1], 2.0, float("-inf"), float("inf"), ())
+    transpositionTable.lookup(keys[0], float("-inf"), float("inf"))
+    transpositionTable.store(keys[2], 3.0, float("-inf"), float("inf"), ())
+
+    assert list(transpositionTable.entries) == [keys[0], keys[2]]
+    assert transpositionTable.evictions == 1
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+
+class Bound:
+    """
+        How the value stored for a search state relates to its true value.
+    """
+    EXACT = "exact"
+    LOWER = "lower"
+    UPPER = "upper"
+
+class StateKey:
+    """
+        Everything a search subtree depends on, as a tuple that may hold the
+        StateKey of the subtree below it. The hash is worked out once, and keys
+        with the same hash are only equal when all of their fields are, so two
+        states can never share an entry.
+    """
+    __slots__ = ("fields", "hashValue")
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.hashValue = hash(fields)
+
+    def __hash__(self):
+        return self.hashValue
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, StateKey) and self.hashValue == other.hashValue
+                                 and self.fields == other.fields)
+
+class TableEntry:
+    """
+        Result of searching a state, as kept in the transposition table.
+    """
+    def __init__(self, value, bound, principalActions):
+        self.value = value
+        self.bound = bound
+        self.principalActions = principalActions
+
+class TranspositionTable:
+    """
+        Bounded cache of search results keyed on the search state. The least
+        recently used entry is evicted once the table is full.
+    """
+    def __init__(self, maxEntries=100000):
+        """
+            Brief: __init__
+
+            Param: maxEntries is the number of states kept before the least
+            recently used one is evicted.
+        """
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key, a, b):
+        """
+            Brief: lookup
+
+            Finds a stored result that can stand in for searching the state with
+            the window (a, b). Exact values always can. A lower bound can when it
+            is already above b, and an upper bound when it is already below a.
+
+            Param: key is the key of the search state.
+            Param: a is the alpha value of the search window.
+            Param: b is the beta value of the search window.
+
+            Returns the TableEntry, or None if the state must be searched.
+        """
+        entry = self.entries.get(key)
+
+        if(entry is not None):
+            self.entries.move_to_end(key)
+
+            if(entry.bound == Bound.EXACT
+               or (entry.bound == Bound.LOWER and entry.value > b)
+               or (entry.bound == Bound.UPPER and entry.value < a)):
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+
+        return None
+
+    def principalActions(self, key):
+        """
+            Brief: principalActions
+
+            Returns the best actions stored for a state, starting with the
+            character acting in it, or an empty tuple if it is not stored.
+        """
+        entry = self.entries.get(key)
+
+        if(entry is None):
+            return ()
+
+        return entry.principalActions
+
+    def store(self, key, value, a, b, principalActions):
+        """
+            Brief: store
+
+            Saves the result of searching a state with the window (a, b).
+
+            Param: key is the key of the search state.
+            Param: value is the value returned by the search.
+            Param: a is the alpha value the state was searched with.
+            Param: b is the beta value the state was searched with.
+            Param: principalActions is the tuple of best actions found, starting
+            with the character acting in the state.
+        """
+        if(self.maxEntries <= 0):
+            return
+
+        if(value <= a):
+            bound = Bound.UPPER
+        elif(value >= b):
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+
+        self.entries[key] = TableEntry(value, bound, principalActions)
+        self.entries.move_to_end(key)
+
+        if(len(self.entries) > self.maxEntries):
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+            Brief: clear
+
+            Removes every entry and resets the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hitRate(self):
+        """
+            Brief: hitRate
+
+            Returns the fraction of lookups answered by the table.
+        """
+        lookups = self.hits + self.misses
+
+        if(lookups == 0):
+            return 0.0
+
+        return self.hits / float(lookups)
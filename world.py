@@ -0,0 +1,143 @@
+import json
+
+class World:
+    """
+        The map of the story: numbered locations joined by edges. A character
+        investigating stays where it is a third of the time and otherwise takes
+        an edge; a character running away goes two edges away, towards lower or
+        higher numbered locations on a coin flip, and stays if there is nowhere
+        to run that way. The default world is the original four positions in a
+        row, on which both moves play out exactly as they always have.
+    """
+    def __init__(self, edges, names=None):
+        """
+            Brief: __init__
+
+            Param: edges is an iterable of pairs of locations. Every location is
+            a positive integer and needs at least one edge.
+            Param: names optionally maps locations to names.
+        """
+        adjacency = {}
+
+        for first, second in edges:
+            first = int(first)
+            second = int(second)
+
+            if(first < 1 or second < 1):
+                raise ValueError("locations are positive integers: %s, %s" % (first, second))
+
+            if(first == second):
+                continue
+
+            adjacency.setdefault(first, set()).add(second)
+            adjacency.setdefault(second, set()).add(first)
+
+        if(len(adjacency) == 0):
+            raise ValueError("the world has no edges")
+
+        self.locations = sorted(adjacency)
+        self.names = dict(names or {})
+        self.neighbours = {}
+        self.fleeTargets = {}
+
+        for location in self.locations:
+            self.neighbours[location] = tuple(sorted(adjacency[location]))
+
+        for location in self.locations:
+            nearby = set(self.neighbours[location])
+            nearby.add(location)
+
+            twoAway = set()
+
+            for neighbour in self.neighbours[location]:
+                twoAway.update(self.neighbours[neighbour])
+
+            twoAway -= nearby
+
+            self.fleeTargets[location] = (tuple(sorted(target for target in twoAway if target < location)),
+                                          tuple(sorted(target for target in twoAway if target > location)))
+
+    @staticmethod
+    def line(size):
+        """
+            Brief: line
+
+            Returns a world of locations 1 to size in a row.
+        """
+        return World([(location, location + 1) for location in range(1, size)])
+
+    @staticmethod
+    def load(fileName):
+        """
+            Brief: load
+
+            Reads a world from a JSON file holding an "edges" list of location
+            pairs and, optionally, a "names" object mapping locations to names:
+
+                {"edges": [[1, 2], [2, 3]], "names": {"1": "the crypt"}}
+
+            Param: fileName is the name of the file.
+
+            Returns the World.
+        """
+        with open(fileName, "r") as f:
+            data = json.load(f)
+
+        names = {}
+
+        for location in data.get("names", {}):
+            names[int(location)] = data["names"][location]
+
+        return World(data["edges"], names)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def hasLocation(self, location):
+        return location in self.neighbours
+
+    def randomLocation(self, rng):
+        """
+            Brief: randomLocation
+
+            Returns a location picked uniformly at random.
+        """
+        return self.locations[rng.randint(1, len(self.locations)) - 1]
+
+    def investigateMove(self, location, rng):
+        """
+            Brief: investigateMove
+
+            Returns where a character investigating from a location ends up.
+            Locations off the map, such as that of an escaped character, are
+            left unchanged.
+        """
+        roll = rng.randint(1, 3)
+        neighbours = self.neighbours.get(location, ())
+
+        if(roll == 3 or len(neighbours) == 0):
+            return location
+
+        if(len(neighbours) <= 2):
+            return neighbours[(roll - 1) % len(neighbours)]
+
+        return neighbours[rng.randrange(len(neighbours))]
+
+    def fleeMove(self, location, rng):
+        """
+            Brief: fleeMove
+
+            Returns where a character running away from a location ends up.
+        """
+        roll = rng.randint(1, 2)
+        targets = self.fleeTargets.get(location, ((), ()))[roll - 1]
+
+        if(len(targets) == 0):
+            return location
+
+        if(len(targets) == 1):
+            return targets[0]
+
+        return targets[rng.randrange(len(targets))]
+
+DEFAULT_WORLD = World.line(4)